@@ -0,0 +1,45 @@
+"""
+API 依赖注入
+提供与数据库实例绑定的管理器对象，按数据库实例缓存，避免每个请求重复创建
+"""
+from functools import lru_cache
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import settings
+from database import get_database
+from modules.template_engine import TemplateManager
+from modules.output import VersionManager
+
+# 统计计数的最长有效期（秒）
+_STATISTICS_MAX_AGE = 3600
+
+
+@lru_cache(maxsize=1)
+def _template_manager(db: AsyncIOMotorDatabase) -> TemplateManager:
+    return TemplateManager(db)
+
+
+@lru_cache(maxsize=1)
+def _version_manager(db: AsyncIOMotorDatabase) -> VersionManager:
+    return VersionManager(
+        db,
+        count_cache_ttl=settings.HISTORY_COUNT_CACHE_TTL,
+        # TTL 后台删除与重建期间并发的保存都会使增量计数偏离，定期重新统计
+        statistics_max_age=_STATISTICS_MAX_AGE,
+        secondary_reads=settings.MONGODB_SECONDARY_READS
+    )
+
+
+async def get_template_manager(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> TemplateManager:
+    """FastAPI 依赖注入：获取模板管理器"""
+    return _template_manager(db)
+
+
+async def get_version_manager(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> VersionManager:
+    """FastAPI 依赖注入：获取版本管理器"""
+    return _version_manager(db)
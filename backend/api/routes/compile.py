@@ -2,176 +2,527 @@
 编译 API 路由
 提供 Prompt 编译功能
 """
-from fastapi import APIRouter, Depends, HTTPException
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+import asyncio
 import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-from database import get_database
+from config import settings
+from api.dependencies import get_template_manager, get_version_manager
 from models.api_models import CompileRequest, CompileResponse
-from models.prompt_models import CompiledPrompt
-from modules.input_layer import IntentExtractor, InputNormalizer
+from models.prompt_models import CompiledPrompt, OptimizationLevel
+from models.evaluation_models import QualityMetrics
+from modules.input_layer import InputNormalizer, batched_intent_extractor
 from modules.template_engine import TemplateManager, FragmentComposer
 from modules.compiler import RuleEngine, AIOptimizer, SelfChecker
-from modules.evaluation import QualityEvaluator
+from modules.evaluation import MetricsCalculator, batched_evaluator
 from modules.output import Formatter, VersionManager
+from services.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["compile"])
 
+# 无状态的处理模块在导入时创建一次，所有请求共享
+_normalizer = InputNormalizer()
+_composer = FragmentComposer()
+_rule_engine = RuleEngine()
+_optimizer = AIOptimizer()
+_self_checker = SelfChecker()
+_formatter = Formatter()
+_calculator = MetricsCalculator()
 
-@router.post("/compile", response_model=CompileResponse)
-async def compile_prompt(
-    request: CompileRequest,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+# 进行中的编译请求，键与响应缓存的精确键相同；相同请求并发到达时共享同一结果
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def _run_cpu(text: str, func: Callable[..., Any], *args) -> Any:
+    """
+    执行同步 CPU 计算，文本较长时放到线程池避免阻塞事件循环
+    
+    Args:
+        text: 用于判断计算量的文本
+        func: 同步函数
+        *args: 函数参数
+        
+    Returns:
+        Any: 函数返回值
+    """
+    if len(text) > settings.CPU_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+async def _record_template_usage(
+    template_manager: TemplateManager,
+    template_id: str,
+    score: Optional[float]
 ):
     """
-    编译 Prompt
+    记录模板使用情况（响应发送后执行）
     
-    将用户输入转化为结构化、优化的 Prompt
+    有评分时使用次数与平均评分在一次原子更新中完成
+    
+    Args:
+        template_manager: 模板管理器
+        template_id: 模板ID
+        score: 本次编译的综合评分（未评估时为 None）
     """
     try:
-        logger.info(f"收到编译请求 - 输入长度: {len(request.user_input)}")
-        
-        # 1. 输入标准化
-        normalizer = InputNormalizer()
-        normalized_input = normalizer.normalize(request.user_input)
-        
-        # 2. 意图提取
-        intent_extractor = IntentExtractor()
-        intent = await intent_extractor.extract(normalized_input)
-        
-        # 3. 模板选择（如果未指定模板ID）
-        template_manager = TemplateManager(db)
-        template = None
-        
-        if request.template_id:
-            template = await template_manager.get_template(request.template_id)
-            if not template:
-                logger.warning(f"指定的模板不存在: {request.template_id}")
-        else:
-            # 根据意图自动选择模板
-            template = await template_manager.find_best_template(intent)
-        
-        # 4. 片段组合
-        composer = FragmentComposer()
-        
-        if template:
-            prompt_text = composer.compose_from_template(template, intent)
-            template_id = template.template_id
-            # 更新模板使用次数
+        if score is None:
             await template_manager.increment_usage(template_id)
         else:
-            prompt_text = composer.compose_from_intent(intent, normalized_input)
-            template_id = None
+            await template_manager.record_usage_and_score(template_id, score)
+    except Exception as e:
+        logger.error(f"更新模板使用记录失败: {e}")
+
+
+def _render_structured_prompt(structured: dict) -> str:
+    """
+    将优化器返回的结构化 Prompt 字典渲染为文本
+    
+    Args:
+        structured: 包含 role/objective/constraints/output_format 的字典
         
-        # 5. 规则校验
-        rule_engine = RuleEngine()
-        validation_result = rule_engine.validate(prompt_text)
+    Returns:
+        str: Prompt 文本
+    """
+    parts = [
+        "角色：", str(structured.get("role", "")),
+        "\n\n目标：", str(structured.get("objective", ""))
+    ]
+    
+    constraints = structured.get("constraints", [])
+    if constraints:
+        parts.append("\n\n约束条件：\n")
+        parts.append("\n".join([f"- {c}" for c in constraints]))
+    
+    if "output_format" in structured:
+        parts.append("\n\n输出格式：")
+        parts.append(str(structured["output_format"]))
+    
+    return "".join(parts)
+
+
+def _consume_result(future: asyncio.Future):
+    """取出 Future 的异常，避免无人等待时产生未读取异常的警告"""
+    if not future.cancelled():
+        future.exception()
+
+
+async def _single_flight(key: str, run: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    合并并发的相同请求：第一个请求执行，其余请求等待其结果
+    
+    Args:
+        key: 请求键
+        run: 执行请求的无参协程函数
         
-        # 自动修复常见问题
-        if not validation_result.passed:
-            prompt_text = rule_engine.fix_common_issues(prompt_text)
+    Returns:
+        Any: 执行结果
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        logger.info("合并进行中的相同编译请求")
+        # shield 防止等待方取消时连带取消共享的结果
+        return await asyncio.shield(future)
+    
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(_consume_result)
+    _inflight[key] = future
+    try:
+        result = await run()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def _none():
+    """占位协程，用于 asyncio.gather 中被跳过的阶段"""
+    return None
+
+
+class _CompileContext:
+    """编译过程中各阶段共享的中间结果"""
+    
+    def __init__(self, request: CompileRequest):
+        self.request = request
+        self.level = request.optimization_level.value
+        self.cache_key = response_cache.make_key(
+            request.user_input,
+            request.template_id,
+            self.level,
+            request.auto_evaluate,
+            request.include_formatted
+        )
+        self.cache_scope = None
+        self.cache_keywords = frozenset()
+        self.normalized_input = ""
+        self.intent = None
+        self.template_id = None
+        self.prompt_text = ""
+        self.validation_result = None
+
+
+async def _prepare(
+    ctx: _CompileContext,
+    template_manager: TemplateManager
+) -> Optional[CompileResponse]:
+    """
+    步骤 1-5：输入标准化、意图提取、模板选择、片段组合与规则校验
+    
+    Args:
+        ctx: 编译上下文
+        template_manager: 模板管理器
         
-        # 6. AI 优化（根据优化级别）
-        optimized = False
-        improvements = []
+    Returns:
+        Optional[CompileResponse]: 命中关键词缓存时返回近似请求的缓存响应，否则返回 None
+    """
+    request = ctx.request
+    
+    # 1. 输入标准化
+    normalized_input = ctx.normalized_input = _normalizer.normalize(request.user_input)
+    
+    # 2-3. 意图提取 + 模板选择
+    if request.template_id:
+        # 指定模板的查询不依赖意图，与意图提取并发执行
+        intent, template = await asyncio.gather(
+            batched_intent_extractor.extract(normalized_input),
+            template_manager.get_template(request.template_id)
+        )
+        if not template:
+            logger.warning(f"指定的模板不存在: {request.template_id}")
+    else:
+        intent = await batched_intent_extractor.extract(normalized_input)
+        # 根据意图自动选择模板
+        template = await template_manager.find_best_template(intent)
+    ctx.intent = intent
+    
+    # 关键词缓存查找：意图关键词足够重合的近似请求直接返回
+    ctx.cache_scope = response_cache.make_scope(
+        intent,
+        request.template_id,
+        ctx.level,
+        request.auto_evaluate,
+        request.include_formatted
+    )
+    ctx.cache_keywords = response_cache.extract_keywords(intent)
+    cached = response_cache.get_by_keywords(ctx.cache_scope, ctx.cache_keywords)
+    if cached is not None:
+        return cached
+    
+    # 4. 片段组合
+    if template:
+        prompt_text = _composer.compose_from_template(template, intent)
+        ctx.template_id = template.template_id
+    else:
+        prompt_text = _composer.compose_from_intent(intent, normalized_input)
+    
+    # 5. 规则校验
+    ctx.validation_result = await _run_cpu(prompt_text, _rule_engine.validate, prompt_text)
+    
+    # 自动修复常见问题
+    if not ctx.validation_result.passed:
+        prompt_text = await _run_cpu(prompt_text, _rule_engine.fix_common_issues, prompt_text)
+    
+    ctx.prompt_text = prompt_text
+    return None
+
+
+def _build_compiled_prompt(ctx: _CompileContext, optimized: bool) -> CompiledPrompt:
+    """
+    步骤 7：由编译上下文构建编译结果
+    
+    Args:
+        ctx: 编译上下文
+        optimized: 是否经过 AI 优化
         
-        if request.optimization_level.value != "low":
-            optimizer = AIOptimizer()
-            optimization_result = await optimizer.optimize(
-                prompt_text,
-                intent,
-                request.optimization_level
-            )
-            
-            if optimization_result:
-                optimized_prompt = optimization_result.get("optimized_prompt", prompt_text)
-                
-                # 处理优化返回的可能是字典的情况
-                if isinstance(optimized_prompt, dict):
-                    # 将结构化字典转换为文本
-                    role = optimized_prompt.get("role", "")
-                    objective = optimized_prompt.get("objective", "")
-                    constraints = optimized_prompt.get("constraints", [])
-                    
-                    prompt_text = f"角色：{role}\n\n目标：{objective}"
-                    if constraints:
-                        prompt_text += f"\n\n约束条件：\n" + "\n".join(f"- {c}" for c in constraints)
-                    if "output_format" in optimized_prompt:
-                        prompt_text += f"\n\n输出格式：{optimized_prompt['output_format']}"
-                else:
-                    prompt_text = optimized_prompt
-                
-                improvements = optimization_result.get("improvements", [])
-                optimized = True
-                
-                # 7. 自检
-                checker = SelfChecker()
-                check_result = await checker.check(prompt_text, prompt_text, intent)
-                
-                if not check_result["passed"]:
-                    logger.warning("自检未通过，使用原始版本")
-                    # 可以选择回退或继续使用
+    Returns:
+        CompiledPrompt: 编译结果
+    """
+    request = ctx.request
+    intent = ctx.intent
+    return CompiledPrompt(
+        original_input=request.user_input,
+        intent=intent,
+        template_id=ctx.template_id,
+        role=intent.objective,  # 这里简化处理
+        objective=intent.objective,
+        constraints=intent.constraints,
+        output_format="清晰、结构化的输出",
+        context=intent.context,
+        full_prompt=ctx.prompt_text,
+        optimization_level=request.optimization_level,
+        optimized=optimized
+    )
+
+
+async def _respond(
+    ctx: _CompileContext,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager,
+    compiled_prompt: CompiledPrompt,
+    metrics: Optional[QualityMetrics],
+    suggestions: list
+) -> CompileResponse:
+    """
+    步骤 11-12：记录模板使用、格式化输出、构建响应并写入缓存
+    
+    Args:
+        ctx: 编译上下文
+        background_tasks: 响应后执行的后台任务
+        template_manager: 模板管理器
+        compiled_prompt: 编译结果
+        metrics: 质量评估指标（未评估时为 None）
+        suggestions: 改进建议
         
-        # 8. 构建编译结果
-        compiled_prompt = CompiledPrompt(
-            original_input=request.user_input,
-            intent=intent,
-            template_id=template_id,
-            role=intent.objective,  # 这里简化处理
-            objective=intent.objective,
-            constraints=intent.constraints,
-            output_format="清晰、结构化的输出",
-            context=intent.context,
-            full_prompt=prompt_text,
-            optimization_level=request.optimization_level,
-            optimized=optimized
+    Returns:
+        CompileResponse: 编译响应
+    """
+    # 模板使用次数和评分不影响响应内容，在响应发送后写入
+    if ctx.template_id:
+        background_tasks.add_task(
+            _record_template_usage,
+            template_manager,
+            ctx.template_id,
+            metrics.overall_score if metrics else None
         )
+    
+    # 11. 格式化输出（仅在客户端需要时构建）
+    formatted_output = (
+        await _run_cpu(ctx.prompt_text, _formatter._build_output_dict, compiled_prompt, metrics)
+        if ctx.request.include_formatted else None
+    )
+    
+    # 12. 构建响应
+    response = CompileResponse(
+        success=True,
+        compiled_prompt=compiled_prompt,
+        metrics=metrics,
+        suggestions=suggestions,
+        formatted_output=formatted_output
+    )
+    
+    response_cache.set(ctx.cache_key, ctx.cache_scope, ctx.cache_keywords, response)
+    
+    logger.info(f"编译成功 - 版本ID: {compiled_prompt.version_id}")
+    return response
+
+
+async def _finish(
+    ctx: _CompileContext,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager,
+    version_manager: VersionManager,
+    optimized: bool = False,
+    improvements: Optional[list] = None,
+    evaluation_data: Optional[dict] = None,
+    local_evaluation: bool = False
+) -> CompileResponse:
+    """
+    步骤 7-12：构建编译结果、自检、评估、保存并构建响应
+    
+    Args:
+        ctx: 编译上下文
+        background_tasks: 响应后执行的后台任务
+        template_manager: 模板管理器
+        version_manager: 版本管理器
+        optimized: 是否经过 AI 优化
+        improvements: 优化改进说明
+        evaluation_data: 优化时一并得到的评估结果（可选，有则不再单独评估）
+        local_evaluation: 是否用本地指标计算代替 LLM 质量评估
         
-        # 9. 质量评估（如果需要）
-        metrics = None
-        if request.auto_evaluate:
-            evaluator = QualityEvaluator()
-            evaluation = await evaluator.evaluate(
-                prompt_text,
-                intent,
-                compiled_prompt.version_id
-            )
-            metrics = evaluation.metrics
-            
-            # 更新模板评分
-            if template_id and metrics:
-                await template_manager.update_quality_score(
-                    template_id,
-                    metrics.overall_score
-                )
-        
-        # 10. 保存版本
-        version_manager = VersionManager(db)
-        await version_manager.save_version(compiled_prompt)
+    Returns:
+        CompileResponse: 编译响应
+    """
+    request = ctx.request
+    intent = ctx.intent
+    prompt_text = ctx.prompt_text
+    
+    # 7. 构建编译结果
+    compiled_prompt = _build_compiled_prompt(ctx, optimized)
+    
+    if evaluation_data is not None:
+        # 优化时已评估过该文本，自检直接复用评估结果
+        _self_checker.prime(prompt_text, intent, evaluation_data)
+    
+    # 8-10. 自检（仅优化后）、质量评估与版本保存互不依赖，并发执行
+    check_result, evaluation, _ = await asyncio.gather(
+        _self_checker.check(prompt_text, prompt_text, intent) if optimized else _none(),
+        batched_evaluator.submit(
+            prompt_text,
+            intent,
+            compiled_prompt.version_id
+        ) if request.auto_evaluate and evaluation_data is None and not local_evaluation else _none(),
+        version_manager.save_version(compiled_prompt)
+    )
+    
+    if evaluation_data is not None and request.auto_evaluate:
+        evaluation = batched_evaluator.evaluator.build_result(evaluation_data, compiled_prompt.version_id)
+    
+    if check_result is not None and not check_result["passed"]:
+        logger.warning("自检未通过，使用原始版本")
+        # 可以选择回退或继续使用
+    
+    metrics = evaluation.metrics if evaluation else None
+    if local_evaluation and request.auto_evaluate:
+        metrics = await _run_cpu(prompt_text, _calculator.calculate_metrics, prompt_text)
+    
+    suggestions = []
+    suggestions.extend(ctx.validation_result.suggestions)
+    suggestions.extend(improvements or [])
+    
+    return await _respond(
+        ctx,
+        background_tasks,
+        template_manager,
+        compiled_prompt,
+        metrics,
+        suggestions
+    )
+
+
+async def _reuse(
+    ctx: _CompileContext,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager,
+    version_manager: VersionManager,
+    cached: CompileResponse
+) -> CompileResponse:
+    """
+    关键词命中：复用近似请求由 LLM 得到的部分（Prompt 文本、评分与建议），
+    以当前请求的输入和意图构建新版本并保存
+    
+    Args:
+        ctx: 编译上下文
+        background_tasks: 响应后执行的后台任务
+        template_manager: 模板管理器
+        version_manager: 版本管理器
+        cached: 近似请求的缓存响应
         
-        # 11. 格式化输出
-        formatter = Formatter()
-        formatted_output = formatter._build_output_dict(compiled_prompt, metrics)
+    Returns:
+        CompileResponse: 当前请求的编译响应
+    """
+    source = cached.compiled_prompt
+    ctx.template_id = source.template_id
+    ctx.prompt_text = source.full_prompt
+    
+    compiled_prompt = _build_compiled_prompt(ctx, source.optimized)
+    await version_manager.save_version(compiled_prompt)
+    
+    return await _respond(
+        ctx,
+        background_tasks,
+        template_manager,
+        compiled_prompt,
+        cached.metrics,
+        list(cached.suggestions)
+    )
+
+
+async def _compile_low(
+    ctx: _CompileContext,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager,
+    version_manager: VersionManager
+) -> CompileResponse:
+    """低优化级别：不调用 AI 优化和自检"""
+    cached = await _prepare(ctx, template_manager)
+    if cached is not None:
+        return await _reuse(ctx, background_tasks, template_manager, version_manager, cached)
+    
+    return await _finish(ctx, background_tasks, template_manager, version_manager)
+
+
+async def _compile_optimized(
+    ctx: _CompileContext,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager,
+    version_manager: VersionManager
+) -> CompileResponse:
+    """中/高优化级别：AI 优化后执行自检"""
+    cached = await _prepare(ctx, template_manager)
+    if cached is not None:
+        return await _reuse(ctx, background_tasks, template_manager, version_manager, cached)
+    
+    # 用户输入本身已足够结构化时跳过 AI 优化，评分由本地指标计算得到，不调用 LLM
+    if _optimizer.should_skip(ctx.normalized_input, ctx.intent, ctx.request.optimization_level):
+        return await _finish(ctx, background_tasks, template_manager, version_manager, local_evaluation=True)
+    
+    # 6. AI 优化（需要评估时在同一次调用中评估优化结果）
+    optimize = _optimizer.optimize_and_evaluate if ctx.request.auto_evaluate else _optimizer.optimize
+    optimization_result = await optimize(
+        ctx.prompt_text,
+        ctx.intent,
+        ctx.request.optimization_level
+    )
+    
+    if not optimization_result:
+        return await _finish(ctx, background_tasks, template_manager, version_manager)
+    
+    optimized_prompt = optimization_result.get("optimized_prompt", ctx.prompt_text)
+    
+    # 处理优化返回的可能是字典的情况
+    if isinstance(optimized_prompt, dict):
+        # 将结构化字典转换为文本
+        ctx.prompt_text = _render_structured_prompt(optimized_prompt)
+    else:
+        ctx.prompt_text = optimized_prompt
+    
+    return await _finish(
+        ctx,
+        background_tasks,
+        template_manager,
+        version_manager,
+        optimized=True,
+        improvements=optimization_result.get("improvements", []),
+        evaluation_data=optimization_result.get("evaluation")
+    )
+
+
+# 按优化级别分派的编译流程，导入时确定
+_HANDLERS = {
+    OptimizationLevel.LOW: _compile_low,
+    OptimizationLevel.MEDIUM: _compile_optimized,
+    OptimizationLevel.HIGH: _compile_optimized,
+}
+
+
+@router.post("/compile", response_model=CompileResponse)
+async def compile_prompt(
+    request: CompileRequest,
+    background_tasks: BackgroundTasks,
+    template_manager: TemplateManager = Depends(get_template_manager),
+    version_manager: VersionManager = Depends(get_version_manager)
+):
+    """
+    编译 Prompt
+    
+    将用户输入转化为结构化、优化的 Prompt
+    """
+    try:
+        logger.info(f"收到编译请求 - 输入长度: {len(request.user_input)}")
         
-        # 12. 构建响应
-        suggestions = []
-        suggestions.extend(validation_result.suggestions)
-        suggestions.extend(improvements)
+        # 0. 精确缓存查找：相同输入和参数直接返回
+        ctx = _CompileContext(request)
+        cached = response_cache.get(ctx.cache_key)
+        if cached is not None:
+            return cached
         
-        response = CompileResponse(
-            success=True,
-            compiled_prompt=compiled_prompt,
-            metrics=metrics,
-            suggestions=suggestions,
-            formatted_output=formatted_output
+        # 相同请求正在编译时等待其结果，不重复调用 LLM
+        handler = _HANDLERS[request.optimization_level]
+        return await _single_flight(
+            ctx.cache_key,
+            lambda: handler(ctx, background_tasks, template_manager, version_manager)
         )
         
-        logger.info(f"编译成功 - 版本ID: {compiled_prompt.version_id}")
-        return response
-        
     except Exception as e:
         logger.error(f"编译失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"编译失败: {str(e)}")
-
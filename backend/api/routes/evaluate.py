@@ -6,7 +6,7 @@ from fastapi import APIRouter, HTTPException
 import logging
 
 from models.api_models import EvaluateRequest, EvaluateResponse
-from modules.evaluation import QualityEvaluator
+from modules.evaluation import batched_evaluator
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +24,7 @@ async def evaluate_prompt(request: EvaluateRequest):
         logger.info(f"收到评估请求 - Prompt 长度: {len(request.prompt_text)}")
         
         # 执行质量评估
-        evaluator = QualityEvaluator()
-        evaluation = await evaluator.evaluate(
+        evaluation = await batched_evaluator.submit(
             request.prompt_text,
             request.intent
         )
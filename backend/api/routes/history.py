@@ -3,10 +3,14 @@
 提供 Prompt 历史版本查询
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional, Tuple
+import asyncio
 import logging
+import orjson
 
-from database import get_database
+from api.dependencies import get_version_manager
 from models.api_models import HistoryListResponse
 from modules.output import VersionManager
 
@@ -15,31 +19,60 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/history", tags=["history"])
 
 
+def _parse_cursor(cursor: Optional[str], skip: int) -> Optional[Tuple[datetime, str]]:
+    """
+    解析分页游标；游标分页与 skip 分页不能同时使用
+    
+    Args:
+        cursor: 分页游标（可选）
+        skip: 跳过数量
+        
+    Returns:
+        Optional[Tuple[datetime, str]]: 游标位置 (created_at, version_id)，未提供游标时为 None
+    """
+    if not cursor:
+        return None
+    if skip > 0:
+        raise HTTPException(status_code=400, detail="cursor 与 skip 不能同时使用")
+    try:
+        return VersionManager.decode_page_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/", response_model=HistoryListResponse)
 async def list_history(
     limit: int = Query(default=20, ge=1, le=100),
     skip: int = Query(default=0, ge=0),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    cursor: Optional[str] = Query(default=None, description="分页游标（上一页响应中的 next_cursor）"),
+    manager: VersionManager = Depends(get_version_manager)
 ):
     """
     列出历史记录
     
     返回最近的 Prompt 编译历史
     """
+    after = _parse_cursor(cursor, skip)
+    
     try:
-        manager = VersionManager(db)
-        
-        records = await manager.list_versions(limit=limit, skip=skip)
-        total = await manager.count_versions()
+        records, total = await asyncio.gather(
+            manager.list_versions(limit=limit, skip=skip, after=after),
+            manager.count_versions()
+        )
         
-        page = (skip // limit) + 1 if limit > 0 else 1
+        # 页码只对 skip 分页有意义
+        page = (skip // limit) + 1 if after is None else None
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = VersionManager.encode_page_cursor(records[-1].created_at, records[-1].version_id)
         
         return HistoryListResponse(
             success=True,
             records=records,
             total=total,
             page=page,
-            page_size=limit
+            page_size=limit,
+            next_cursor=next_cursor
         )
         
     except Exception as e:
@@ -47,14 +80,72 @@ async def list_history(
         raise HTTPException(status_code=500, detail=f"列出历史记录失败: {str(e)}")
 
 
+@router.get("/stream")
+async def stream_history(
+    limit: int = Query(default=20, ge=1, le=100),
+    skip: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="分页游标（上一页最后一条记录的 created_at|version_id）"),
+    manager: VersionManager = Depends(get_version_manager)
+):
+    """
+    流式列出历史记录
+    
+    以 NDJSON 格式逐条返回，每行一个版本
+    """
+    after = _parse_cursor(cursor, skip)
+    
+    async def generate():
+        try:
+            async for record in manager.iter_versions(limit=limit, skip=skip, after=after):
+                yield orjson.dumps(record) + b"\n"
+        except Exception as e:
+            logger.error(f"流式列出历史记录失败: {e}", exc_info=True)
+            raise
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/summary")
+async def list_history_summary(
+    limit: int = Query(default=20, ge=1, le=100),
+    skip: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="分页游标（上一页响应中的 next_cursor）"),
+    manager: VersionManager = Depends(get_version_manager)
+):
+    """
+    列出历史记录摘要
+    
+    只返回列表展示所需的字段（不含完整 Prompt），完整内容通过 /{version_id} 获取
+    """
+    after = _parse_cursor(cursor, skip)
+    
+    try:
+        records = await manager.list_versions_summary(limit=limit, skip=skip, after=after)
+        
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = VersionManager.encode_page_cursor(
+                records[-1]["created_at"], records[-1]["version_id"]
+            )
+        
+        return {
+            "success": True,
+            "records": records,
+            "next_cursor": next_cursor
+        }
+        
+    except Exception as e:
+        logger.error(f"列出历史记录摘要失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"列出历史记录摘要失败: {str(e)}")
+
+
 @router.get("/{version_id}")
 async def get_history(
     version_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: VersionManager = Depends(get_version_manager)
 ):
     """获取指定历史版本"""
     try:
-        manager = VersionManager(db)
         version = await manager.get_version(version_id)
         
         if not version:
@@ -73,11 +164,10 @@ async def get_history(
 async def search_history(
     q: str = Query(..., description="搜索关键词"),
     limit: int = Query(default=20, ge=1, le=100),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: VersionManager = Depends(get_version_manager)
 ):
     """搜索历史记录"""
     try:
-        manager = VersionManager(db)
         results = await manager.search_versions(q, limit=limit)
         
         return {
@@ -93,11 +183,10 @@ async def search_history(
 
 @router.get("/stats/summary")
 async def get_statistics(
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: VersionManager = Depends(get_version_manager)
 ):
     """获取历史统计信息"""
     try:
-        manager = VersionManager(db)
         stats = await manager.get_version_statistics()
         
         return {
@@ -13,6 +13,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["optimize"])
 
+_calculator = MetricsCalculator()
+_optimizer = AIOptimizer()
+
 
 @router.post("/optimize", response_model=OptimizeResponse)
 async def optimize_prompt(request: OptimizeRequest):
@@ -25,12 +28,10 @@ async def optimize_prompt(request: OptimizeRequest):
         logger.info(f"收到优化请求 - Prompt 长度: {len(request.prompt_text)}")
         
         # 1. 计算优化前的指标
-        calculator = MetricsCalculator()
-        metrics_before = calculator.calculate_metrics(request.prompt_text)
+        metrics_before = _calculator.calculate_metrics(request.prompt_text)
         
         # 2. AI 优化
-        optimizer = AIOptimizer()
-        optimization_result = await optimizer.optimize(
+        optimization_result = await _optimizer.optimize(
             request.prompt_text,
             optimization_level=request.optimization_level,
             focus_areas=request.focus_areas
@@ -40,7 +41,7 @@ async def optimize_prompt(request: OptimizeRequest):
         improvements = optimization_result.get("improvements", [])
         
         # 3. 计算优化后的指标
-        metrics_after = calculator.calculate_metrics(optimized_prompt)
+        metrics_after = _calculator.calculate_metrics(optimized_prompt)
         
         # 4. 构建响应
         response = OptimizeResponse(
@@ -3,45 +3,47 @@
 提供模板的 CRUD 操作
 """
 from fastapi import APIRouter, Depends, HTTPException
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi.responses import StreamingResponse
+from functools import lru_cache
+from typing import Optional
+import asyncio
 import logging
+import orjson
 
-from database import get_database
+from api.dependencies import get_template_manager
 from models.api_models import (
     TemplateCreateRequest,
     TemplateUpdateRequest,
     TemplateListResponse
 )
-from models.prompt_models import PromptTemplate
+from models.prompt_models import PromptTemplate, TaskType
 from modules.template_engine import TemplateManager
+from services.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/templates", tags=["templates"])
 
 
+@lru_cache(maxsize=64)
+def _to_task_type(task_type: Optional[str]) -> Optional[TaskType]:
+    """将查询参数转换为任务类型枚举（缓存）"""
+    return TaskType(task_type) if task_type else None
+
+
 @router.post("/", response_model=PromptTemplate)
 async def create_template(
     request: TemplateCreateRequest,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: TemplateManager = Depends(get_template_manager)
 ):
     """创建新模板"""
     try:
-        template = PromptTemplate(
-            name=request.name,
-            description=request.description,
-            role=request.role,
-            objective=request.objective,
-            constraints=request.constraints,
-            output_format=request.output_format,
-            context_vars=request.context_vars,
-            task_types=[t for t in request.task_types],
-            domains=request.domains,
-            tags=request.tags
-        )
+        # 请求体已通过校验，字段类型与模板一致，无需再次校验
+        template = PromptTemplate.model_construct(**request.model_dump())
         
-        manager = TemplateManager(db)
         created = await manager.create_template(template)
+        # 模板集合变化后，已缓存的编译结果可能选错模板
+        response_cache.clear()
         
         logger.info(f"模板创建成功: {created.template_id}")
         return created
@@ -57,25 +59,23 @@ async def list_templates(
     domain: str = None,
     limit: int = 50,
     skip: int = 0,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: TemplateManager = Depends(get_template_manager)
 ):
     """列出模板"""
     try:
-        manager = TemplateManager(db)
-        
         # 转换任务类型
-        from models.prompt_models import TaskType
-        task_type_enum = TaskType(task_type) if task_type else None
-        
-        templates = await manager.list_templates(
-            task_type=task_type_enum,
-            domain=domain,
-            limit=limit,
-            skip=skip
+        task_type_enum = _to_task_type(task_type)
+        
+        templates, total = await asyncio.gather(
+            manager.list_templates(
+                task_type=task_type_enum,
+                domain=domain,
+                limit=limit,
+                skip=skip
+            ),
+            manager.count_templates(task_type=task_type_enum, domain=domain)
         )
         
-        total = len(templates)  # 简化版本，实际应该查询总数
-        
         return TemplateListResponse(
             success=True,
             templates=templates,
@@ -87,14 +87,47 @@ async def list_templates(
         raise HTTPException(status_code=500, detail=f"列出模板失败: {str(e)}")
 
 
+@router.get("/stream")
+async def stream_templates(
+    task_type: str = None,
+    domain: str = None,
+    limit: int = 50,
+    skip: int = 0,
+    manager: TemplateManager = Depends(get_template_manager)
+):
+    """
+    流式列出模板
+    
+    以 NDJSON 格式逐条返回，每行一个模板
+    """
+    try:
+        task_type_enum = _to_task_type(task_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的任务类型: {task_type}")
+    
+    async def generate():
+        try:
+            async for template in manager.iter_templates(
+                task_type=task_type_enum,
+                domain=domain,
+                limit=limit,
+                skip=skip
+            ):
+                yield orjson.dumps(template) + b"\n"
+        except Exception as e:
+            logger.error(f"流式列出模板失败: {e}", exc_info=True)
+            raise
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/{template_id}", response_model=PromptTemplate)
 async def get_template(
     template_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: TemplateManager = Depends(get_template_manager)
 ):
     """获取指定模板"""
     try:
-        manager = TemplateManager(db)
         template = await manager.get_template(template_id)
         
         if not template:
@@ -113,17 +146,12 @@ async def get_template(
 async def update_template(
     template_id: str,
     request: TemplateUpdateRequest,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: TemplateManager = Depends(get_template_manager)
 ):
     """更新模板"""
     try:
-        manager = TemplateManager(db)
-        
-        # 构建更新字典（仅包含非 None 的字段）
-        updates = {}
-        for field, value in request.model_dump().items():
-            if value is not None:
-                updates[field] = value
+        # 构建更新字典（仅包含客户端显式提供且非 None 的字段）
+        updates = request.model_dump(exclude_none=True, exclude_unset=True)
         
         if not updates:
             raise HTTPException(status_code=400, detail="没有提供更新字段")
@@ -133,6 +161,7 @@ async def update_template(
         if not updated:
             raise HTTPException(status_code=404, detail="模板不存在")
         
+        response_cache.clear()
         logger.info(f"模板更新成功: {template_id}")
         return updated
         
@@ -146,16 +175,16 @@ async def update_template(
 @router.delete("/{template_id}")
 async def delete_template(
     template_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    manager: TemplateManager = Depends(get_template_manager)
 ):
     """删除模板"""
     try:
-        manager = TemplateManager(db)
         success = await manager.delete_template(template_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="模板不存在")
         
+        response_cache.clear()
         logger.info(f"模板删除成功: {template_id}")
         return {"success": True, "message": "模板已删除"}
         
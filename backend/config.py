@@ -12,15 +12,70 @@ class Settings(BaseSettings):
     # MongoDB 配置
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "prompt_compiler"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    # 空闲连接保留时间（毫秒），超时后关闭，连接池在低峰期收缩到 MIN_POOL_SIZE
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # zstd 需要安装 zstandard，zlib 为标准库内置，服务端不支持时自动回退
+    MONGODB_COMPRESSORS: str = "zstd,zlib"
+    # 回退到 zlib 时的压缩级别：较低级别压缩率接近，CPU 开销明显更小
+    MONGODB_ZLIB_COMPRESSION_LEVEL: int = 3
+    # 历史记录列表/检索优先读取从节点（副本集部署时分担主节点读压力）
+    MONGODB_SECONDARY_READS: bool = False
     
     # 智谱 AI 配置
     ZHIPU_API_KEY: str
+    ZHIPU_BASE_URL: str = "https://open.bigmodel.cn/api/paas/v4"
+    # 单次请求超时（秒）；建立连接单独限时，网络不通时尽快失败
+    ZHIPU_TIMEOUT: float = 60
+    ZHIPU_CONNECT_TIMEOUT: float = 10
+    # HTTP 连接池上限：并发请求数与保持的空闲长连接数
+    ZHIPU_MAX_CONNECTIONS: int = 64
+    ZHIPU_MAX_KEEPALIVE_CONNECTIONS: int = 32
+    # 限流、服务端临时错误和连接错误时的最大尝试次数（含首次）
+    ZHIPU_MAX_ATTEMPTS: int = 4
+    # 重试的总时间预算（秒）：从首次请求开始计时，超过后不再发起新的尝试
+    ZHIPU_RETRY_BUDGET: float = 30
+    # LLM 调用结果缓存（相同输入直接返回）：条目数与有效期（秒）
+    LLM_CACHE_MAXSIZE: int = 1024
+    LLM_CACHE_TTL: int = 3600
     
     # 服务器配置
     SERVER_HOST: str = "0.0.0.0"
     SERVER_PORT: int = 8000
     DEBUG: bool = True
     
+    # 编译响应缓存配置
+    RESPONSE_CACHE_MAXSIZE: int = 1024
+    RESPONSE_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_MIN_KEYWORD_OVERLAP: int = 3
+    
+    # 历史记录总数缓存有效期（秒）
+    HISTORY_COUNT_CACHE_TTL: float = 10
+    
+    # 历史记录保留天数，由 MongoDB TTL 索引在后台过期删除；0 表示永久保留
+    HISTORY_RETENTION_DAYS: int = 0
+    
+    # 质量评估批处理配置
+    EVAL_BATCH_MAX_SIZE: int = 16
+    EVAL_BATCH_FLUSH_MS: float = 20
+    
+    # 意图提取批处理配置
+    INTENT_BATCH_MAX_SIZE: int = 8
+    INTENT_BATCH_FLUSH_MS: float = 20
+    
+    # 意图置信度与用户输入的结构评分均超过阈值时，MEDIUM 级别跳过 AI 优化与 LLM 评估，评分改由本地指标计算（阈值设为 1 即关闭）
+    STRUCTURED_SKIP_CONFIDENCE: float = 0.9
+    STRUCTURED_SKIP_SCORE: float = 0.85
+    
+    # 超过该长度（字符）的文本才将同步 CPU 计算（规则校验、格式化）放到线程池执行；
+    # 实测 1.4 万字符的规则校验约 0.35ms，更短的文本切换线程的开销反而更大
+    CPU_OFFLOAD_THRESHOLD: int = 20000
+    
+    # 健康检查数据库 ping 结果缓存时间（秒）
+    HEALTH_PING_CACHE_SECONDS: float = 2.0
+    
     # CORS 配置
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
     
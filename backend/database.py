@@ -4,6 +4,7 @@ MongoDB 数据库连接与操作封装
 """
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from typing import Optional
+import asyncio
 import logging
 
 try:
@@ -13,6 +14,13 @@ except ImportError:
     class Settings:
         MONGODB_URL = "mongodb://localhost:27017"
         MONGODB_DB_NAME = "prompt_compiler"
+        MONGODB_MAX_POOL_SIZE = 100
+        MONGODB_MIN_POOL_SIZE = 10
+        MONGODB_MAX_IDLE_TIME_MS = 300000
+        MONGODB_SERVER_SELECTION_TIMEOUT_MS = 5000
+        MONGODB_COMPRESSORS = "zstd,zlib"
+        MONGODB_ZLIB_COMPRESSION_LEVEL = 3
+        HISTORY_RETENTION_DAYS = 0
     settings = Settings()
 
 logger = logging.getLogger(__name__)
@@ -28,7 +36,16 @@ class Database:
     async def connect(cls):
         """建立数据库连接"""
         try:
-            cls.client = AsyncIOMotorClient(settings.MONGODB_URL)
+            cls.client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                compressors=settings.MONGODB_COMPRESSORS,
+                zlibCompressionLevel=settings.MONGODB_ZLIB_COMPRESSION_LEVEL,
+                retryWrites=True
+            )
             cls.db = cls.client[settings.MONGODB_DB_NAME]
             
             # 测试连接
@@ -38,6 +55,12 @@ class Database:
             # 创建索引
             await cls._create_indexes()
             
+            # 为旧的历史记录补齐小写输入字段
+            await cls._backfill_lowercase_input()
+            
+            # 按配置的保留天数设置历史记录过期
+            await cls._configure_history_ttl(settings.HISTORY_RETENTION_DAYS)
+            
         except Exception as e:
             logger.error(f"MongoDB 连接失败: {e}")
             raise
@@ -55,19 +78,90 @@ class Database:
         if cls.db is None:
             return
         
-        # 为模板集合创建索引
-        await cls.db.templates.create_index("template_id", unique=True)
-        await cls.db.templates.create_index("created_at")
+        # 各索引互不依赖，并发创建
+        await asyncio.gather(
+            # 模板集合：按ID查找；按任务类型筛选并按创建时间排序
+            # task_types 与 domains 都是数组，MongoDB 不允许两个数组字段出现在同一复合索引中，
+            # 领域条件在索引命中的结果上过滤
+            cls.db.templates.create_index("template_id", unique=True),
+            cls.db.templates.create_index("created_at"),
+            cls.db.templates.create_index([("task_types", 1), ("created_at", -1)]),
+            # 最佳模板查找：按任务类型筛选后按评分、使用次数排序取第一条
+            cls.db.templates.create_index(
+                [("task_types", 1), ("avg_quality_score", -1), ("usage_count", -1), ("created_at", -1)]
+            ),
+            
+            # 历史记录：按ID查找；按创建时间倒序分页；按原始输入查找；按优化级别统计
+            cls.db.history.create_index("version_id", unique=True),
+            cls.db.history.create_index([("created_at", -1), ("version_id", -1)]),
+            cls.db.history.create_index([("original_input", 1), ("created_at", -1)]),
+            # 原始输入的小写副本，用于不区分大小写的前缀检索
+            cls.db.history.create_index([("original_input_lc", 1), ("created_at", -1)]),
+            cls.db.history.create_index("optimization_level"),
+            # 全文检索；内容以中文为主，不使用语言相关的词干和停用词
+            cls.db.history.create_index(
+                [("full_prompt", "text"), ("original_input", "text")],
+                default_language="none"
+            ),
+            
+            # 反馈记录：按 ID 查询、按版本查询并按时间排序
+            cls.db.feedback.create_index("feedback_id", unique=True),
+            cls.db.feedback.create_index([("prompt_version_id", 1), ("created_at", -1)]),
+            cls.db.feedback.create_index("created_at"),
+            # 按评分筛选 Prompt 时可使用覆盖索引
+            cls.db.feedback.create_index([("rating", 1), ("prompt_version_id", 1)])
+        )
         
-        # 为历史记录创建索引
-        await cls.db.history.create_index("version_id", unique=True)
-        await cls.db.history.create_index("created_at")
+        logger.info("数据库索引创建完成")
+    
+    @classmethod
+    async def _configure_history_ttl(cls, days: int):
+        """
+        配置历史记录的 TTL 索引（created_at 单字段索引）
         
-        # 为反馈记录创建索引
-        await cls.db.feedback.create_index("prompt_id")
-        await cls.db.feedback.create_index("created_at")
+        Args:
+            days: 保留天数，0 表示不过期
+        """
+        if cls.db is None:
+            return
         
-        logger.info("数据库索引创建完成")
+        index_name = "created_at_1"
+        existing = (await cls.db.history.index_information()).get(index_name)
+        
+        if days <= 0:
+            # 关闭保留期限：移除已有的 TTL 索引（列表查询使用 created_at 复合索引）
+            if existing and "expireAfterSeconds" in existing:
+                await cls.db.history.drop_index(index_name)
+                logger.info("已关闭历史记录自动过期")
+            return
+        
+        seconds = days * 86400
+        if existing is None:
+            await cls.db.history.create_index("created_at", expireAfterSeconds=seconds)
+        elif existing.get("expireAfterSeconds") != seconds:
+            # 已有同名索引（包括早期版本创建的普通 created_at 索引）时原地修改过期时间
+            await cls.db.command(
+                "collMod", "history",
+                index={"name": index_name, "expireAfterSeconds": seconds}
+            )
+        else:
+            return
+        
+        logger.info(f"历史记录保留 {days} 天，过期记录由 TTL 索引在后台删除")
+    
+    @classmethod
+    async def _backfill_lowercase_input(cls):
+        """为缺少 original_input_lc 字段的历史记录补齐该字段（幂等，补齐后为空操作）"""
+        if cls.db is None:
+            return
+        
+        # $toLower 只对 ASCII 字符有明确定义，与写入时的 str.lower() 在其余字符上可能不同
+        result = await cls.db.history.update_many(
+            {"original_input_lc": {"$exists": False}},
+            [{"$set": {"original_input_lc": {"$toLower": "$original_input"}}}]
+        )
+        if result.modified_count:
+            logger.info(f"已为 {result.modified_count} 条历史记录补齐小写输入字段")
     
     @classmethod
     def get_db(cls) -> AsyncIOMotorDatabase:
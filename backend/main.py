@@ -2,14 +2,20 @@
 FastAPI 主程序
 Prompt Compiler 系统的入口文件
 """
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from config import settings
 from database import Database
+from modules.evaluation import batched_evaluator
+from modules.input_layer import batched_intent_extractor
+from services.zhipu_service import get_shared_service
 from api.routes import compile, optimize, evaluate, templates, history
 
 # 配置日志
@@ -31,11 +37,18 @@ async def lifespan(app: FastAPI):
         await Database.connect()
         logger.info("数据库连接成功")
         
+        # 启动意图提取与质量评估批处理
+        batched_intent_extractor.start()
+        batched_evaluator.start()
+        
         yield
         
     finally:
         # 关闭时
         logger.info("正在关闭 Prompt Compiler 系统...")
+        await batched_intent_extractor.stop()
+        await batched_evaluator.stop()
+        await get_shared_service().aclose()
         await Database.disconnect()
         logger.info("数据库连接已关闭")
 
@@ -45,7 +58,8 @@ app = FastAPI(
     title="Prompt Compiler API",
     description="基于语义编译与自适应优化的 Prompt 输出系统",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # 配置 CORS
@@ -57,6 +71,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的响应（以中文文本为主的 JSON 压缩率较高）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # 注册路由
 app.include_router(compile.router)
@@ -87,13 +104,34 @@ async def root():
 
 
 # 健康检查
+# 最近一次成功 ping 数据库的时间（monotonic），短时间内的检查直接复用
+_last_ping_ok: float = 0.0
+_ping_lock = asyncio.Lock()
+
+
+async def _ping_database():
+    """ping 数据库，成功结果缓存 HEALTH_PING_CACHE_SECONDS 秒"""
+    global _last_ping_ok
+    
+    if time.monotonic() - _last_ping_ok < settings.HEALTH_PING_CACHE_SECONDS:
+        return
+    
+    async with _ping_lock:
+        # 等待锁期间其他请求可能已完成 ping
+        if time.monotonic() - _last_ping_ok < settings.HEALTH_PING_CACHE_SECONDS:
+            return
+        
+        db = Database.get_db()
+        await db.command('ping')
+        _last_ping_ok = time.monotonic()
+
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
     try:
         # 检查数据库连接
-        db = Database.get_db()
-        await db.command('ping')
+        await _ping_database()
         
         return {
             "status": "healthy",
@@ -102,7 +140,7 @@ async def health_check():
         }
     except Exception as e:
         logger.error(f"健康检查失败: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
@@ -116,7 +154,7 @@ async def health_check():
 async def global_exception_handler(request, exc):
     """全局异常处理器"""
     logger.error(f"未处理的异常: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -128,13 +166,22 @@ async def global_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
     
+    # uvloop / httptools 由 uvicorn[standard] 提供（Windows 上没有 uvloop），缺失时回退到纯 Python 实现
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    
     uvicorn.run(
         "main:app",
         host=settings.SERVER_HOST,
         port=settings.SERVER_PORT,
         reload=settings.DEBUG,
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        # 生产环境关闭访问日志
+        access_log=settings.DEBUG,
         log_level="info" if settings.DEBUG else "warning"
     )
 
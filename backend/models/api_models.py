@@ -4,7 +4,7 @@ API 请求和响应模型
 """
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
-from .prompt_models import OptimizationLevel, CompiledPrompt, PromptTemplate, IntentResult
+from .prompt_models import OptimizationLevel, CompiledPrompt, PromptTemplate, IntentResult, TaskType
 from .evaluation_models import QualityMetrics, EvaluationResult
 
 
@@ -19,6 +19,7 @@ class CompileRequest(BaseModel):
         description="优化级别"
     )
     auto_evaluate: bool = Field(default=True, description="是否自动评估质量")
+    include_formatted: bool = Field(default=False, description="是否返回格式化输出（JSON/YAML）")
     
     class Config:
         json_schema_extra = {
@@ -26,7 +27,8 @@ class CompileRequest(BaseModel):
                 "user_input": "帮我写一个分析财报的AI助手",
                 "template_id": None,
                 "optimization_level": "high",
-                "auto_evaluate": True
+                "auto_evaluate": True,
+                "include_formatted": False
             }
         }
 
@@ -39,7 +41,10 @@ class CompileResponse(BaseModel):
     suggestions: List[str] = Field(default_factory=list, description="优化建议")
     
     # 格式化输出
-    formatted_output: Dict[str, Any] = Field(description="格式化后的输出（JSON/YAML）")
+    formatted_output: Optional[Dict[str, Any]] = Field(
+        None,
+        description="格式化后的输出（JSON/YAML），仅在请求 include_formatted 时返回"
+    )
 
 
 # ============ 优化相关 API ============
@@ -92,7 +97,7 @@ class TemplateCreateRequest(BaseModel):
     constraints: List[str] = Field(default_factory=list)
     output_format: str
     context_vars: Dict[str, str] = Field(default_factory=dict)
-    task_types: List[str] = Field(default_factory=list)
+    task_types: List[TaskType] = Field(default_factory=list)
     domains: List[str] = Field(default_factory=list)
     tags: List[str] = Field(default_factory=list)
 
@@ -123,8 +128,9 @@ class HistoryListResponse(BaseModel):
     success: bool
     records: List[CompiledPrompt]
     total: int
-    page: int
+    page: Optional[int] = Field(default=None, description="页码（按 skip 分页时有效，游标分页时为空）")
     page_size: int
+    next_cursor: Optional[str] = Field(default=None, description="下一页的分页游标，没有更多记录时为空")
 
 
 # ============ 通用响应 ============
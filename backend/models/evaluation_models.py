@@ -5,7 +5,16 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 from datetime import datetime
-import uuid
+from .id_generator import generate_id
+
+try:
+    from math import sumprod
+except ImportError:  # Python < 3.12
+    def sumprod(p, q):
+        return sum(a * b for a, b in zip(p, q))
+
+# 综合评分权重：结构、一致性、完整度、清晰度
+_OVERALL_WEIGHTS = (0.25, 0.30, 0.25, 0.20)
 
 
 class QualityMetrics(BaseModel):
@@ -18,24 +27,21 @@ class QualityMetrics(BaseModel):
     
     def calculate_overall(self):
         """计算综合评分（加权平均）"""
-        weights = {
-            'structure': 0.25,
-            'consistency': 0.30,
-            'completeness': 0.25,
-            'clarity': 0.20
-        }
-        self.overall_score = (
-            self.structure_score * weights['structure'] +
-            self.consistency_score * weights['consistency'] +
-            self.completeness_score * weights['completeness'] +
-            self.clarity_score * weights['clarity']
+        self.overall_score = sumprod(
+            (
+                self.structure_score,
+                self.consistency_score,
+                self.completeness_score,
+                self.clarity_score
+            ),
+            _OVERALL_WEIGHTS
         )
         return self.overall_score
 
 
 class EvaluationResult(BaseModel):
     """评估结果"""
-    evaluation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    evaluation_id: str = Field(default_factory=generate_id)
     prompt_version_id: str = Field(description="被评估的 Prompt 版本ID")
     
     # 质量指标
@@ -56,7 +62,7 @@ class EvaluationResult(BaseModel):
 
 class FeedbackRecord(BaseModel):
     """反馈记录"""
-    feedback_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    feedback_id: str = Field(default_factory=generate_id)
     prompt_version_id: str = Field(description="关联的 Prompt 版本ID")
     
     # 反馈内容
@@ -80,7 +86,7 @@ class FeedbackRecord(BaseModel):
 
 class ComparisonResult(BaseModel):
     """Prompt 对比结果"""
-    comparison_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    comparison_id: str = Field(default_factory=generate_id)
     
     # 对比的两个版本
     version_a_id: str
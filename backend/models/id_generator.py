@@ -0,0 +1,62 @@
+"""
+ID 生成器
+批量读取随机字节生成 UUID4，减少每次生成 ID 时的系统调用
+"""
+import os
+import threading
+import uuid
+
+# 每批生成的 UUID 数量
+_BATCH_SIZE = 256
+_UUID_BYTES = 16
+
+
+class _UUIDPool:
+    """UUID4 池：一次读取 4KB 随机字节，切分为 256 个 UUID"""
+
+    def __init__(self, batch: int = _BATCH_SIZE):
+        """
+        初始化 UUID 池
+
+        Args:
+            batch: 每批生成的 UUID 数量
+        """
+        self._batch = batch
+        self.reset()
+
+    def reset(self) -> None:
+        """丢弃已读取的随机字节并重建锁（fork 后在子进程中调用）"""
+        self._buf = b""
+        self._pos = 0
+        # 模型可能在 to_thread 的工作线程中创建
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        """
+        获取一个 UUID4 字符串
+
+        Returns:
+            str: 与 str(uuid.uuid4()) 格式一致的 ID
+        """
+        with self._lock:
+            if self._pos >= len(self._buf):
+                self._buf = os.urandom(_UUID_BYTES * self._batch)
+                self._pos = 0
+            raw = bytearray(self._buf[self._pos:self._pos + _UUID_BYTES])
+            self._pos += _UUID_BYTES
+
+        # 设置版本号（4）与变体（RFC 4122）
+        raw[6] = (raw[6] & 0x0F) | 0x40
+        raw[8] = (raw[8] & 0x3F) | 0x80
+        return str(uuid.UUID(bytes=bytes(raw)))
+
+
+_pool = _UUIDPool()
+
+# fork 出的子进程（如 gunicorn --preload 的 worker）会继承父进程已读取的随机字节，
+# 不重置则各进程生成相同的 ID
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_pool.reset)
+
+# 供 Pydantic Field(default_factory=...) 使用
+generate_id = _pool.get
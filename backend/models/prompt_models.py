@@ -6,7 +6,7 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from enum import Enum
-import uuid
+from .id_generator import generate_id
 
 
 class OptimizationLevel(str, Enum):
@@ -40,7 +40,7 @@ class IntentResult(BaseModel):
 
 class PromptTemplate(BaseModel):
     """Prompt 模板"""
-    template_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="模板唯一标识")
+    template_id: str = Field(default_factory=generate_id, description="模板唯一标识")
     name: str = Field(description="模板名称")
     description: Optional[str] = Field(None, description="模板描述")
     
@@ -69,7 +69,7 @@ class PromptTemplate(BaseModel):
 
 class CompiledPrompt(BaseModel):
     """编译后的 Prompt"""
-    version_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="版本唯一标识")
+    version_id: str = Field(default_factory=generate_id, description="版本唯一标识")
     
     # 原始输入
     original_input: str = Field(description="用户原始输入")
@@ -5,8 +5,10 @@ AI 优化器
 import logging
 from typing import Optional, List
 
-from services.zhipu_service import ZhipuAIService
+from config import settings
+from services.zhipu_service import get_shared_service
 from models.prompt_models import IntentResult, OptimizationLevel
+from .rule_engine import RuleEngine
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,44 @@ class AIOptimizer:
     
     def __init__(self):
         """初始化 AI 优化器"""
-        self.zhipu_service = ZhipuAIService()
+        self.zhipu_service = get_shared_service()
+        # 因输入已足够结构化而跳过优化的次数，供离线核查
+        self.skipped_count = 0
+    
+    def should_skip(
+        self,
+        user_input: str,
+        intent: IntentResult,
+        optimization_level: OptimizationLevel
+    ) -> bool:
+        """
+        判断是否跳过 AI 优化（仅 MEDIUM 级别，意图置信度高且用户输入本身已足够结构化时）
+        
+        组合后的 Prompt 总是包含各结构部分，因此按标准化后的用户输入评分
+        
+        Args:
+            user_input: 标准化后的用户输入
+            intent: 意图信息
+            optimization_level: 优化级别
+            
+        Returns:
+            bool: 是否跳过
+        """
+        if optimization_level != OptimizationLevel.MEDIUM:
+            return False
+        if intent.confidence <= settings.STRUCTURED_SKIP_CONFIDENCE:
+            return False
+        
+        structure_score = RuleEngine.calculate_structure_score(user_input)
+        if structure_score <= settings.STRUCTURED_SKIP_SCORE:
+            return False
+        
+        self.skipped_count += 1
+        logger.info(
+            f"用户输入已足够结构化，跳过 AI 优化 - 置信度: {intent.confidence:.2f}，"
+            f"结构评分: {structure_score:.2f}，累计跳过: {self.skipped_count}"
+        )
+        return True
     
     async def optimize(
         self,
@@ -53,6 +92,34 @@ class AIOptimizer:
         logger.info(f"Prompt 优化完成，改进点数量: {len(result.get('improvements', []))}")
         return result
     
+    async def optimize_and_evaluate(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult] = None,
+        optimization_level: OptimizationLevel = OptimizationLevel.MEDIUM
+    ) -> dict:
+        """
+        优化 Prompt，并在同一次 LLM 调用中评估优化结果
+        
+        Args:
+            prompt_text: 原始 Prompt 文本
+            intent: 意图信息
+            optimization_level: 优化级别
+            
+        Returns:
+            dict: 优化结果；评估成功时包含 evaluation（包含 metrics 的评估结果）
+        """
+        logger.info(f"开始优化并评估 Prompt，优化级别: {optimization_level}")
+        
+        result = await self.zhipu_service.prompt_optimization_with_evaluation(
+            prompt_text=prompt_text,
+            intent=intent,
+            focus_areas=self._get_default_focus_areas(optimization_level)
+        )
+        
+        logger.info(f"Prompt 优化完成，改进点数量: {len(result.get('improvements', []))}")
+        return result
+    
     def _get_default_focus_areas(self, level: OptimizationLevel) -> List[str]:
         """
         根据优化级别获取默认的优化重点
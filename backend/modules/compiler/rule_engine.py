@@ -4,10 +4,26 @@
 """
 import re
 import logging
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 校验与修复使用的正则，模块加载时编译一次
+_LIST_ITEM_PATTERN = re.compile(r'^\s*[\d\-\*•]+')
+_EXCESS_BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+_HEADING_PATTERN = re.compile(r'^#+\s*', re.MULTILINE)
+
+# 复杂度评分：标题、列表行用正则计数，约束词用 str.count 计数
+# 实测分别扫描比合并成一个带命名分组的交替正则更快（CPython re 对交替分支逐个尝试）
+_SECTION_PATTERN = re.compile(r'^#+', re.MULTILINE)
+_LIST_LINE_PATTERN = re.compile(r'^\s*[\d\-\*]', re.MULTILINE)
+_CONSTRAINT_WORDS = ("必须", "不能", "应该", "需要", "禁止")
+
+# 结构评分：Prompt 中出现的结构部分标记
+_STRUCTURE_MARKER_PATTERN = re.compile(r'角色|目标|约束|输出格式')
+_STRUCTURE_MARKER_COUNT = 4
+
 
 class ValidationResult:
     """校验结果"""
@@ -44,6 +60,12 @@ class RuleEngine:
     # 结构必需的关键词
     REQUIRED_SECTIONS = ["角色", "目标", "输出"]
     
+    # 模糊词汇
+    VAGUE_WORDS = ["可能", "大概", "也许", "应该", "尽量", "试试"]
+    
+    # 明确的动作动词
+    ACTION_VERBS = ["分析", "生成", "提取", "转换", "总结", "评估", "创建"]
+    
     def __init__(self):
         """初始化规则引擎"""
         pass
@@ -102,11 +124,12 @@ class RuleEngine:
     def _check_structure(self, text: str, result: ValidationResult):
         """结构检查"""
         # 检查是否包含基本结构
-        missing_sections = []
-        
-        for section in self.REQUIRED_SECTIONS:
-            if section not in text and section.lower() not in text.lower():
-                missing_sections.append(section)
+        # 小写文本只计算一次，不再在每个部分的判断中重复生成
+        lowered = text.lower()
+        missing_sections = [
+            section for section in self.REQUIRED_SECTIONS
+            if section not in text and section.lower() not in lowered
+        ]
         
         if missing_sections:
             result.add_warning(f"缺少推荐的结构部分: {', '.join(missing_sections)}")
@@ -116,44 +139,48 @@ class RuleEngine:
     
     def _check_forbidden_words(self, text: str, result: ValidationResult):
         """禁词过滤"""
-        found_forbidden = []
-        
-        for word in self.FORBIDDEN_WORDS:
-            if word in text:
-                found_forbidden.append(word)
+        # 按配置顺序输出，保持提示信息稳定
+        found_forbidden = [word for word in self.FORBIDDEN_WORDS if word in text]
         
         if found_forbidden:
             result.add_error(f"包含禁用词汇: {', '.join(found_forbidden)}")
     
     def _check_clarity(self, text: str, result: ValidationResult):
         """清晰度检查"""
-        # 检查是否有过多的模糊词汇
-        vague_words = ["可能", "大概", "也许", "应该", "尽量", "试试"]
-        vague_count = sum(text.count(word) for word in vague_words)
+        # 检查是否有过多的模糊词汇（各词互不包含，逐词计数与整体扫描结果一致）
+        vague_count = sum(text.count(word) for word in self.VAGUE_WORDS)
         
         if vague_count > 3:
             result.add_warning(f"包含过多模糊词汇（{vague_count} 个），建议使用更明确的表达")
             result.add_suggestion("使用 '必须'、'一定'、'明确' 等词替代模糊表达")
         
         # 检查是否有明确的动词
-        action_verbs = ["分析", "生成", "提取", "转换", "总结", "评估", "创建"]
-        has_action = any(verb in text for verb in action_verbs)
+        has_action = any(verb in text for verb in self.ACTION_VERBS)
         
         if not has_action:
             result.add_suggestion("建议使用明确的动作动词来描述任务")
     
     def _check_format(self, text: str, result: ValidationResult):
         """格式检查"""
-        # 检查是否有合理的段落结构
-        lines = text.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
+        # 单遍扫描：统计非空行数，同时检查是否有编号或列表
+        non_empty_count = 0
+        has_list = False
+        
+        for line in text.split('\n'):
+            if not line.strip():
+                continue
+            non_empty_count += 1
+            if not has_list and _LIST_ITEM_PATTERN.match(line):
+                has_list = True
+            # 已有列表且不止一行时，后续行不再影响结论
+            if has_list and non_empty_count > 1:
+                break
         
-        if len(non_empty_lines) == 1:
+        # 检查是否有合理的段落结构
+        if non_empty_count == 1:
             result.add_suggestion("建议使用分段或标题来组织内容，提高可读性")
         
-        # 检查是否有编号或列表
-        has_list = any(re.match(r'^\s*[\d\-\*•]+', line) for line in lines)
-        if not has_list and len(non_empty_lines) > 5:
+        if not has_list and non_empty_count > 5:
             result.add_suggestion("对于复杂内容，建议使用编号列表组织信息")
     
     def fix_common_issues(self, text: str) -> str:
@@ -167,10 +194,10 @@ class RuleEngine:
             str: 修复后的文本
         """
         # 移除多余空行
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = _EXCESS_BLANK_LINES_PATTERN.sub('\n\n', text)
         
         # 统一标题格式
-        text = re.sub(r'^#+\s*', '# ', text, flags=re.MULTILINE)
+        text = _HEADING_PATTERN.sub('# ', text)
         
         # 移除行尾空白
         text = '\n'.join(line.rstrip() for line in text.split('\n'))
@@ -178,10 +205,40 @@ class RuleEngine:
         logger.info("常见问题已自动修复")
         return text.strip()
     
-    def calculate_complexity_score(self, text: str) -> float:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def calculate_structure_score(text: str) -> float:
+        """
+        计算 Prompt 结构完整度评分（0-1），用于判断是否已足够结构化
+        
+        Args:
+            text: Prompt 文本
+            
+        Returns:
+            float: 结构评分，越高越完整
+        """
+        # 结构部分标记：角色、目标、约束、输出格式
+        markers = {match.group() for match in _STRUCTURE_MARKER_PATTERN.finditer(text)}
+        score = 0.6 * len(markers) / _STRUCTURE_MARKER_COUNT
+        
+        # 长度适中
+        if 50 <= len(text) <= 2000:
+            score += 0.2
+        
+        # 多行分段
+        if sum(1 for line in text.split('\n') if line.strip()) >= 4:
+            score += 0.2
+        
+        return min(score, 1.0)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def calculate_complexity_score(text: str) -> float:
         """
         计算 Prompt 复杂度评分（0-1）
         
+        结果只取决于文本本身，按文本缓存，同一 Prompt 重复评分时直接返回
+        
         Args:
             text: Prompt 文本
             
@@ -200,16 +257,16 @@ class RuleEngine:
             score += 0.1
         
         # 结构因素
-        has_sections = len(re.findall(r'^#+', text, re.MULTILINE))
-        score += min(has_sections * 0.1, 0.3)
+        section_count = len(_SECTION_PATTERN.findall(text))
+        score += min(section_count * 0.1, 0.3)
         
         # 列表和条件因素
-        has_lists = len(re.findall(r'^\s*[\d\-\*]', text, re.MULTILINE))
-        score += min(has_lists * 0.05, 0.2)
+        list_count = len(_LIST_LINE_PATTERN.findall(text))
+        score += min(list_count * 0.05, 0.2)
         
         # 约束条件数量
-        constraints = len(re.findall(r'(必须|不能|应该|需要|禁止)', text))
-        score += min(constraints * 0.05, 0.2)
+        constraint_count = sum(text.count(word) for word in _CONSTRAINT_WORDS)
+        score += min(constraint_count * 0.05, 0.2)
         
         return min(score, 1.0)
 
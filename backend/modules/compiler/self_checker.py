@@ -2,24 +2,99 @@
 自检机制
 验证优化后的 Prompt 质量
 """
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from services.zhipu_service import ZhipuAIService
+from config import settings
+from services.zhipu_service import get_shared_service
 from models.prompt_models import IntentResult
 from models.evaluation_models import QualityMetrics
-from .rule_engine import RuleEngine
+from .rule_engine import RuleEngine, ValidationResult
 
 logger = logging.getLogger(__name__)
 
 
+def _evaluation_key(prompt_text: str, intent: Optional[IntentResult]) -> bytes:
+    """计算进行中评估任务的键"""
+    digest = hashlib.blake2b(prompt_text.encode("utf-8"), digest_size=16)
+    if intent is not None:
+        digest.update(intent.model_dump_json().encode("utf-8"))
+    return digest.digest()
+
+
 class SelfChecker:
     """自检器类"""
     
     def __init__(self):
         """初始化自检器"""
-        self.zhipu_service = ZhipuAIService()
+        self.zhipu_service = get_shared_service()
         self.rule_engine = RuleEngine()
+        # 相同 (Prompt, 意图) 进行中的评估任务；评估结果由智谱 AI 服务缓存
+        self._eval_inflight: Dict[bytes, asyncio.Future] = {}
+    
+    async def _evaluate(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult]
+    ) -> Dict[str, Any]:
+        """
+        质量评估
+        
+        相同输入的并发请求共享同一次 LLM 调用（结果缓存由智谱 AI 服务负责）
+        
+        Args:
+            prompt_text: 待评估的 Prompt
+            intent: 意图信息
+            
+        Returns:
+            Dict: 评估结果
+        """
+        key = _evaluation_key(prompt_text, intent)
+        
+        pending = self._eval_inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        pending = asyncio.ensure_future(
+            self.zhipu_service.quality_evaluation(prompt_text, intent)
+        )
+        self._eval_inflight[key] = pending
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            self._eval_inflight.pop(key, None)
+    
+    def prime(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult],
+        evaluation: Dict[str, Any]
+    ):
+        """
+        写入已有的评估结果（如优化时一并得到的评估），后续自检直接复用
+        
+        Args:
+            prompt_text: 被评估的 Prompt
+            intent: 意图信息
+            evaluation: 评估结果（包含 metrics）
+        """
+        self.zhipu_service.store_evaluation(prompt_text, intent, evaluation)
+    
+    async def _validate(self, prompt_text: str) -> ValidationResult:
+        """
+        规则校验，文本较长时放到线程池避免阻塞事件循环
+        
+        Args:
+            prompt_text: 待校验的 Prompt
+            
+        Returns:
+            ValidationResult: 校验结果
+        """
+        if len(prompt_text) > settings.CPU_OFFLOAD_THRESHOLD:
+            return await asyncio.to_thread(self.rule_engine.validate, prompt_text)
+        return self.rule_engine.validate(prompt_text)
     
     async def check(
         self,
@@ -40,17 +115,27 @@ class SelfChecker:
         """
         logger.info("开始自检优化后的 Prompt")
         
-        # 1. 规则检查
-        validation_result = self.rule_engine.validate(optimized_prompt)
-        
-        # 2. AI 质量评估
-        evaluation_result = await self.zhipu_service.quality_evaluation(
-            optimized_prompt,
-            intent
-        )
+        # 1-2. 质量评估与规则检查并发执行：评估请求先发出，规则校验在等待 LLM 响应期间完成
+        # （优化版本只评估一次，结果复用于对比）
+        if optimized_prompt == original_prompt:
+            # 优化未改变文本（或调用方直接自检未优化的 Prompt），评估一次即可，对比结果为无改进
+            evaluation_result, validation_result = await asyncio.gather(
+                self._evaluate(optimized_prompt, intent),
+                self._validate(optimized_prompt)
+            )
+            original_eval = evaluation_result
+        else:
+            evaluation_result, original_eval, validation_result = await asyncio.gather(
+                self._evaluate(optimized_prompt, intent),
+                self._evaluate(original_prompt, intent),
+                self._validate(optimized_prompt)
+            )
         
         # 3. 对比分析
-        comparison = await self._compare_versions(original_prompt, optimized_prompt, intent)
+        comparison = self._compare_versions(
+            original_eval["metrics"],
+            evaluation_result["metrics"]
+        )
         
         # 4. 综合判断
         passed = validation_result.passed and evaluation_result["metrics"].overall_score > 0.7
@@ -75,31 +160,21 @@ class SelfChecker:
         logger.info(f"自检完成 - 通过: {passed}")
         return result
     
-    async def _compare_versions(
+    def _compare_versions(
         self,
-        original: str,
-        optimized: str,
-        intent: IntentResult
+        original_metrics: QualityMetrics,
+        optimized_metrics: QualityMetrics
     ) -> Dict[str, Any]:
         """
-        对比原始版本和优化版本
+        对比原始版本和优化版本的质量指标
         
         Args:
-            original: 原始 Prompt
-            optimized: 优化后的 Prompt
-            intent: 意图信息
+            original_metrics: 原始 Prompt 的质量指标
+            optimized_metrics: 优化后 Prompt 的质量指标
             
         Returns:
             Dict: 对比结果
         """
-        # 评估原始版本
-        original_eval = await self.zhipu_service.quality_evaluation(original, intent)
-        original_metrics = original_eval["metrics"]
-        
-        # 评估优化版本
-        optimized_eval = await self.zhipu_service.quality_evaluation(optimized, intent)
-        optimized_metrics = optimized_eval["metrics"]
-        
         # 计算改进幅度
         improvements = {
             "structure": optimized_metrics.structure_score - original_metrics.structure_score,
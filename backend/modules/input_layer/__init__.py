@@ -5,6 +5,13 @@
 from .intent_extractor import IntentExtractor
 from .keyword_extractor import KeywordExtractor
 from .input_normalizer import InputNormalizer
+from .batched_intent_extractor import BatchedIntentExtractor, batched_intent_extractor
 
-__all__ = ["IntentExtractor", "KeywordExtractor", "InputNormalizer"]
+__all__ = [
+    "IntentExtractor",
+    "KeywordExtractor",
+    "InputNormalizer",
+    "BatchedIntentExtractor",
+    "batched_intent_extractor"
+]
 
@@ -0,0 +1,71 @@
+"""
+批量意图提取器
+将并发到达的意图提取请求合并为一次批量 LLM 调用
+"""
+import logging
+from typing import List, Optional
+
+from config import settings
+from services.micro_batcher import MicroBatcher
+from models.prompt_models import IntentResult
+from .intent_extractor import IntentExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedIntentExtractor:
+    """批量意图提取器类"""
+
+    def __init__(
+        self,
+        extractor: Optional[IntentExtractor] = None,
+        max_batch: int = 8,
+        flush_ms: float = 20
+    ):
+        """
+        初始化批量意图提取器
+
+        Args:
+            extractor: 被包装的意图提取器（可选）
+            max_batch: 单批最大提取数
+            flush_ms: 收集窗口（毫秒）
+        """
+        self.extractor = extractor or IntentExtractor()
+        self.batcher = MicroBatcher(
+            self._extract_batch,
+            max_batch=max_batch,
+            flush_ms=flush_ms,
+            name="intent_extraction"
+        )
+
+    def start(self) -> None:
+        """启动后台批处理任务"""
+        self.batcher.start()
+
+    async def stop(self) -> None:
+        """停止后台批处理任务"""
+        await self.batcher.stop()
+
+    async def extract(self, user_input: str) -> IntentResult:
+        """
+        提交意图提取请求，与同一窗口内的其他请求合并提取
+
+        Args:
+            user_input: 用户原始输入
+
+        Returns:
+            IntentResult: 提取的意图结果
+        """
+        logger.info(f"开始提取意图，输入长度: {len(user_input)}")
+        return await self.batcher.submit(user_input)
+
+    async def _extract_batch(self, user_inputs: List[str]) -> List[IntentResult]:
+        """批量调用智谱 AI 服务"""
+        return await self.extractor.zhipu_service.batch_intent_extraction(user_inputs)
+
+
+# 全局批量意图提取器实例，由应用生命周期负责启动和停止
+batched_intent_extractor = BatchedIntentExtractor(
+    max_batch=settings.INTENT_BATCH_MAX_SIZE,
+    flush_ms=settings.INTENT_BATCH_FLUSH_MS
+)
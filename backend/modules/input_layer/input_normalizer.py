@@ -8,6 +8,35 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# 全角 -> 半角映射，模块加载时构建一次
+# 逐个 str.replace：字符不存在时不复制字符串；实测在中文文本上明显快于 str.translate（逐字符查表）
+_PUNCTUATION_PAIRS = (
+    ('，', ','),
+    ('。', '.'),
+    ('！', '!'),
+    ('？', '?'),
+    ('：', ':'),
+    ('；', ';'),
+    ('（', '('),
+    ('）', ')'),
+    ('【', '['),
+    ('】', ']'),
+    ('「', '"'),
+    ('」', '"'),
+    ('『', '"'),
+    ('』', '"'),
+)
+_NUMBER_PAIRS = tuple((chr(ord('０') + i), str(i)) for i in range(10))
+
+# 空白处理：换行以外的空白、连续空行
+_INLINE_WHITESPACE_PATTERN = re.compile(r'[^\S\n]+')
+_EXCESS_BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+# 敏感信息脱敏
+_MOBILE_PATTERN = re.compile(r'1[3-9]\d{9}')
+_EMAIL_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+_ID_CARD_PATTERN = re.compile(r'\d{17}[\dXx]')
+
 
 class InputNormalizer:
     """输入标准化器类"""
@@ -45,33 +74,17 @@ class InputNormalizer:
         return text.strip()
     
     def _remove_extra_whitespace(self, text: str) -> str:
-        """移除多余的空白字符"""
-        # 替换多个空格为单个空格
-        text = re.sub(r'\s+', ' ', text)
+        """移除多余的空白字符（保留换行）"""
+        # 替换行内连续空白为单个空格（此前 \s+ 会把换行一并替换，导致多行输入被压成一行）
+        text = _INLINE_WHITESPACE_PATTERN.sub(' ', text)
         # 移除行首行尾空白
         text = '\n'.join(line.strip() for line in text.split('\n'))
-        return text
+        # 最多保留一个空行
+        return _EXCESS_BLANK_LINES_PATTERN.sub('\n\n', text)
     
     def _normalize_punctuation(self, text: str) -> str:
         """统一标点符号（全角转半角）"""
-        punctuation_map = {
-            '，': ',',
-            '。': '.',
-            '！': '!',
-            '？': '?',
-            '：': ':',
-            '；': ';',
-            '（': '(',
-            '）': ')',
-            '【': '[',
-            '】': ']',
-            '「': '"',
-            '」': '"',
-            '『': '"',
-            '』': '"',
-        }
-        
-        for cn, en in punctuation_map.items():
+        for cn, en in _PUNCTUATION_PAIRS:
             text = text.replace(cn, en)
         
         return text
@@ -89,12 +102,7 @@ class InputNormalizer:
     
     def _normalize_numbers(self, text: str) -> str:
         """标准化数字格式（全角转半角）"""
-        number_map = {
-            '０': '0', '１': '1', '２': '2', '３': '3', '４': '4',
-            '５': '5', '６': '6', '７': '7', '８': '8', '９': '9',
-        }
-        
-        for cn, en in number_map.items():
+        for cn, en in _NUMBER_PAIRS:
             text = text.replace(cn, en)
         
         return text
@@ -110,13 +118,13 @@ class InputNormalizer:
             str: 移除敏感信息后的文本
         """
         # 脱敏手机号
-        text = re.sub(r'1[3-9]\d{9}', '[手机号]', text)
+        text = _MOBILE_PATTERN.sub('[手机号]', text)
         
         # 脱敏邮箱
-        text = re.sub(r'[\w\.-]+@[\w\.-]+\.\w+', '[邮箱]', text)
+        text = _EMAIL_PATTERN.sub('[邮箱]', text)
         
         # 脱敏身份证号
-        text = re.sub(r'\d{17}[\dXx]', '[身份证]', text)
+        text = _ID_CARD_PATTERN.sub('[身份证]', text)
         
         return text
     
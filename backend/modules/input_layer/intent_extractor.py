@@ -5,7 +5,7 @@
 import logging
 from typing import Optional
 
-from services.zhipu_service import ZhipuAIService
+from services.zhipu_service import get_shared_service
 from models.prompt_models import IntentResult
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,7 @@ class IntentExtractor:
     
     def __init__(self):
         """初始化意图提取器"""
-        self.zhipu_service = ZhipuAIService()
+        self.zhipu_service = get_shared_service()
     
     async def extract(self, user_input: str) -> IntentResult:
         """
@@ -4,21 +4,57 @@
 """
 import re
 import logging
-from typing import List, Set
+from typing import FrozenSet, Iterator, List
 from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+# 中文分词库（可选依赖）：优先使用 C 加速的 jieba_fast，其次 jieba，都未安装时回退到 n-gram 切分
+try:
+    import jieba_fast as jieba
+except ImportError:
+    try:
+        import jieba
+    except ImportError:
+        jieba = None
+
+if jieba is not None:
+    # 词典在模块加载时构建，避免首个请求承担加载耗时
+    jieba.initialize()
+
+# 分词使用的正则，模块加载时编译一次
+_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+# 关键短语：引号内容与特殊格式（各自独立扫描，匹配区域可以重叠，如 "财报分析助手" 与 "财报分析"）
+_QUOTED_PATTERN = re.compile(r'[「『"]([^」』"]+)[」』"]')
+_PHRASE_PATTERNS = (
+    re.compile(r'(\w+(?:助手|系统|工具|平台|应用))'),
+    re.compile(r'(\w{2,4}分析)'),
+    re.compile(r'(生成\w{2,4})'),
+)
+
+# 中文片段按 2-4 个字符切分
+_NGRAM_LENGTHS = (2, 3, 4)
+
+# 领域关键词表
+_DOMAIN_KEYWORDS = {
+    "金融": ("财报", "股票", "投资", "交易", "金融", "银行", "资产"),
+    "医疗": ("医疗", "健康", "病人", "诊断", "治疗", "药物", "医生"),
+    "教育": ("教育", "学习", "课程", "学生", "教师", "培训", "考试"),
+    "技术": ("代码", "编程", "开发", "系统", "算法", "数据", "AI"),
+    "电商": ("购物", "商品", "订单", "支付", "物流", "店铺", "客户"),
+}
+
 
 class KeywordExtractor:
     """关键词提取器类"""
     
-    # 常见停用词（可扩展）
-    STOP_WORDS: Set[str] = {
+    # 常见停用词（可扩展；所有实例共享，不可变）
+    STOP_WORDS: FrozenSet[str] = frozenset({
         "的", "了", "在", "是", "我", "有", "和", "就", "不", "人", "都", "一",
         "一个", "上", "也", "很", "到", "说", "要", "去", "你", "会", "着", "没有",
         "看", "好", "自己", "这", "能", "可以", "帮", "帮我", "请", "一下"
-    }
+    })
     
     def __init__(self):
         """初始化关键词提取器"""
@@ -35,14 +71,12 @@ class KeywordExtractor:
         Returns:
             List[str]: 关键词列表
         """
-        # 基础分词（这里使用简单的方法，实际项目可以使用 jieba 等分词工具）
-        words = self._simple_tokenize(text)
+        # 分词（安装了 jieba 时使用 jieba，否则使用简单的 n-gram 切分）
+        words = self._tokenize(text)
         
-        # 过滤停用词
-        filtered_words = [w for w in words if w not in self.STOP_WORDS and len(w) > 1]
-        
-        # 统计词频
-        word_counts = Counter(filtered_words)
+        # 过滤停用词并统计词频（生成器直接交给 Counter，不生成中间列表）
+        stop_words = self.STOP_WORDS
+        word_counts = Counter(w for w in words if len(w) > 1 and w not in stop_words)
         
         # 返回高频词
         keywords = [word for word, count in word_counts.most_common(top_k)]
@@ -60,30 +94,37 @@ class KeywordExtractor:
         Returns:
             List[str]: 关键短语列表
         """
-        phrases = []
-        
         # 提取引号内的内容
-        quoted = re.findall(r'[「『"]([^」』"]+)[」』"]', text)
-        phrases.extend(quoted)
+        phrases = set(_QUOTED_PATTERN.findall(text))
         
         # 提取特殊格式（如：XX助手、XX系统）
-        patterns = [
-            r'(\w+(?:助手|系统|工具|平台|应用))',
-            r'(\w{2,4}分析)',
-            r'(生成\w{2,4})',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            phrases.extend(matches)
+        for pattern in _PHRASE_PATTERNS:
+            phrases.update(pattern.findall(text))
         
         # 去重
-        phrases = list(set(phrases))
+        phrases = list(phrases)
         
         logger.info(f"提取到 {len(phrases)} 个关键短语")
         return phrases
     
-    def _simple_tokenize(self, text: str) -> List[str]:
+    def _tokenize(self, text: str) -> Iterator[str]:
+        """
+        分词
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            Iterator[str]: 词语迭代器
+        """
+        if jieba is None:
+            return self._simple_tokenize(text)
+        
+        # 移除标点符号后交给 jieba 精确模式分词
+        text = _PUNCTUATION_PATTERN.sub(' ', text)
+        return (word.lower() for word in jieba.cut(text) if not word.isspace())
+    
+    def _simple_tokenize(self, text: str) -> Iterator[str]:
         """
         简单分词（中文按字符，英文按单词）
         实际项目中应使用专业分词工具如 jieba
@@ -92,25 +133,25 @@ class KeywordExtractor:
             text: 输入文本
             
         Returns:
-            List[str]: 词语列表
+            Iterator[str]: 词语迭代器（顺序与逐位置切分一致）
         """
         # 移除标点符号
-        text = re.sub(r'[^\w\s]', ' ', text)
+        text = _PUNCTUATION_PATTERN.sub(' ', text)
         
         # 拆分为词
-        words = []
         for part in text.split():
             # 英文单词
-            if re.match(r'^[a-zA-Z]+$', part):
-                words.append(part.lower())
+            if part.isascii() and part.isalpha():
+                yield part.lower()
             # 中文按2-4个字符提取
             elif len(part) > 1:
-                for i in range(len(part)):
-                    for length in [2, 3, 4]:
-                        if i + length <= len(part):
-                            words.append(part[i:i+length])
-        
-        return words
+                size = len(part)
+                yield from (
+                    part[i:i + length]
+                    for i in range(size)
+                    for length in _NGRAM_LENGTHS
+                    if i + length <= size
+                )
     
     def extract_domain_keywords(self, text: str) -> List[str]:
         """
@@ -122,20 +163,9 @@ class KeywordExtractor:
         Returns:
             List[str]: 领域关键词列表
         """
-        domain_keywords = {
-            "金融": ["财报", "股票", "投资", "交易", "金融", "银行", "资产"],
-            "医疗": ["医疗", "健康", "病人", "诊断", "治疗", "药物", "医生"],
-            "教育": ["教育", "学习", "课程", "学生", "教师", "培训", "考试"],
-            "技术": ["代码", "编程", "开发", "系统", "算法", "数据", "AI"],
-            "电商": ["购物", "商品", "订单", "支付", "物流", "店铺", "客户"],
-        }
-        
-        found_domains = []
-        text_lower = text.lower()
-        
-        for domain, keywords in domain_keywords.items():
-            if any(kw in text for kw in keywords):
-                found_domains.append(domain)
-        
-        return found_domains
+        # 子串查找由 C 实现且命中即停，关键词很少时快于构建多模式自动机或合并正则
+        return [
+            domain for domain, keywords in _DOMAIN_KEYWORDS.items()
+            if any(kw in text for kw in keywords)
+        ]
 
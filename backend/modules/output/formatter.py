@@ -2,10 +2,10 @@
 格式化器
 将 Prompt 输出为不同格式（JSON、YAML等）
 """
-import json
+import orjson
 import yaml
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from models.prompt_models import CompiledPrompt
@@ -13,6 +13,12 @@ from models.evaluation_models import QualityMetrics
 
 logger = logging.getLogger(__name__)
 
+# 安装了 libyaml 时使用 C 实现的 Dumper，输出与纯 Python 实现一致
+try:
+    from yaml import CDumper as _YamlDumper
+except ImportError:
+    from yaml import Dumper as _YamlDumper
+
 
 class Formatter:
     """格式化器类"""
@@ -34,7 +40,7 @@ class Formatter:
         """
         output_dict = self._build_output_dict(compiled_prompt, metrics)
         
-        json_str = json.dumps(output_dict, ensure_ascii=False, indent=2)
+        json_str = orjson.dumps(output_dict, option=orjson.OPT_INDENT_2).decode()
         logger.info("输出为 JSON 格式完成")
         return json_str
     
@@ -53,6 +59,7 @@ class Formatter:
         
         yaml_str = yaml.dump(
             output_dict,
+            Dumper=_YamlDumper,
             allow_unicode=True,
             sort_keys=False,
             default_flow_style=False
@@ -71,39 +78,39 @@ class Formatter:
         Returns:
             str: Markdown 字符串
         """
-        md_parts = []
-        
-        # 标题
-        md_parts.append(f"# Compiled Prompt\n")
-        md_parts.append(f"**Version ID**: `{compiled_prompt.version_id}`\n")
-        md_parts.append(f"**Created**: {compiled_prompt.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        md_parts.append(f"**Optimization Level**: {compiled_prompt.optimization_level}\n")
-        
-        # 原始输入
-        md_parts.append(f"\n## Original Input\n")
-        md_parts.append(f"```\n{compiled_prompt.original_input}\n```\n")
-        
-        # 意图分析
-        md_parts.append(f"\n## Intent Analysis\n")
-        md_parts.append(f"- **Task Type**: {compiled_prompt.intent.task_type}\n")
-        md_parts.append(f"- **Domain**: {compiled_prompt.intent.domain}\n")
-        md_parts.append(f"- **Objective**: {compiled_prompt.intent.objective}\n")
-        md_parts.append(f"- **Confidence**: {compiled_prompt.intent.confidence:.2%}\n")
-        
-        # 编译后的 Prompt
-        md_parts.append(f"\n## Compiled Prompt\n")
-        md_parts.append(f"```\n{compiled_prompt.full_prompt}\n```\n")
-        
-        # 质量指标
-        if metrics:
-            md_parts.append(f"\n## Quality Metrics\n")
-            md_parts.append(f"- **Structure**: {metrics.structure_score:.2%}\n")
-            md_parts.append(f"- **Consistency**: {metrics.consistency_score:.2%}\n")
-            md_parts.append(f"- **Completeness**: {metrics.completeness_score:.2%}\n")
-            md_parts.append(f"- **Clarity**: {metrics.clarity_score:.2%}\n")
-            md_parts.append(f"- **Overall**: {metrics.overall_score:.2%}\n")
-        
-        markdown = "".join(md_parts)
+        intent = compiled_prompt.intent
+        
+        # 质量指标（可选）
+        metrics_section = (
+            f"\n## Quality Metrics\n"
+            f"- **Structure**: {metrics.structure_score:.2%}\n"
+            f"- **Consistency**: {metrics.consistency_score:.2%}\n"
+            f"- **Completeness**: {metrics.completeness_score:.2%}\n"
+            f"- **Clarity**: {metrics.clarity_score:.2%}\n"
+            f"- **Overall**: {metrics.overall_score:.2%}\n"
+        ) if metrics else ""
+        
+        markdown = (
+            # 标题
+            f"# Compiled Prompt\n"
+            f"**Version ID**: `{compiled_prompt.version_id}`\n"
+            f"**Created**: {compiled_prompt.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"**Optimization Level**: {compiled_prompt.optimization_level}\n"
+            # 原始输入
+            f"\n## Original Input\n"
+            f"```\n{compiled_prompt.original_input}\n```\n"
+            # 意图分析
+            f"\n## Intent Analysis\n"
+            f"- **Task Type**: {intent.task_type}\n"
+            f"- **Domain**: {intent.domain}\n"
+            f"- **Objective**: {intent.objective}\n"
+            f"- **Confidence**: {intent.confidence:.2%}\n"
+            # 编译后的 Prompt
+            f"\n## Compiled Prompt\n"
+            f"```\n{compiled_prompt.full_prompt}\n```\n"
+            f"{metrics_section}"
+        )
+        
         logger.info("输出为 Markdown 格式完成")
         return markdown
     
@@ -172,6 +179,54 @@ class Formatter:
         
         return output
     
+    def _build_output_dict_from_dump(
+        self,
+        prompt_dump: Dict[str, Any],
+        metrics_dump: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        根据已序列化的 Prompt 构建输出字典（结构与 _build_output_dict 一致）
+        
+        Args:
+            prompt_dump: CompiledPrompt.model_dump() 的结果
+            metrics_dump: QualityMetrics.model_dump() 的结果（可选）
+            
+        Returns:
+            Dict: 输出字典
+        """
+        intent = prompt_dump["intent"]
+        output = {
+            "version_id": prompt_dump["version_id"],
+            "created_at": prompt_dump["created_at"].isoformat(),
+            "optimization_level": prompt_dump["optimization_level"],
+            "optimized": prompt_dump["optimized"],
+            "original_input": prompt_dump["original_input"],
+            "intent": {
+                "task_type": intent["task_type"],
+                "domain": intent["domain"],
+                "objective": intent["objective"],
+                "constraints": intent["constraints"],
+                "keywords": intent["keywords"],
+                "confidence": intent["confidence"]
+            },
+            "prompt": {
+                "role": prompt_dump["role"],
+                "objective": prompt_dump["objective"],
+                "constraints": prompt_dump["constraints"],
+                "output_format": prompt_dump["output_format"],
+                "context": prompt_dump["context"],
+                "full_text": prompt_dump["full_prompt"]
+            }
+        }
+        
+        if prompt_dump["template_id"]:
+            output["template_id"] = prompt_dump["template_id"]
+        
+        if metrics_dump:
+            output["quality_metrics"] = metrics_dump
+        
+        return output
+    
     def format_api_response(
         self,
         compiled_prompt: CompiledPrompt,
@@ -189,14 +244,18 @@ class Formatter:
         Returns:
             Dict: API 响应字典
         """
+        # 只序列化一次，格式化输出直接取自序列化结果
+        prompt_dump = compiled_prompt.model_dump()
+        metrics_dump = metrics.model_dump() if metrics else None
+        
         response = {
             "success": True,
-            "compiled_prompt": compiled_prompt.model_dump(),
-            "formatted_output": self._build_output_dict(compiled_prompt, metrics)
+            "compiled_prompt": prompt_dump,
+            "formatted_output": self._build_output_dict_from_dump(prompt_dump, metrics_dump)
         }
         
-        if metrics:
-            response["metrics"] = metrics.model_dump()
+        if metrics_dump:
+            response["metrics"] = metrics_dump
         
         if suggestions:
             response["suggestions"] = suggestions
@@ -2,28 +2,75 @@
 版本管理器
 管理 Prompt 的历史版本
 """
+import asyncio
 import logging
-from typing import List, Optional
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from cachetools import TTLCache
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReadPreference
+from pymongo.errors import BulkWriteError, OperationFailure
 
-from models.prompt_models import CompiledPrompt
+from models.prompt_models import CompiledPrompt, IntentResult, OptimizationLevel, TaskType
 
 logger = logging.getLogger(__name__)
 
+# 统计计数文档（history_stats 集合中唯一的一条）
+_STATS_ID = "global"
+_LEVEL_FIELDS = ("low", "medium", "high")
+_STATS_FIELDS = ("total", *_LEVEL_FIELDS, "optimized")
+
+# 列表视图所需字段，不取 full_prompt 等大字段
+_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "version_id": 1,
+    "created_at": 1,
+    "original_input": 1,
+    "intent.task_type": 1,
+    "intent.domain": 1,
+    "optimization_level": 1,
+    "optimized": 1
+}
+
+# 列表按创建时间倒序，version_id 作为同一时间的次序，与 (created_at, version_id) 索引一致
+_NEWEST_FIRST = [("created_at", -1), ("version_id", -1)]
+
 
 class VersionManager:
     """版本管理器类"""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        count_cache_ttl: float = 10,
+        statistics_max_age: Optional[float] = 3600,
+        secondary_reads: bool = False
+    ):
         """
         初始化版本管理器
         
         Args:
             db: MongoDB 数据库实例
+            count_cache_ttl: 总数缓存有效期（秒）
+            statistics_max_age: 统计计数的最长有效期（秒），超过后从 history 集合重新统计；
+                TTL 后台删除不会扣减计数，与重建并发的保存也可能少计或重复计数，
+                定期重新统计以修正偏差（None 表示不重新统计）
+            secondary_reads: 列表、检索与计数是否优先读取从节点（可能读到稍旧的数据）
         """
         self.db = db
         self.collection = db.history
+        # 列表类只读查询使用的集合；按 ID 读取等需要读到刚写入数据的查询仍走主节点
+        self.read_collection = (
+            self.collection.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+            if secondary_reads else self.collection
+        )
+        # 版本统计计数，随保存/删除增量维护
+        self.stats_collection = db.history_stats
+        self.statistics_max_age = statistics_max_age
+        # 无过滤条件的总数变化不敏感，短时间缓存避免重复统计
+        self._count_cache: TTLCache = TTLCache(maxsize=1, ttl=count_cache_ttl)
+        self._count_lock = asyncio.Lock()
     
     async def save_version(self, compiled_prompt: CompiledPrompt) -> CompiledPrompt:
         """
@@ -35,14 +82,57 @@ class VersionManager:
         Returns:
             CompiledPrompt: 保存的版本
         """
-        prompt_dict = compiled_prompt.model_dump()
-        prompt_dict["created_at"] = datetime.now()
-        
-        await self.collection.insert_one(prompt_dict)
+        await self.collection.insert_one(self._to_document(compiled_prompt))
+        await self._inc_statistics(
+            compiled_prompt.optimization_level.value,
+            compiled_prompt.optimized,
+            1
+        )
         logger.info(f"版本保存成功: {compiled_prompt.version_id}")
         
         return compiled_prompt
     
+    @staticmethod
+    def _to_document(compiled_prompt: CompiledPrompt) -> dict:
+        """将 Prompt 转换为待写入的文档"""
+        # created_at 已在构造模型时生成，直接沿用，保证返回值与存储一致
+        prompt_dict = compiled_prompt.model_dump()
+        # 小写副本供不区分大小写的前缀检索走索引（读取时不会进入模型）
+        prompt_dict["original_input_lc"] = compiled_prompt.original_input.lower()
+        return prompt_dict
+    
+    async def save_versions(self, compiled_prompts: List[CompiledPrompt]) -> List[CompiledPrompt]:
+        """
+        批量保存 Prompt 版本（一次往返写入）
+        
+        使用无序写入，单条失败（如 version_id 重复）不影响其余版本写入；
+        存在失败时在更新统计计数后抛出 BulkWriteError
+        
+        Args:
+            compiled_prompts: 编译后的 Prompt 列表
+            
+        Returns:
+            List[CompiledPrompt]: 保存的版本
+        """
+        if not compiled_prompts:
+            return []
+        
+        prompt_dicts = [self._to_document(compiled_prompt) for compiled_prompt in compiled_prompts]
+        
+        try:
+            await self.collection.insert_many(prompt_dicts, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            await self._inc_statistics_bulk(
+                [p for index, p in enumerate(compiled_prompts) if index not in failed]
+            )
+            logger.error(f"批量保存版本部分失败: {len(failed)}/{len(compiled_prompts)}")
+            raise
+        
+        await self._inc_statistics_bulk(compiled_prompts)
+        logger.info(f"批量保存版本成功: {len(compiled_prompts)} 个")
+        return compiled_prompts
+    
     async def get_version(self, version_id: str) -> Optional[CompiledPrompt]:
         """
         获取指定版本
@@ -53,11 +143,10 @@ class VersionManager:
         Returns:
             Optional[CompiledPrompt]: Prompt 对象，不存在则返回 None
         """
-        prompt_dict = await self.collection.find_one({"version_id": version_id})
+        prompt_dict = await self.collection.find_one({"version_id": version_id}, {"_id": 0})
         
         if prompt_dict:
-            prompt_dict.pop("_id", None)
-            return CompiledPrompt(**prompt_dict)
+            return self._from_document(prompt_dict)
         
         return None
     
@@ -65,30 +154,162 @@ class VersionManager:
         self,
         limit: int = 50,
         skip: int = 0,
-        filter_dict: Optional[dict] = None
+        filter_dict: Optional[dict] = None,
+        after: Optional[Tuple[datetime, str]] = None
     ) -> List[CompiledPrompt]:
         """
         列出历史版本
         
+        深度翻页时应使用 after（上一页最后一条的 created_at 与 version_id），
+        数据库直接从索引位置开始读取，不再逐条跳过前面的文档
+        
         Args:
             limit: 返回数量限制
             skip: 跳过数量（分页）
             filter_dict: 过滤条件（可选）
+            after: 上一页最后一条记录的 (created_at, version_id)（可选）
             
         Returns:
             List[CompiledPrompt]: Prompt 列表
         """
-        query = filter_dict or {}
-        cursor = self.collection.find(query).skip(skip).limit(limit).sort("created_at", -1)
-        
-        versions = []
-        async for prompt_dict in cursor:
-            prompt_dict.pop("_id", None)
-            versions.append(CompiledPrompt(**prompt_dict))
+        versions = [
+            self._from_document(prompt_dict)
+            async for prompt_dict in self.iter_versions(limit, skip, filter_dict, after)
+        ]
         
         logger.info(f"查询到 {len(versions)} 个历史版本")
         return versions
     
+    async def list_versions_summary(
+        self,
+        limit: int = 50,
+        skip: int = 0,
+        filter_dict: Optional[dict] = None,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        列出历史版本摘要（仅列表展示所需字段，不构建模型）
+        
+        Args:
+            limit: 返回数量限制
+            skip: 跳过数量（分页）
+            filter_dict: 过滤条件（可选）
+            after: 上一页最后一条记录的 (created_at, version_id)（可选）
+            
+        Returns:
+            List[Dict[str, Any]]: 版本摘要列表
+        """
+        query = self._page_query(filter_dict, after)
+        cursor = self.read_collection.find(
+            query, _SUMMARY_PROJECTION
+        ).sort(_NEWEST_FIRST).skip(skip).limit(limit)
+        
+        return await cursor.to_list(length=limit)
+    
+    async def iter_versions(
+        self,
+        limit: int = 50,
+        skip: int = 0,
+        filter_dict: Optional[dict] = None,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条迭代历史版本的原始文档（不构建模型，用于流式输出）
+        
+        内存占用只与单条文档有关，大页面应通过 /api/history/stream 逐条输出；
+        list_versions 也基于此迭代器构建
+        
+        Args:
+            limit: 返回数量限制
+            skip: 跳过数量（分页）
+            filter_dict: 过滤条件（可选）
+            after: 上一页最后一条记录的 (created_at, version_id)（可选）
+            
+        Yields:
+            Dict[str, Any]: 不含 _id 的版本文档
+        """
+        query = self._page_query(filter_dict, after)
+        cursor = self.read_collection.find(
+            query, {"_id": 0, "original_input_lc": 0}
+        ).sort(_NEWEST_FIRST).skip(skip).limit(limit)
+        
+        async for prompt_dict in cursor:
+            yield prompt_dict
+    
+    @staticmethod
+    def _from_document(prompt_dict: dict) -> CompiledPrompt:
+        """
+        由数据库文档构建 CompiledPrompt
+        
+        文档写入前已经过模型校验，读取时用 model_construct 跳过重复校验；
+        model_construct 不会构建嵌套模型、不做枚举转换，intent 与枚举字段在此手动处理
+        
+        Args:
+            prompt_dict: 不含 _id 的版本文档
+            
+        Returns:
+            CompiledPrompt: Prompt 对象
+        """
+        intent = prompt_dict["intent"]
+        prompt_dict["intent"] = IntentResult.model_construct(
+            **{**intent, "task_type": TaskType(intent["task_type"])}
+        )
+        prompt_dict["optimization_level"] = OptimizationLevel(prompt_dict["optimization_level"])
+        return CompiledPrompt.model_construct(**prompt_dict)
+    
+    @staticmethod
+    def _page_query(
+        filter_dict: Optional[dict],
+        after: Optional[Tuple[datetime, str]]
+    ) -> dict:
+        """在过滤条件上追加游标分页条件（排在 after 之后的记录）"""
+        query = filter_dict or {}
+        if after is None:
+            return query
+        
+        created_at, version_id = after
+        keyset = {
+            "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "version_id": {"$lt": version_id}}
+            ]
+        }
+        # 过滤条件自身可能含 $or，用 $and 组合避免键冲突
+        return {"$and": [query, keyset]} if query else keyset
+    
+    @staticmethod
+    def encode_page_cursor(created_at: datetime, version_id: str) -> str:
+        """
+        生成下一页的分页游标
+        
+        Args:
+            created_at: 当前页最后一条记录的创建时间
+            version_id: 当前页最后一条记录的版本ID
+            
+        Returns:
+            str: 分页游标
+        """
+        return f"{created_at.isoformat()}|{version_id}"
+    
+    @staticmethod
+    def decode_page_cursor(cursor: str) -> Tuple[datetime, str]:
+        """
+        解析分页游标
+        
+        Args:
+            cursor: encode_page_cursor 生成的游标
+            
+        Returns:
+            Tuple[datetime, str]: (created_at, version_id)
+            
+        Raises:
+            ValueError: 游标格式无效
+        """
+        created_at, sep, version_id = cursor.partition("|")
+        if not sep or not version_id:
+            raise ValueError(f"无效的分页游标: {cursor}")
+        return datetime.fromisoformat(created_at), version_id
+    
     async def get_versions_by_input(self, original_input: str) -> List[CompiledPrompt]:
         """
         获取相同输入的所有版本
@@ -126,9 +347,18 @@ class VersionManager:
         Returns:
             bool: 是否删除成功
         """
-        result = await self.collection.delete_one({"version_id": version_id})
+        # 删除的同时取回统计所需字段，用于扣减计数
+        deleted = await self.collection.find_one_and_delete(
+            {"version_id": version_id},
+            projection={"_id": 0, "optimization_level": 1, "optimized": 1}
+        )
         
-        if result.deleted_count > 0:
+        if deleted is not None:
+            await self._inc_statistics(
+                deleted.get("optimization_level"),
+                deleted.get("optimized") is True,
+                -1
+            )
             logger.info(f"版本删除成功: {version_id}")
             return True
         
@@ -138,39 +368,138 @@ class VersionManager:
         """
         统计版本数量
         
+        无过滤条件时返回基于集合元数据的估算总数，并短时间缓存
+        
         Args:
             filter_dict: 过滤条件（可选）
             
         Returns:
             int: 版本数量
         """
-        query = filter_dict or {}
-        count = await self.collection.count_documents(query)
+        if not filter_dict:
+            return await self._count_all_versions()
+        
+        count = await self.read_collection.count_documents(filter_dict)
         return count
     
+    async def _count_all_versions(self) -> int:
+        """获取版本总数（缓存）"""
+        count = self._count_cache.get("total")
+        if count is not None:
+            return count
+        
+        async with self._count_lock:
+            # 等待锁期间可能已由其他请求刷新
+            count = self._count_cache.get("total")
+            if count is None:
+                count = await self.read_collection.estimated_document_count()
+                self._count_cache["total"] = count
+        
+        return count
+    
+    async def _inc_statistics(self, level: Optional[str], optimized: bool, step: int):
+        """
+        增量更新统计计数
+        
+        计数文档尚未建立时不做任何操作，首次读取统计时会从 history 集合重建
+        
+        Args:
+            level: 优化级别
+            optimized: 是否经过 AI 优化
+            step: 增量（保存为 1，删除为 -1）
+        """
+        inc = {"total": step}
+        if level in _LEVEL_FIELDS:
+            inc[level] = step
+        if optimized:
+            inc["optimized"] = step
+        
+        await self.stats_collection.update_one({"_id": _STATS_ID}, {"$inc": inc})
+    
+    async def _inc_statistics_bulk(self, compiled_prompts: List[CompiledPrompt]):
+        """将多个新写入版本的计数合并为一次更新"""
+        inc: Dict[str, int] = {}
+        for compiled_prompt in compiled_prompts:
+            inc["total"] = inc.get("total", 0) + 1
+            level = compiled_prompt.optimization_level.value
+            inc[level] = inc.get(level, 0) + 1
+            if compiled_prompt.optimized:
+                inc["optimized"] = inc.get("optimized", 0) + 1
+        
+        if inc:
+            await self.stats_collection.update_one({"_id": _STATS_ID}, {"$inc": inc})
+    
+    async def _count_statistics(self, match: Optional[dict] = None) -> Dict[str, int]:
+        """
+        对 history 集合做一次聚合，统计总数、各优化级别与优化过的版本数
+        
+        Args:
+            match: 过滤条件（可选）
+            
+        Returns:
+            Dict[str, int]: 各项计数
+        """
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "low": {"$sum": {"$cond": [{"$eq": ["$optimization_level", "low"]}, 1, 0]}},
+                "medium": {"$sum": {"$cond": [{"$eq": ["$optimization_level", "medium"]}, 1, 0]}},
+                "high": {"$sum": {"$cond": [{"$eq": ["$optimization_level", "high"]}, 1, 0]}},
+                "optimized": {"$sum": {"$cond": [{"$eq": ["$optimized", True]}, 1, 0]}}
+            }}
+        ]
+        if match:
+            pipeline.insert(0, {"$match": match})
+        
+        results = await self.collection.aggregate(pipeline).to_list(length=1)
+        counts = results[0] if results else {}
+        return {field: counts.get(field, 0) for field in _STATS_FIELDS}
+    
+    async def _rebuild_statistics(self, replace: bool = False) -> dict:
+        """
+        从 history 集合重建统计计数文档
+        
+        Args:
+            replace: 是否覆盖已有的计数文档（否则仅在文档不存在时写入）
+        """
+        counts = await self._count_statistics()
+        fields = {**counts, "rebuilt_at": datetime.now()}
+        await self.stats_collection.update_one(
+            {"_id": _STATS_ID},
+            {"$set" if replace else "$setOnInsert": fields},
+            upsert=True
+        )
+        logger.info(f"版本统计计数已重建: {counts}")
+        return await self.stats_collection.find_one({"_id": _STATS_ID}) or counts
+    
     async def get_version_statistics(self) -> dict:
         """
         获取版本统计信息
         
+        读取增量维护的计数文档，不再扫描 history 集合；
+        计数超过 statistics_max_age 后重新统计一次
+        
         Returns:
             dict: 统计信息
         """
-        total_count = await self.count_versions()
+        stats = await self.stats_collection.find_one({"_id": _STATS_ID})
+        if stats is None:
+            stats = await self._rebuild_statistics()
+        elif self.statistics_max_age is not None:
+            rebuilt_at = stats.get("rebuilt_at")
+            if rebuilt_at is None or datetime.now() - rebuilt_at > timedelta(seconds=self.statistics_max_age):
+                stats = await self._rebuild_statistics(replace=True)
         
-        # 统计各优化级别的版本数
-        low_count = await self.count_versions({"optimization_level": "low"})
-        medium_count = await self.count_versions({"optimization_level": "medium"})
-        high_count = await self.count_versions({"optimization_level": "high"})
-        
-        # 统计优化过的版本数
-        optimized_count = await self.count_versions({"optimized": True})
+        total_count = stats.get("total", 0)
+        optimized_count = stats.get("optimized", 0)
         
         return {
             "total_versions": total_count,
             "by_optimization_level": {
-                "low": low_count,
-                "medium": medium_count,
-                "high": high_count
+                "low": stats.get("low", 0),
+                "medium": stats.get("medium", 0),
+                "high": stats.get("high", 0)
             },
             "optimized_count": optimized_count,
             "optimized_ratio": optimized_count / total_count if total_count > 0 else 0
@@ -184,17 +513,47 @@ class VersionManager:
         """
         搜索版本（根据原始输入或 Prompt 内容）
         
+        以 "^" 开头时按原始输入前缀匹配（不区分大小写），通过小写副本字段的索引做范围扫描；
+        其余情况先走全文索引，未命中再按关键词子串匹配
+        
         Args:
-            search_text: 搜索文本
+            search_text: 搜索文本（按字面匹配，不作为正则表达式解释）
             limit: 返回数量限制
             
         Returns:
             List[CompiledPrompt]: 匹配的 Prompt 列表
         """
+        if search_text.startswith("^"):
+            # 在小写副本上使用锚定前缀且不带 i 选项的正则，MongoDB 可转换为索引上的区间扫描
+            prefix = re.escape(search_text[1:].lower())
+            query = {"original_input_lc": {"$regex": "^" + prefix}}
+            return await self.list_versions(limit=limit, filter_dict=query)
+        
+        # 优先使用全文索引，按相关度排序
+        try:
+            cursor = self.read_collection.find(
+                {"$text": {"$search": search_text}},
+                {"_id": 0, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+            
+            versions = []
+            async for prompt_dict in cursor:
+                prompt_dict.pop("score", None)
+                versions.append(self._from_document(prompt_dict))
+            
+            if versions:
+                logger.info(f"全文检索到 {len(versions)} 个历史版本")
+                return versions
+        except OperationFailure as e:
+            logger.warning(f"全文检索不可用，改用正则匹配: {e}")
+        
+        # 全文索引按空白和标点分词，无法匹配中文子串，未命中时回退到子串匹配
+        # 搜索词按字面匹配，转义正则元字符
+        pattern = re.escape(search_text)
         query = {
             "$or": [
-                {"original_input": {"$regex": search_text, "$options": "i"}},
-                {"full_prompt": {"$regex": search_text, "$options": "i"}}
+                {"original_input": {"$regex": pattern, "$options": "i"}},
+                {"full_prompt": {"$regex": pattern, "$options": "i"}}
             ]
         }
         
@@ -204,6 +563,8 @@ class VersionManager:
         """
         清理旧版本（保留最近 N 天的版本）
         
+        常规保留期限由 HISTORY_RETENTION_DAYS 对应的 TTL 索引在后台处理，本方法用于手动清理
+        
         Args:
             days: 保留天数
             
@@ -211,12 +572,18 @@ class VersionManager:
             int: 删除的版本数
         """
         cutoff_date = datetime.now() - timedelta(days=days)
+        query = {"created_at": {"$lt": cutoff_date}}
         
-        result = await self.collection.delete_many({
-            "created_at": {"$lt": cutoff_date}
-        })
+        # 先统计待删除版本的各项计数，删除后从统计计数中扣减
+        removed = await self._count_statistics(query)
+        result = await self.collection.delete_many(query)
         
         deleted_count = result.deleted_count
+        if deleted_count:
+            await self.stats_collection.update_one(
+                {"_id": _STATS_ID},
+                {"$inc": {field: -count for field, count in removed.items() if count}}
+            )
         logger.info(f"清理了 {deleted_count} 个旧版本（{days} 天前）")
         
         return deleted_count
@@ -9,6 +9,28 @@ from models.prompt_models import PromptTemplate, IntentResult
 
 logger = logging.getLogger(__name__)
 
+# 各任务类型的默认角色（{domain} 为意图中的领域），模块加载时构建一次
+_ROLE_TEMPLATES = {
+    "generation": "你是一位专业的内容创作专家",
+    "analysis": "你是一位专业的{domain}数据分析专家",
+    "conversation": "你是一位经验丰富的对话助手",
+    "extraction": "你是一位精准的信息提取专家",
+    "transformation": "你是一位专业的格式转换专家",
+    "reasoning": "你是一位逻辑严密的推理专家",
+}
+_DEFAULT_ROLE = "你是一位专业的AI助手"
+
+# 各任务类型的默认输出格式
+_FORMAT_TEMPLATES = {
+    "generation": "请以清晰、结构化的方式呈现生成的内容",
+    "analysis": "请提供详细的分析报告，包括数据洞察和建议",
+    "conversation": "请以自然、友好的对话方式回复",
+    "extraction": "请以结构化的格式（如 JSON 或表格）呈现提取的信息",
+    "transformation": "请输出转换后的格式，确保格式正确",
+    "reasoning": "请展示推理过程，并给出最终结论",
+}
+_DEFAULT_FORMAT = "请以清晰、准确的方式呈现结果"
+
 
 class FragmentComposer:
     """片段组合器类"""
@@ -141,45 +163,24 @@ class FragmentComposer:
         if not items:
             return "无"
         
-        return "\n".join(f"{i+1}. {item}" for i, item in enumerate(items))
+        # 列表推导式比生成器少一层迭代开销（join 本身也会先物化为列表）
+        return "\n".join([f"{i}. {item}" for i, item in enumerate(items, 1)])
     
     def _format_context(self, context: Dict[str, Any]) -> str:
         """格式化上下文字典"""
         if not context:
             return "无额外上下文"
         
-        lines = []
-        for key, value in context.items():
-            lines.append(f"- {key}: {value}")
-        
-        return "\n".join(lines)
+        return "\n".join([f"- {key}: {value}" for key, value in context.items()])
     
     def _generate_role_from_intent(self, intent: IntentResult) -> str:
         """根据意图生成默认角色"""
-        role_templates = {
-            "generation": "你是一位专业的内容创作专家",
-            "analysis": f"你是一位专业的{intent.domain}数据分析专家",
-            "conversation": "你是一位经验丰富的对话助手",
-            "extraction": "你是一位精准的信息提取专家",
-            "transformation": "你是一位专业的格式转换专家",
-            "reasoning": "你是一位逻辑严密的推理专家",
-        }
-        
-        role = role_templates.get(intent.task_type.value, "你是一位专业的AI助手")
-        return role
+        role = _ROLE_TEMPLATES.get(intent.task_type.value, _DEFAULT_ROLE)
+        return role.format(domain=intent.domain)
     
     def _generate_output_format(self, intent: IntentResult) -> str:
         """根据意图生成默认输出格式"""
-        format_templates = {
-            "generation": "请以清晰、结构化的方式呈现生成的内容",
-            "analysis": "请提供详细的分析报告，包括数据洞察和建议",
-            "conversation": "请以自然、友好的对话方式回复",
-            "extraction": "请以结构化的格式（如 JSON 或表格）呈现提取的信息",
-            "transformation": "请输出转换后的格式，确保格式正确",
-            "reasoning": "请展示推理过程，并给出最终结论",
-        }
-        
-        return format_templates.get(intent.task_type.value, "请以清晰、准确的方式呈现结果")
+        return _FORMAT_TEMPLATES.get(intent.task_type.value, _DEFAULT_FORMAT)
     
     def add_system_prompt(self, prompt: str, system_instructions: str) -> str:
         """
@@ -208,11 +209,14 @@ class FragmentComposer:
         if not examples:
             return prompt
         
-        examples_text = "# 参考示例\n\n"
+        # 各示例片段先收集到列表，最后一次拼接
+        chunks = [prompt, "\n\n# 参考示例\n\n"]
         for i, example in enumerate(examples, 1):
-            examples_text += f"## 示例 {i}\n"
-            examples_text += f"输入: {example.get('input', '')}\n"
-            examples_text += f"输出: {example.get('output', '')}\n\n"
+            chunks.append(
+                f"## 示例 {i}\n"
+                f"输入: {example.get('input', '')}\n"
+                f"输出: {example.get('output', '')}\n\n"
+            )
         
-        return f"{prompt}\n\n{examples_text}"
+        return "".join(chunks)
 
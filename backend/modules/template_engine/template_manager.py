@@ -3,7 +3,7 @@
 负责模板的 CRUD 操作和存储
 """
 import logging
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
@@ -11,6 +11,9 @@ from models.prompt_models import PromptTemplate, TaskType, IntentResult
 
 logger = logging.getLogger(__name__)
 
+# 最佳模板：评分最高，其次使用次数最多；仍相同时取最新创建的
+_BEST_TEMPLATE_SORT = {"avg_quality_score": -1, "usage_count": -1, "created_at": -1}
+
 
 class TemplateManager:
     """模板管理器类"""
@@ -35,9 +38,8 @@ class TemplateManager:
         Returns:
             PromptTemplate: 创建的模板
         """
+        # created_at / updated_at 已在构造模型时生成，直接沿用，保证返回值与存储一致
         template_dict = template.model_dump()
-        template_dict["created_at"] = datetime.now()
-        template_dict["updated_at"] = datetime.now()
         
         await self.collection.insert_one(template_dict)
         logger.info(f"模板创建成功: {template.template_id}")
@@ -54,12 +56,10 @@ class TemplateManager:
         Returns:
             Optional[PromptTemplate]: 模板对象，不存在则返回 None
         """
-        template_dict = await self.collection.find_one({"template_id": template_id})
+        template_dict = await self.collection.find_one({"template_id": template_id}, {"_id": 0})
         
         if template_dict:
-            # 移除 MongoDB 的 _id 字段
-            template_dict.pop("_id", None)
-            return PromptTemplate(**template_dict)
+            return self._from_document(template_dict)
         
         return None
     
@@ -82,6 +82,84 @@ class TemplateManager:
         Returns:
             List[PromptTemplate]: 模板列表
         """
+        query = self._build_query(task_type, domain)
+        
+        cursor = self.collection.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1)
+        templates = [self._from_document(template_dict) async for template_dict in cursor]
+        
+        logger.info(f"查询到 {len(templates)} 个模板")
+        return templates
+    
+    async def count_templates(
+        self,
+        task_type: Optional[TaskType] = None,
+        domain: Optional[str] = None
+    ) -> int:
+        """
+        统计模板数量
+        
+        无筛选条件时使用基于集合元数据的估算总数
+        
+        Args:
+            task_type: 按任务类型筛选（可选）
+            domain: 按领域筛选（可选）
+            
+        Returns:
+            int: 模板数量
+        """
+        query = self._build_query(task_type, domain)
+        
+        if not query:
+            return await self.collection.estimated_document_count()
+        
+        return await self.collection.count_documents(query)
+    
+    async def iter_templates(
+        self,
+        task_type: Optional[TaskType] = None,
+        domain: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条迭代模板的原始文档（不构建模型，用于流式输出）
+        
+        Args:
+            task_type: 按任务类型筛选（可选）
+            domain: 按领域筛选（可选）
+            limit: 返回数量限制
+            skip: 跳过数量（分页）
+            
+        Yields:
+            Dict[str, Any]: 不含 _id 的模板文档
+        """
+        query = self._build_query(task_type, domain)
+        cursor = self.collection.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit)
+        
+        async for template_dict in cursor:
+            yield template_dict
+    
+    @staticmethod
+    def _from_document(template_dict: dict) -> PromptTemplate:
+        """
+        由数据库文档构建 PromptTemplate（写入前已校验，跳过重复校验，仅转换枚举字段）
+        
+        Args:
+            template_dict: 不含 _id 的模板文档
+            
+        Returns:
+            PromptTemplate: 模板对象
+        """
+        if "task_types" in template_dict:
+            template_dict["task_types"] = [TaskType(t) for t in template_dict["task_types"]]
+        return PromptTemplate.model_construct(**template_dict)
+    
+    @staticmethod
+    def _build_query(
+        task_type: Optional[TaskType] = None,
+        domain: Optional[str] = None
+    ) -> dict:
+        """构建模板筛选条件"""
         query = {}
         
         if task_type:
@@ -90,15 +168,7 @@ class TemplateManager:
         if domain:
             query["domains"] = domain
         
-        cursor = self.collection.find(query).skip(skip).limit(limit).sort("created_at", -1)
-        templates = []
-        
-        async for template_dict in cursor:
-            template_dict.pop("_id", None)
-            templates.append(PromptTemplate(**template_dict))
-        
-        logger.info(f"查询到 {len(templates)} 个模板")
-        return templates
+        return query
     
     async def update_template(
         self,
@@ -120,13 +190,13 @@ class TemplateManager:
         result = await self.collection.find_one_and_update(
             {"template_id": template_id},
             {"$set": updates},
+            projection={"_id": 0},
             return_document=True
         )
         
         if result:
-            result.pop("_id", None)
             logger.info(f"模板更新成功: {template_id}")
-            return PromptTemplate(**result)
+            return self._from_document(result)
         
         return None
     
@@ -158,30 +228,26 @@ class TemplateManager:
         Returns:
             Optional[PromptTemplate]: 最匹配的模板
         """
-        # 首先按任务类型和领域查找
-        templates = await self.list_templates(
-            task_type=intent.task_type,
-            domain=intent.domain,
-            limit=10
-        )
+        # 一次查询同时覆盖精确匹配与只按任务类型的备选：领域匹配的模板排在前面
+        pipeline = [
+            {"$match": {"task_types": intent.task_type.value}},
+            {"$addFields": {"domain_match": {
+                "$cond": [{"$in": [intent.domain, {"$ifNull": ["$domains", []]}]}, 1, 0]
+            }}},
+            {"$sort": {"domain_match": -1, **_BEST_TEMPLATE_SORT}},
+            {"$limit": 1},
+            {"$project": {"_id": 0}}
+        ]
+        results = await self.collection.aggregate(pipeline).to_list(length=1)
         
-        if templates:
-            # 返回使用次数最多且评分最高的模板
-            best_template = max(
-                templates,
-                key=lambda t: (t.avg_quality_score, t.usage_count)
-            )
-            logger.info(f"找到最佳模板: {best_template.name}")
-            return best_template
-        
-        # 如果没有精确匹配，尝试只按任务类型查找
-        templates = await self.list_templates(task_type=intent.task_type, limit=10)
-        if templates:
-            best_template = max(
-                templates,
-                key=lambda t: (t.avg_quality_score, t.usage_count)
-            )
-            logger.info(f"找到备选模板: {best_template.name}")
+        if results:
+            template_dict = results[0]
+            domain_match = template_dict.pop("domain_match", 0)
+            best_template = self._from_document(template_dict)
+            if domain_match:
+                logger.info(f"找到最佳模板: {best_template.name}")
+            else:
+                logger.info(f"找到备选模板: {best_template.name}")
             return best_template
         
         logger.warning("未找到合适的模板")
@@ -199,6 +265,28 @@ class TemplateManager:
             {"$inc": {"usage_count": 1}}
         )
     
+    async def record_usage_and_score(self, template_id: str, new_score: float):
+        """
+        增加模板使用次数并计入本次评分（一次原子更新）
+        
+        Args:
+            template_id: 模板ID
+            new_score: 本次使用的评分
+        """
+        # 同一阶段内的字段引用均为更新前的值：新平均分 = (旧平均分 × 旧次数 + 新评分) / (旧次数 + 1)
+        usage_count = {"$ifNull": ["$usage_count", 0]}
+        avg_quality_score = {"$ifNull": ["$avg_quality_score", 0]}
+        await self.collection.update_one(
+            {"template_id": template_id},
+            [{"$set": {
+                "usage_count": {"$add": [usage_count, 1]},
+                "avg_quality_score": {"$divide": [
+                    {"$add": [{"$multiply": [avg_quality_score, usage_count]}, new_score]},
+                    {"$add": [usage_count, 1]}
+                ]}
+            }}]
+        )
+    
     async def update_quality_score(self, template_id: str, new_score: float):
         """
         更新模板的平均质量评分
@@ -207,16 +295,19 @@ class TemplateManager:
             template_id: 模板ID
             new_score: 新的评分
         """
-        template = await self.get_template(template_id)
-        if template:
-            # 计算新的平均分（简单平均，可以改为加权平均）
-            current_avg = template.avg_quality_score
-            usage_count = template.usage_count
-            
-            new_avg = (current_avg * (usage_count - 1) + new_score) / usage_count
-            
-            await self.collection.update_one(
-                {"template_id": template_id},
-                {"$set": {"avg_quality_score": new_avg}}
-            )
+        # 在服务端按当前文档计算新的平均分（简单平均，可以改为加权平均），
+        # 一次往返完成，并发评分时不会丢失更新
+        usage_count = {"$max": ["$usage_count", 1]}
+        await self.collection.update_one(
+            {"template_id": template_id},
+            [{"$set": {
+                "avg_quality_score": {"$divide": [
+                    {"$add": [
+                        {"$multiply": ["$avg_quality_score", {"$subtract": [usage_count, 1]}]},
+                        new_score
+                    ]},
+                    usage_count
+                ]}
+            }}]
+        )
 
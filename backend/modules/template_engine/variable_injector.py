@@ -4,32 +4,48 @@
 """
 import re
 import logging
+from functools import lru_cache
 from typing import Dict, Any
-from jinja2 import Template, Environment, meta
+from jinja2 import Environment, meta
 
 logger = logging.getLogger(__name__)
 
+# Jinja2 语法标记（{{ }}、{% %}、{# #}）；不含这些标记的模板只使用 {var} 占位符
+_JINJA_SYNTAX_PATTERN = re.compile(r'\{[{%#]')
+
 
 class VariableInjector:
     """变量注入器类"""
     
-    def __init__(self):
-        """初始化变量注入器"""
+    def __init__(self, cache_size: int = 1024):
+        """
+        初始化变量注入器
+        
+        Args:
+            cache_size: 按模板文本缓存的编译结果数量
+        """
         self.env = Environment()
+        # 同一模板文本只解析、编译一次，之后只需渲染；语法错误不会被缓存
+        self._compile = lru_cache(maxsize=cache_size)(self.env.from_string)
+        self._undeclared_variables = lru_cache(maxsize=cache_size)(self._find_undeclared_variables)
     
     def inject(self, template_text: str, variables: Dict[str, Any]) -> str:
         """
         将变量注入到模板中
         
         Args:
-            template_text: 模板文本（支持 Jinja2 语法）
+            template_text: 模板文本（支持 Jinja2 语法与 {var} 占位符）
             variables: 变量字典
             
         Returns:
             str: 注入变量后的文本
         """
+        # 只含 {var} 占位符的模板直接替换，无需经过 Jinja2 解析与渲染
+        if not _JINJA_SYNTAX_PATTERN.search(template_text):
+            return self._simple_replace(template_text, variables)
+        
         try:
-            template = Template(template_text)
+            template = self._compile(template_text)
             result = template.render(**variables)
             logger.info(f"变量注入成功，注入了 {len(variables)} 个变量")
             return result
@@ -67,13 +83,16 @@ class VariableInjector:
         """
         try:
             # 使用 Jinja2 提取变量
-            ast = self.env.parse(template_text)
-            variables = meta.find_undeclared_variables(ast)
-            return list(variables)
+            return list(self._undeclared_variables(template_text))
         except Exception:
             # 如果 Jinja2 失败，使用正则提取
             return re.findall(r'\{(\w+)\}', template_text)
     
+    def _find_undeclared_variables(self, template_text: str) -> frozenset:
+        """解析模板并返回未声明的变量名（结果按模板文本缓存）"""
+        ast = self.env.parse(template_text)
+        return frozenset(meta.find_undeclared_variables(ast))
+    
     def validate_variables(self, template_text: str, variables: Dict[str, Any]) -> bool:
         """
         验证是否提供了所有必需的变量
@@ -2,7 +2,8 @@
 服务层包
 提供各种外部服务的封装
 """
-from .zhipu_service import ZhipuAIService
+from .zhipu_service import ZhipuAIService, get_shared_service
+from .response_cache import PromptResponseCache, response_cache
 
-__all__ = ["ZhipuAIService"]
+__all__ = ["ZhipuAIService", "get_shared_service", "PromptResponseCache", "response_cache"]
 
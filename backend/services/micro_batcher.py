@@ -0,0 +1,151 @@
+"""
+微批处理器
+将短时间窗口内到达的多个请求合并为一次批量调用
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """微批处理器类"""
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = 16,
+        flush_ms: float = 20,
+        name: str = "batcher"
+    ):
+        """
+        初始化微批处理器
+
+        Args:
+            handler: 批量处理函数，接收请求列表，按相同顺序返回结果列表
+            max_batch: 单批最大请求数
+            flush_ms: 收集窗口（毫秒），从批内第一个请求到达开始计时
+            name: 处理器名称（用于日志）
+        """
+        self.handler = handler
+        self.max_batch = max_batch
+        self.flush_ms = flush_ms
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 正在收集中的批次；停止时收集任务被取消，其中的请求由 stop 接手处理
+        self._collecting: list = []
+        # 保存进行中的批处理任务引用，避免被垃圾回收
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        """后台收集任务是否在运行"""
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """启动后台收集任务（需在事件循环中调用）"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"微批处理器已启动: {self.name}")
+
+    async def stop(self) -> None:
+        """停止后台收集任务，等待进行中的批次完成"""
+        if not self.running:
+            return
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # 收集中的批次与队列中尚未处理的请求一并交给最后一个批次处理
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            self._flush_in_background(pending)
+
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        logger.info(f"微批处理器已停止: {self.name}")
+
+    async def submit(self, item: Any) -> Any:
+        """
+        提交单个请求并等待其结果
+
+        未启动时直接以单元素批次调用处理函数
+
+        Args:
+            item: 请求
+
+        Returns:
+            Any: 该请求对应的结果
+        """
+        if not self.running:
+            results = await self.handler([item])
+            return results[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        """后台收集循环"""
+        loop = asyncio.get_running_loop()
+        window = self.flush_ms / 1000
+
+        while True:
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + window
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # 批处理在独立任务中执行，收集下一批不必等待本批完成
+            self._collecting = []
+            self._flush_in_background(batch)
+
+    def _flush_in_background(self, batch: list) -> None:
+        """在后台任务中处理一个批次"""
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list) -> None:
+        """
+        调用批量处理函数并分发结果
+
+        Args:
+            batch: [(请求, Future), ...]
+        """
+        items = [item for item, _ in batch]
+        logger.info(f"{self.name} 批量处理 {len(items)} 个请求")
+
+        try:
+            results = await self.handler(items)
+            if len(results) != len(items):
+                raise ValueError(
+                    f"批量处理结果数量不匹配: 期望 {len(items)}，实际 {len(results)}"
+                )
+        except Exception as e:
+            logger.error(f"{self.name} 批量处理失败: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
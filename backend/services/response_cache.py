@@ -0,0 +1,244 @@
+"""
+编译响应缓存
+为 /api/compile 提供两级进程内缓存：
+1. 精确命中：按 (输入, 模板ID, 优化级别, 是否评估) 的哈希查找
+2. 关键词命中：意图提取后，按意图关键词集合的重合数查找近似请求
+"""
+import hashlib
+import logging
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set
+
+from cachetools import TTLCache
+
+from config import settings
+from models.prompt_models import IntentResult
+
+logger = logging.getLogger(__name__)
+
+# 目标描述按非单词字符切分
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# 约束条件只取开头若干字符作为关键词
+_CONSTRAINT_HEAD_LENGTH = 8
+
+
+class _EvictingTTLCache(TTLCache):
+    """条目因容量淘汰或过期被移除时回调 on_evict 的 TTLCache"""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[str, tuple], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_evict = on_evict
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self._on_evict(key, value)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+
+class PromptResponseCache:
+    """编译响应缓存类"""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        min_keyword_overlap: int = 3
+    ):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大缓存条目数
+            ttl: 缓存有效期（秒）
+            min_keyword_overlap: 关键词命中所需的最少重合关键词数
+        """
+        self.min_keyword_overlap = min_keyword_overlap
+        # 精确键 -> (作用域, 关键词集合, 响应)；条目被淘汰或过期时同步移出关键词索引
+        self._entries: TTLCache = _EvictingTTLCache(maxsize, ttl, self._unindex)
+        # 作用域 -> 关键词 -> 精确键集合
+        self._keyword_index: Dict[str, Dict[str, Set[str]]] = {}
+
+    @staticmethod
+    def make_key(
+        user_input: str,
+        template_id: Optional[str],
+        optimization_level: str,
+        auto_evaluate: bool,
+        include_formatted: bool = False
+    ) -> str:
+        """
+        计算精确缓存键
+
+        Args:
+            user_input: 用户输入
+            template_id: 指定的模板ID
+            optimization_level: 优化级别
+            auto_evaluate: 是否自动评估
+            include_formatted: 是否返回格式化输出
+
+        Returns:
+            str: 缓存键
+        """
+        raw = "\x1f".join([
+            user_input.strip().lower(),
+            str(template_id),
+            optimization_level,
+            str(auto_evaluate),
+            str(include_formatted)
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_scope(
+        intent: IntentResult,
+        template_id: Optional[str],
+        optimization_level: str,
+        auto_evaluate: bool,
+        include_formatted: bool = False
+    ) -> str:
+        """
+        计算关键词命中的作用域，只有作用域相同的请求才能互相命中
+
+        Args:
+            intent: 意图结果
+            template_id: 指定的模板ID
+            optimization_level: 优化级别
+            auto_evaluate: 是否自动评估
+            include_formatted: 是否返回格式化输出
+
+        Returns:
+            str: 作用域标识
+        """
+        return (
+            f"{intent.task_type.value}|{intent.domain}|{template_id}|"
+            f"{optimization_level}|{auto_evaluate}|{include_formatted}"
+        )
+
+    @staticmethod
+    def extract_keywords(intent: IntentResult) -> FrozenSet[str]:
+        """
+        从意图中提取用于近似匹配的关键词集合
+
+        Args:
+            intent: 意图结果
+
+        Returns:
+            FrozenSet[str]: 关键词集合
+        """
+        keywords = {k.strip().lower() for k in intent.keywords if k.strip()}
+        keywords.update(_TOKEN_PATTERN.findall(intent.objective.lower()))
+        keywords.update(
+            c.strip().lower()[:_CONSTRAINT_HEAD_LENGTH]
+            for c in intent.constraints if c.strip()
+        )
+        return frozenset(keywords)
+
+    def get(self, key: str):
+        """
+        精确查找
+
+        Args:
+            key: 精确缓存键
+
+        Returns:
+            缓存的响应，未命中返回 None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        logger.info("编译缓存精确命中")
+        return entry[2]
+
+    def get_by_keywords(self, scope: str, keywords: Iterable[str]):
+        """
+        按关键词重合数查找近似请求
+
+        Args:
+            scope: 作用域
+            keywords: 关键词集合
+
+        Returns:
+            重合关键词最多且达到阈值的缓存响应，未命中返回 None
+        """
+        # 先移除过期条目，索引中只剩有效的键
+        self._entries.expire()
+        index = self._keyword_index.get(scope)
+        if not index:
+            return None
+
+        overlap: Dict[str, int] = {}
+        for keyword in keywords:
+            for key in index.get(keyword, ()):
+                overlap[key] = overlap.get(key, 0) + 1
+
+        # 按重合数从高到低取第一个达到阈值的条目
+        key, count = max(overlap.items(), key=lambda item: item[1], default=(None, 0))
+        if count < self.min_keyword_overlap:
+            return None
+        logger.info(f"编译缓存关键词命中 - 重合关键词数: {count}")
+        return self._entries[key][2]
+
+    def set(self, key: str, scope: str, keywords: FrozenSet[str], response) -> None:
+        """
+        写入缓存并更新关键词索引
+
+        Args:
+            key: 精确缓存键
+            scope: 作用域
+            keywords: 关键词集合
+            response: 编译响应
+        """
+        # 覆盖已有条目时先移除其旧的关键词索引
+        old_entry = self._entries.get(key)
+        if old_entry is not None:
+            self._unindex(key, old_entry)
+        self._entries[key] = (scope, keywords, response)
+        index = self._keyword_index.setdefault(scope, {})
+        for keyword in keywords:
+            index.setdefault(keyword, set()).add(key)
+
+    def clear(self) -> None:
+        """清空缓存（模板变更时调用）"""
+        self._entries.clear()
+        self._keyword_index.clear()
+        logger.info("编译缓存已清空")
+
+    def _unindex(self, key: str, entry: tuple) -> None:
+        """
+        从关键词索引中移除键（只访问该条目自身的关键词）
+
+        Args:
+            key: 精确缓存键
+            entry: 缓存条目 (作用域, 关键词集合, 响应)
+        """
+        scope, keywords, _ = entry
+        index = self._keyword_index.get(scope)
+        if index is None:
+            return
+        for keyword in keywords:
+            keys = index.get(keyword)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del index[keyword]
+        if not index:
+            del self._keyword_index[scope]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局缓存实例
+response_cache = PromptResponseCache(
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    min_keyword_overlap=settings.RESPONSE_CACHE_MIN_KEYWORD_OVERLAP
+)
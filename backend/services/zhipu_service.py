@@ -2,10 +2,20 @@
 智谱 AI 服务封装
 提供意图提取、Prompt 优化和质量评估三大核心功能
 """
-import json
+import asyncio
+import copy
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-from zhipuai import ZhipuAI
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
+import orjson
+from cachetools import TTLCache
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from tenacity import (
+    RetryCallState, retry, retry_if_exception, stop_after_attempt, stop_after_delay,
+    wait_exponential, wait_random
+)
 
 from config import settings
 from models.prompt_models import IntentResult, TaskType
@@ -14,104 +24,506 @@ from models.evaluation_models import QualityMetrics
 logger = logging.getLogger(__name__)
 
 
+# 可重试的 HTTP 状态码：限流与服务端临时错误；鉴权、参数错误等重试也不会成功
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """判断 LLM 请求失败是否可重试（限流、服务端临时错误、网络错误）"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _RETRYABLE_STATUS
+    # 读写超时说明已等满整个请求超时，重试会让调用方（及合并等待的请求）再等一轮
+    if isinstance(error, (httpx.ReadTimeout, httpx.WriteTimeout)):
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    """重试前记录失败原因"""
+    logger.warning(
+        f"LLM 请求失败（第 {retry_state.attempt_number} 次），稍后重试: {retry_state.outcome.exception()}"
+    )
+
+
+# 各调用的最大输出 token 数：单次调用按返回内容的规模设置，批量调用按条数放大，不超过接口上限
+_MAX_OUTPUT_TOKENS = 4095
+_INTENT_MAX_TOKENS = 512
+_OPTIMIZATION_MAX_TOKENS = 1536
+_OPTIMIZATION_WITH_EVALUATION_MAX_TOKENS = 2048
+_EVALUATION_MAX_TOKENS = 800
+
+
+# 调用失败时的默认结果，模块加载时构建一次；每次返回深拷贝，调用方修改返回值不影响默认结果
+_DEFAULT_INTENT = IntentResult(
+    task_type=TaskType.OTHER,
+    domain="general",
+    objective="",
+    constraints=[],
+    keywords=[],
+    context={},
+    confidence=0.5
+)
+_DEFAULT_METRICS = QualityMetrics(
+    structure_score=0.5,
+    consistency_score=0.5,
+    completeness_score=0.5,
+    clarity_score=0.5,
+    overall_score=0.5
+)
+
+
+# 任务类型取值 -> 枚举，模型返回的任务类型直接查表转换
+_TASK_TYPES = {task_type.value: task_type for task_type in TaskType}
+
+
+class _IntentPayload(BaseModel):
+    """模型返回的意图 JSON（缺失字段取默认值），解析与校验一次完成"""
+    task_type: TaskType = TaskType.OTHER
+    domain: str = "general"
+    objective: Optional[str] = None
+    constraints: List[str] = Field(default_factory=list)
+    keywords: List[str] = Field(default_factory=list)
+    context: Dict[str, Any] = Field(default_factory=dict)
+    confidence: float = Field(default=0.8, ge=0.0, le=1.0)
+    
+    @field_validator("task_type", mode="before")
+    @classmethod
+    def _normalize_task_type(cls, value: Any) -> TaskType:
+        """未知类型（含 null）归为 other"""
+        return _TASK_TYPES.get(str(value).lower(), TaskType.OTHER)
+
+
+_INTENT_LIST_ADAPTER = TypeAdapter(List[_IntentPayload])
+
+
+# 各调用的系统提示词：内容固定，相同前缀可命中服务端的提示词缓存
+
+# 意图提取
+_INTENT_SYSTEM_PROMPT = """你是一个专业的意图分析专家。
+分析用户输入，提取以下信息并以 JSON 格式返回：
+{
+    "task_type": "任务类型（generation/analysis/conversation/extraction/transformation/reasoning/other）",
+    "domain": "领域分类（如：金融、医疗、教育、技术等）",
+    "objective": "核心目标的简洁描述",
+    "constraints": ["约束条件1", "约束条件2"],
+    "keywords": ["关键词1", "关键词2"],
+    "context": {"key": "value"},
+    "confidence": 0.95
+}
+
+请确保返回的是纯 JSON 格式，不要包含其他文字。"""
+
+# 批量意图提取
+_BATCH_INTENT_SYSTEM_PROMPT = """你是一个专业的意图分析专家。
+用户会提供多个编号的输入，请分别分析每个输入，提取以下信息：
+{
+    "task_type": "任务类型（generation/analysis/conversation/extraction/transformation/reasoning/other）",
+    "domain": "领域分类（如：金融、医疗、教育、技术等）",
+    "objective": "核心目标的简洁描述",
+    "constraints": ["约束条件1", "约束条件2"],
+    "keywords": ["关键词1", "关键词2"],
+    "context": {"key": "value"},
+    "confidence": 0.95
+}
+
+请按编号顺序返回 JSON 数组，数组长度必须与输入数量一致，不要包含其他文字。"""
+
+# Prompt 优化
+_OPTIMIZATION_SYSTEM_PROMPT = """你是一个专业的 Prompt 工程专家。
+你的任务是优化用户提供的 Prompt，使其更清晰、更具体、更有效。
+
+优化要点：
+1. 明确角色定义
+2. 清晰的任务目标
+3. 具体的约束条件
+4. 明确的输出格式要求
+5. 必要的上下文信息
+
+重要：optimized_prompt 必须是纯文本字符串，不能是 JSON 对象，而是一个完整的、可直接使用的 Prompt 文本。
+
+请返回 JSON 格式：
+{
+    "optimized_prompt": "角色：xxx\\n\\n目标：xxx\\n\\n约束条件：\\n- xxx\\n- xxx\\n\\n输出格式：xxx",
+    "improvements": ["改进点1", "改进点2", "改进点3"],
+    "explanation": "优化思路的简要说明"
+}"""
+
+# Prompt 优化并评估
+_OPTIMIZATION_WITH_EVALUATION_SYSTEM_PROMPT = """你是一个专业的 Prompt 工程专家。
+你的任务是优化用户提供的 Prompt，使其更清晰、更具体、更有效，然后评估优化后 Prompt 的质量。
+
+优化要点：
+1. 明确角色定义
+2. 清晰的任务目标
+3. 具体的约束条件
+4. 明确的输出格式要求
+5. 必要的上下文信息
+
+重要：optimized_prompt 必须是纯文本字符串，不能是 JSON 对象，而是一个完整的、可直接使用的 Prompt 文本。
+
+评估维度（针对优化后的 Prompt，每项 0-1 分）：
+1. structure_score（结构合规率）：是否包含角色、目标、约束、输出格式等完整结构
+2. consistency_score（目标一致性）：各部分是否围绕核心目标，无矛盾
+3. completeness_score（语义完整度）：信息是否完整，无歧义
+4. clarity_score（表达清晰度）：语言是否清晰、简洁、易懂
+
+请返回 JSON 格式：
+{
+    "optimized_prompt": "角色：xxx\\n\\n目标：xxx\\n\\n约束条件：\\n- xxx\\n- xxx\\n\\n输出格式：xxx",
+    "improvements": ["改进点1", "改进点2", "改进点3"],
+    "explanation": "优化思路的简要说明",
+    "evaluation": {
+        "structure_score": 0.85,
+        "consistency_score": 0.90,
+        "completeness_score": 0.80,
+        "clarity_score": 0.88,
+        "strengths": ["优点1", "优点2"],
+        "weaknesses": ["不足1", "不足2"],
+        "suggestions": ["建议1", "建议2"],
+        "analysis": "详细分析说明"
+    }
+}"""
+
+# 质量评估
+_EVALUATION_SYSTEM_PROMPT = """你是一个专业的 Prompt 质量评估专家。
+请从以下维度评估 Prompt 的质量（每项 0-1 分）：
+
+1. structure_score（结构合规率）：是否包含角色、目标、约束、输出格式等完整结构
+2. consistency_score（目标一致性）：各部分是否围绕核心目标，无矛盾
+3. completeness_score（语义完整度）：信息是否完整，无歧义
+4. clarity_score（表达清晰度）：语言是否清晰、简洁、易懂
+
+请返回 JSON 格式：
+{
+    "structure_score": 0.85,
+    "consistency_score": 0.90,
+    "completeness_score": 0.80,
+    "clarity_score": 0.88,
+    "strengths": ["优点1", "优点2"],
+    "weaknesses": ["不足1", "不足2"],
+    "suggestions": ["建议1", "建议2"],
+    "analysis": "详细分析说明"
+}"""
+
+# 批量质量评估
+_BATCH_EVALUATION_SYSTEM_PROMPT = """你是一个专业的 Prompt 质量评估专家。
+用户会提供多个编号的 Prompt，请分别从以下维度评估每个 Prompt 的质量（每项 0-1 分）：
+
+1. structure_score（结构合规率）：是否包含角色、目标、约束、输出格式等完整结构
+2. consistency_score（目标一致性）：各部分是否围绕核心目标，无矛盾
+3. completeness_score（语义完整度）：信息是否完整，无歧义
+4. clarity_score（表达清晰度）：语言是否清晰、简洁、易懂
+
+请按编号顺序返回 JSON 数组，数组长度必须与 Prompt 数量一致：
+[
+    {
+        "structure_score": 0.85,
+        "consistency_score": 0.90,
+        "completeness_score": 0.80,
+        "clarity_score": 0.88,
+        "strengths": ["优点1", "优点2"],
+        "weaknesses": ["不足1", "不足2"],
+        "suggestions": ["建议1", "建议2"],
+        "analysis": "详细分析说明"
+    }
+]"""
+
+
+def _cache_key(kind: str, *parts: Optional[str]) -> Tuple[str, bytes]:
+    """
+    计算 LLM 调用结果的缓存键
+    
+    Args:
+        kind: 调用类型
+        *parts: 参与计算的输入（None 视为空）
+        
+    Returns:
+        Tuple[str, bytes]: (调用类型, 输入摘要)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return kind, digest.digest()
+
+
+def _strip_code_fence(content: str) -> str:
+    """
+    移除模型回复中包裹 JSON 的 markdown 代码块标记
+    
+    JSON 模式下一般不会出现，保留用于批量调用及忽略 response_format 的情况
+    
+    Args:
+        content: 模型回复内容
+        
+    Returns:
+        str: 去除代码块标记和首尾空白后的内容
+    """
+    content = content.strip()
+    # 多数回复不带代码块标记，直接返回
+    if "```" not in content:
+        return content
+    return content.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
+
+def _intent_json(intent: Optional[IntentResult]) -> Optional[str]:
+    """意图信息参与缓存键计算时的序列化形式"""
+    return intent.model_dump_json() if intent is not None else None
+
+
 class ZhipuAIService:
     """智谱 AI 服务类"""
     
     def __init__(self):
         """初始化智谱 AI 客户端"""
-        self.client = ZhipuAI(api_key=settings.ZHIPU_API_KEY)
+        # 异步 HTTP 客户端直接调用对话补全接口：等待响应期间不阻塞事件循环，连接在请求间复用
+        self.client = httpx.AsyncClient(
+            base_url=settings.ZHIPU_BASE_URL,
+            headers={"Authorization": f"Bearer {settings.ZHIPU_API_KEY}"},
+            timeout=httpx.Timeout(settings.ZHIPU_TIMEOUT, connect=settings.ZHIPU_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.ZHIPU_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ZHIPU_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
         self.model = "glm-4-flash"  # 使用 glm-4-flash 模型
+        # 相同输入的调用结果缓存（仅缓存成功结果；读写均复制，调用方之间不共享对象）
+        self._cache: TTLCache = TTLCache(maxsize=settings.LLM_CACHE_MAXSIZE, ttl=settings.LLM_CACHE_TTL)
+    
+    def _cache_get(self, key: Optional[str]) -> Any:
+        """
+        读取缓存结果的副本（调用方修改返回值不影响缓存）
+        
+        Args:
+            key: 缓存键（None 表示不使用缓存）
+            
+        Returns:
+            Any: 缓存结果的副本，未命中返回 None
+        """
+        if key is None:
+            return None
+        cached = self._cache.get(key)
+        return copy.deepcopy(cached) if cached is not None else None
+    
+    def _cache_put(self, key: str, value: Any) -> None:
+        """写入结果的副本，返回给调用方的对象与缓存互不影响"""
+        self._cache[key] = copy.deepcopy(value)
     
-    async def intent_extraction(self, user_input: str) -> IntentResult:
+    def store_evaluation(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult],
+        evaluation: Dict[str, Any]
+    ) -> None:
+        """
+        写入已有的评估结果（如优化时一并得到的评估），后续相同的质量评估直接复用
+        
+        Args:
+            prompt_text: 被评估的 Prompt
+            intent: 意图信息
+            evaluation: 评估结果（包含 metrics）；失败时的默认结果不缓存
+        """
+        if not evaluation.get("is_fallback"):
+            self._cache_put(_cache_key("evaluation", prompt_text, _intent_json(intent)), evaluation)
+    
+    async def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        json_object: bool = True
+    ) -> str:
+        """
+        调用对话补全接口
+        
+        Args:
+            messages: 对话消息列表
+            temperature: 采样温度
+            max_tokens: 最大输出 token 数
+            json_object: 是否要求模型只输出一个 JSON 对象（JSON 模式不支持顶层数组）
+            
+        Returns:
+            str: 模型回复内容
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if json_object:
+            payload["response_format"] = {"type": "json_object"}
+        
+        response = await self._post_chat(payload)
+        # orjson 直接解析响应字节，省去解码为 str 的一步
+        return orjson.loads(response.content)["choices"][0]["message"]["content"]
+    
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        stop=stop_after_attempt(settings.ZHIPU_MAX_ATTEMPTS) | stop_after_delay(settings.ZHIPU_RETRY_BUDGET),
+        wait=wait_exponential(multiplier=0.2, max=4) + wait_random(0, 0.2),
+        before_sleep=_log_retry,
+        reraise=True
+    )
+    async def _post_chat(self, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        发送对话补全请求，限流、服务端临时错误和网络错误时指数退避重试
+        
+        Args:
+            payload: 请求体
+            
+        Returns:
+            httpx.Response: 成功的响应
+        """
+        response = await self.client.post("/chat/completions", json=payload)
+        response.raise_for_status()
+        return response
+    
+    async def aclose(self):
+        """关闭 HTTP 客户端及其连接"""
+        await self.client.aclose()
+    
+    async def intent_extraction(self, user_input: str, use_cache: bool = True) -> IntentResult:
         """
         意图提取：分析用户输入，识别任务类型、领域和目标
         
         Args:
             user_input: 用户原始输入
+            use_cache: 是否使用结果缓存
             
         Returns:
             IntentResult: 意图提取结果
         """
+        key = _cache_key("intent", user_input) if use_cache else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info("意图提取命中缓存")
+            return cached
+        
         try:
-            # 构建意图提取的 Prompt
-            system_prompt = """你是一个专业的意图分析专家。
-分析用户输入，提取以下信息并以 JSON 格式返回：
-{
-    "task_type": "任务类型（generation/analysis/conversation/extraction/transformation/reasoning/other）",
-    "domain": "领域分类（如：金融、医疗、教育、技术等）",
-    "objective": "核心目标的简洁描述",
-    "constraints": ["约束条件1", "约束条件2"],
-    "keywords": ["关键词1", "关键词2"],
-    "context": {"key": "value"},
-    "confidence": 0.95
-}
-
-请确保返回的是纯 JSON 格式，不要包含其他文字。"""
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _INTENT_SYSTEM_PROMPT},
                     {"role": "user", "content": f"请分析以下用户输入：\n{user_input}"}
                 ],
                 temperature=0.3,  # 较低温度以保证稳定性
+                max_tokens=_INTENT_MAX_TOKENS
             )
-            
-            # 解析响应
-            content = response.choices[0].message.content
-            logger.info(f"意图提取原始响应: {content}")
+            logger.info("意图提取原始响应: %s", content)
             
             # 提取 JSON 部分（移除可能的 markdown 代码块）
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            intent_data = json.loads(content)
-            
-            # 验证并转换任务类型
-            task_type_str = intent_data.get("task_type", "other").lower()
-            try:
-                task_type = TaskType(task_type_str)
-            except ValueError:
-                task_type = TaskType.OTHER
-            
-            # 构建 IntentResult 对象
-            intent_result = IntentResult(
-                task_type=task_type,
-                domain=intent_data.get("domain", "general"),
-                objective=intent_data.get("objective", user_input),
-                constraints=intent_data.get("constraints", []),
-                keywords=intent_data.get("keywords", []),
-                context=intent_data.get("context", {}),
-                confidence=intent_data.get("confidence", 0.8)
-            )
+            content = _strip_code_fence(content)
+            
+            intent_result = self._build_intent(_IntentPayload.model_validate_json(content), user_input)
             
             logger.info(f"意图提取成功: {intent_result.task_type} - {intent_result.domain}")
+            if key is not None:
+                self._cache_put(key, intent_result)
             return intent_result
             
-        except Exception as e:
-            logger.error(f"意图提取失败: {e}")
+        except Exception:
+            logger.exception("意图提取失败")
             # 返回默认结果
-            return IntentResult(
-                task_type=TaskType.OTHER,
-                domain="general",
-                objective=user_input,
-                constraints=[],
-                keywords=[],
-                context={},
-                confidence=0.5
+            return _DEFAULT_INTENT.model_copy(update={"objective": user_input}, deep=True)
+    
+    async def batch_intent_extraction(self, user_inputs: List[str]) -> List[IntentResult]:
+        """
+        批量意图提取：一次请求分析多个用户输入
+        
+        已缓存的输入不再发送给模型
+        
+        Args:
+            user_inputs: 用户输入列表
+            
+        Returns:
+            List[IntentResult]: 与输入顺序一致的意图提取结果列表
+        """
+        keys = [_cache_key("intent", user_input) for user_input in user_inputs]
+        results = [self._cache_get(key) for key in keys]
+        missing = [index for index, result in enumerate(results) if result is None]
+        
+        if len(missing) == 1:
+            index = missing[0]
+            results[index] = await self.intent_extraction(user_inputs[index])
+            return results
+        
+        if not missing:
+            return results
+        
+        try:
+            parts = [f"请分析以下 {len(missing)} 个用户输入："]
+            for number, index in enumerate(missing, 1):
+                parts.append(f"\n\n### 输入 {number}\n{user_inputs[index]}")
+            
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _BATCH_INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": "".join(parts)}
+                ],
+                temperature=0.3,
+                max_tokens=min(_INTENT_MAX_TOKENS * len(missing), _MAX_OUTPUT_TOKENS),
+                json_object=False
             )
+            logger.info("批量意图提取原始响应: %s...", content[:200])
+            
+            # 提取 JSON 部分
+            content = _strip_code_fence(content)
+            
+            payloads = _INTENT_LIST_ADAPTER.validate_json(content)
+            if len(payloads) != len(missing):
+                raise ValueError("批量意图提取结果数量与输入不一致")
+            
+            extracted = [
+                self._build_intent(payload, user_inputs[index])
+                for index, payload in zip(missing, payloads)
+            ]
+            
+        except Exception:
+            logger.exception("批量意图提取失败，改为逐个提取")
+            extracted = await asyncio.gather(*[
+                self.intent_extraction(user_inputs[index])
+                for index in missing
+            ])
+            for index, intent_result in zip(missing, extracted):
+                results[index] = intent_result
+            return results
+        
+        for index, intent_result in zip(missing, extracted):
+            results[index] = intent_result
+            self._cache_put(keys[index], intent_result)
+        
+        logger.info(f"批量意图提取成功，共 {len(missing)} 个")
+        return results
+    
+    @staticmethod
+    def _build_intent(payload: _IntentPayload, user_input: str) -> IntentResult:
+        """
+        根据已校验的模型返回构建意图提取结果
+        
+        Args:
+            payload: 模型返回的意图
+            user_input: 对应的用户输入（目标缺失时使用）
+            
+        Returns:
+            IntentResult: 意图提取结果
+        """
+        # 字段已在解析时校验，直接构建，不再重复校验
+        return IntentResult.model_construct(
+            task_type=payload.task_type,
+            domain=payload.domain,
+            objective=payload.objective or user_input,
+            constraints=payload.constraints,
+            keywords=payload.keywords,
+            context=payload.context,
+            confidence=payload.confidence
+        )
     
     async def prompt_optimization(
         self,
         prompt_text: str,
         intent: Optional[IntentResult] = None,
-        focus_areas: Optional[list] = None
+        focus_areas: Optional[list] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Prompt 优化：重写并增强 Prompt 的质量
@@ -120,67 +532,120 @@ class ZhipuAIService:
             prompt_text: 原始 Prompt 文本
             intent: 意图信息（可选）
             focus_areas: 重点优化的方面（可选）
+            use_cache: 是否使用结果缓存
             
         Returns:
             Dict: 包含优化后的 Prompt 和改进说明
         """
+        key = _cache_key(
+            "optimization", prompt_text, _intent_json(intent), ",".join(focus_areas or [])
+        ) if use_cache else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info("Prompt 优化命中缓存")
+            return cached
+        
         try:
-            # 构建优化 Prompt
-            system_prompt = """你是一个专业的 Prompt 工程专家。
-你的任务是优化用户提供的 Prompt，使其更清晰、更具体、更有效。
-
-优化要点：
-1. 明确角色定义
-2. 清晰的任务目标
-3. 具体的约束条件
-4. 明确的输出格式要求
-5. 必要的上下文信息
-
-重要：optimized_prompt 必须是纯文本字符串，不能是 JSON 对象，而是一个完整的、可直接使用的 Prompt 文本。
-
-请返回 JSON 格式：
-{
-    "optimized_prompt": "角色：xxx\\n\\n目标：xxx\\n\\n约束条件：\\n- xxx\\n- xxx\\n\\n输出格式：xxx",
-    "improvements": ["改进点1", "改进点2", "改进点3"],
-    "explanation": "优化思路的简要说明"
-}"""
-            
-            user_message = f"请优化以下 Prompt：\n\n{prompt_text}"
+            parts = [f"请优化以下 Prompt：\n\n{prompt_text}"]
             
             if intent:
-                user_message += f"\n\n任务类型：{intent.task_type}\n领域：{intent.domain}\n目标：{intent.objective}"
+                parts.append(f"\n\n任务类型：{intent.task_type}\n领域：{intent.domain}\n目标：{intent.objective}")
             
             if focus_areas:
-                user_message += f"\n\n重点优化方面：{', '.join(focus_areas)}"
+                parts.append(f"\n\n重点优化方面：{', '.join(focus_areas)}")
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _OPTIMIZATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": "".join(parts)}
                 ],
                 temperature=0.5,
+                max_tokens=_OPTIMIZATION_MAX_TOKENS
             )
-            
-            content = response.choices[0].message.content
-            logger.info(f"Prompt 优化原始响应: {content[:200]}...")
+            logger.info("Prompt 优化原始响应: %s...", content[:200])
             
             # 提取 JSON 部分
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            result = json.loads(content)
+            content = _strip_code_fence(content)
+            
+            result = orjson.loads(content)
             logger.info("Prompt 优化成功")
+            if key is not None:
+                self._cache_put(key, result)
             return result
             
-        except Exception as e:
-            logger.error(f"Prompt 优化失败: {e}")
+        except Exception:
+            logger.exception("Prompt 优化失败")
+            return {
+                "optimized_prompt": prompt_text,
+                "improvements": [],
+                "explanation": "优化过程出现错误，返回原始 Prompt"
+            }
+    
+    async def prompt_optimization_with_evaluation(
+        self,
+        prompt_text: str,
+        intent: Optional[IntentResult] = None,
+        focus_areas: Optional[list] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Prompt 优化并评估：一次请求完成优化，同时给出优化后 Prompt 的质量评估
+        
+        评估对象是模型在同一响应中生成的优化结果，省去一次单独的评估调用
+        
+        Args:
+            prompt_text: 原始 Prompt 文本
+            intent: 意图信息（可选）
+            focus_areas: 重点优化的方面（可选）
+            use_cache: 是否使用结果缓存
+            
+        Returns:
+            Dict: 优化结果；评估成功时附带 evaluation（包含 metrics 的评估结果）
+        """
+        key = _cache_key(
+            "optimization_with_evaluation", prompt_text, _intent_json(intent), ",".join(focus_areas or [])
+        ) if use_cache else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info("Prompt 优化并评估命中缓存")
+            return cached
+        
+        try:
+            parts = [f"请优化以下 Prompt，并评估优化后的质量：\n\n{prompt_text}"]
+            
+            if intent:
+                parts.append(f"\n\n任务类型：{intent.task_type}\n领域：{intent.domain}\n目标：{intent.objective}")
+            
+            if focus_areas:
+                parts.append(f"\n\n重点优化方面：{', '.join(focus_areas)}")
+            
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _OPTIMIZATION_WITH_EVALUATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": "".join(parts)}
+                ],
+                temperature=0.5,
+                max_tokens=_OPTIMIZATION_WITH_EVALUATION_MAX_TOKENS
+            )
+            logger.info("Prompt 优化并评估原始响应: %s...", content[:200])
+            
+            # 提取 JSON 部分
+            content = _strip_code_fence(content)
+            
+            result = orjson.loads(content)
+            
+            # 缺少评估部分时不附带 evaluation，由调用方单独评估
+            evaluation = result.pop("evaluation", None)
+            if isinstance(evaluation, dict):
+                result["evaluation"] = self._build_evaluation(evaluation)
+            
+            logger.info("Prompt 优化并评估成功")
+            if key is not None:
+                self._cache_put(key, result)
+            return result
+            
+        except Exception:
+            logger.exception("Prompt 优化并评估失败")
             return {
                 "optimized_prompt": prompt_text,
                 "improvements": [],
@@ -190,7 +655,8 @@ class ZhipuAIService:
     async def quality_evaluation(
         self,
         prompt_text: str,
-        intent: Optional[IntentResult] = None
+        intent: Optional[IntentResult] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         质量评估：多维度评估 Prompt 的质量
@@ -198,90 +664,162 @@ class ZhipuAIService:
         Args:
             prompt_text: 待评估的 Prompt 文本
             intent: 意图信息（可选，用于更准确的评估）
+            use_cache: 是否使用结果缓存
             
         Returns:
             Dict: 包含质量指标和详细分析
         """
+        key = _cache_key("evaluation", prompt_text, _intent_json(intent)) if use_cache else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info("质量评估命中缓存")
+            return cached
+        
         try:
-            # 构建评估 Prompt
-            system_prompt = """你是一个专业的 Prompt 质量评估专家。
-请从以下维度评估 Prompt 的质量（每项 0-1 分）：
-
-1. structure_score（结构合规率）：是否包含角色、目标、约束、输出格式等完整结构
-2. consistency_score（目标一致性）：各部分是否围绕核心目标，无矛盾
-3. completeness_score（语义完整度）：信息是否完整，无歧义
-4. clarity_score（表达清晰度）：语言是否清晰、简洁、易懂
-
-请返回 JSON 格式：
-{
-    "structure_score": 0.85,
-    "consistency_score": 0.90,
-    "completeness_score": 0.80,
-    "clarity_score": 0.88,
-    "strengths": ["优点1", "优点2"],
-    "weaknesses": ["不足1", "不足2"],
-    "suggestions": ["建议1", "建议2"],
-    "analysis": "详细分析说明"
-}"""
-            
-            user_message = f"请评估以下 Prompt 的质量：\n\n{prompt_text}"
+            parts = [f"请评估以下 Prompt 的质量：\n\n{prompt_text}"]
             
             if intent:
-                user_message += f"\n\n预期任务类型：{intent.task_type}\n预期目标：{intent.objective}"
+                parts.append(f"\n\n预期任务类型：{intent.task_type}\n预期目标：{intent.objective}")
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _EVALUATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": "".join(parts)}
                 ],
                 temperature=0.3,
+                max_tokens=_EVALUATION_MAX_TOKENS
             )
-            
-            content = response.choices[0].message.content
-            logger.info(f"质量评估原始响应: {content[:200]}...")
+            logger.info("质量评估原始响应: %s...", content[:200])
             
             # 提取 JSON 部分
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            result = json.loads(content)
-            
-            # 计算综合评分
-            metrics = QualityMetrics(
-                structure_score=result.get("structure_score", 0.7),
-                consistency_score=result.get("consistency_score", 0.7),
-                completeness_score=result.get("completeness_score", 0.7),
-                clarity_score=result.get("clarity_score", 0.7),
-                overall_score=0.0
-            )
-            metrics.calculate_overall()
+            content = _strip_code_fence(content)
             
-            result["metrics"] = metrics
-            logger.info(f"质量评估成功，综合评分: {metrics.overall_score:.2f}")
+            result = self._build_evaluation(orjson.loads(content))
+            logger.info(f"质量评估成功，综合评分: {result['metrics'].overall_score:.2f}")
+            if key is not None:
+                self._cache_put(key, result)
             return result
             
-        except Exception as e:
-            logger.error(f"质量评估失败: {e}")
-            # 返回默认评估
-            default_metrics = QualityMetrics(
-                structure_score=0.5,
-                consistency_score=0.5,
-                completeness_score=0.5,
-                clarity_score=0.5,
-                overall_score=0.5
+        except Exception:
+            logger.exception("质量评估失败")
+            return self._default_evaluation()
+    
+    async def batch_quality_evaluation(
+        self,
+        items: List[Tuple[str, Optional[IntentResult]]],
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        批量质量评估：一次请求评估多个 Prompt
+        
+        Args:
+            items: 待评估列表 [(prompt_text, intent), ...]
+            use_cache: 是否使用结果缓存（命中的条目不再发送给模型）
+            
+        Returns:
+            List[Dict]: 与输入顺序一致的评估结果列表
+        """
+        if use_cache:
+            keys = [_cache_key("evaluation", prompt_text, _intent_json(intent)) for prompt_text, intent in items]
+            results = [self._cache_get(key) for key in keys]
+            missing = [index for index, result in enumerate(results) if result is None]
+            if missing:
+                evaluated = await self.batch_quality_evaluation(
+                    [items[index] for index in missing],
+                    use_cache=False
+                )
+                for index, result in zip(missing, evaluated):
+                    results[index] = result
+                    if not result.get("is_fallback"):
+                        self._cache_put(keys[index], result)
+            return results
+        
+        if len(items) == 1:
+            prompt_text, intent = items[0]
+            return [await self.quality_evaluation(prompt_text, intent, use_cache=False)]
+        
+        try:
+            parts = [f"请评估以下 {len(items)} 个 Prompt 的质量："]
+            for index, (prompt_text, intent) in enumerate(items, 1):
+                parts.append(f"\n\n### Prompt {index}\n{prompt_text}")
+                if intent:
+                    parts.append(f"\n\n预期任务类型：{intent.task_type}\n预期目标：{intent.objective}")
+            
+            content = await self._chat(
+                [
+                    {"role": "system", "content": _BATCH_EVALUATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": "".join(parts)}
+                ],
+                temperature=0.3,
+                max_tokens=min(_EVALUATION_MAX_TOKENS * len(items), _MAX_OUTPUT_TOKENS),
+                json_object=False
             )
-            return {
-                "metrics": default_metrics,
-                "strengths": [],
-                "weaknesses": ["评估过程出现错误"],
-                "suggestions": ["请检查 Prompt 格式"],
-                "analysis": "无法完成详细分析"
-            }
+            logger.info("批量质量评估原始响应: %s...", content[:200])
+            
+            # 提取 JSON 部分
+            content = _strip_code_fence(content)
+            
+            results = orjson.loads(content)
+            if not isinstance(results, list) or len(results) != len(items):
+                raise ValueError("批量评估结果数量与输入不一致")
+            
+            logger.info(f"批量质量评估成功，共 {len(results)} 个")
+            return [self._build_evaluation(result) for result in results]
+            
+        except Exception:
+            logger.exception("批量质量评估失败，改为逐个评估")
+            return list(await asyncio.gather(*[
+                self.quality_evaluation(prompt_text, intent, use_cache=False)
+                for prompt_text, intent in items
+            ]))
+    
+    @staticmethod
+    def _build_evaluation(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据模型返回的评分构建评估结果
+        
+        Args:
+            result: 模型返回的 JSON 对象
+            
+        Returns:
+            Dict: 附带 metrics 的评估结果
+        """
+        # 计算综合评分
+        metrics = QualityMetrics(
+            structure_score=result.get("structure_score", 0.7),
+            consistency_score=result.get("consistency_score", 0.7),
+            completeness_score=result.get("completeness_score", 0.7),
+            clarity_score=result.get("clarity_score", 0.7),
+            overall_score=0.0
+        )
+        metrics.calculate_overall()
+        
+        result["metrics"] = metrics
+        return result
+    
+    @staticmethod
+    def _default_evaluation() -> Dict[str, Any]:
+        """评估失败时返回的默认评估结果"""
+        return {
+            "metrics": _DEFAULT_METRICS.model_copy(),
+            "strengths": [],
+            "weaknesses": ["评估过程出现错误"],
+            "suggestions": ["请检查 Prompt 格式"],
+            "analysis": "无法完成详细分析",
+            # 标记为失败时的默认结果，调用方据此避免缓存
+            "is_fallback": True
+        }
 
+
+
+@lru_cache(maxsize=1)
+def get_shared_service() -> ZhipuAIService:
+    """
+    获取进程内共享的智谱 AI 服务实例
+    
+    各模块共用同一个客户端（及其底层 HTTP 连接池），避免每个模块各自建立连接
+    
+    Returns:
+        ZhipuAIService: 共享的服务实例
+    """
+    return ZhipuAIService()
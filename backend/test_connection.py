@@ -3,9 +3,35 @@
 用于验证数据库配置是否正确
 """
 import asyncio
+from functools import lru_cache
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import settings
 
+
+@lru_cache(maxsize=1)
+def get_client() -> AsyncIOMotorClient:
+    """获取复用的数据库客户端（同一事件循环内多次调用 test_connection 时不重复建立连接池）"""
+    return AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        maxPoolSize=1
+    )
+
+
+# 应用运行所需的读写权限
+_REQUIRED_ACTIONS = {"find", "insert", "update", "remove"}
+
+
+def _granted_actions(privileges: list, db_name: str) -> set:
+    """汇总作用于指定数据库（或任意资源）的权限操作"""
+    granted = set()
+    for privilege in privileges:
+        resource = privilege.get("resource", {})
+        if resource.get("anyResource") or resource.get("db") in (db_name, ""):
+            granted.update(privilege.get("actions", []))
+    return granted
+
+
 async def test_connection():
     """测试数据库连接"""
     print("正在测试 MongoDB 连接...")
@@ -13,12 +39,11 @@ async def test_connection():
     print(f"数据库名: {settings.MONGODB_DB_NAME}")
     
     try:
-        # 创建客户端
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        client = get_client()
         
         # 测试连接
-        await client.admin.command('ping')
-        print("✓ 数据库连接成功！")
+        hello = await client.admin.command('hello')
+        print(f"✓ 数据库连接成功！（主节点: {hello.get('isWritablePrimary', False)}）")
         
         # 获取数据库
         db = client[settings.MONGODB_DB_NAME]
@@ -27,21 +52,20 @@ async def test_connection():
         collections = await db.list_collection_names()
         print(f"✓ 当前数据库中的集合: {collections if collections else '(空)'}")
         
-        # 测试写入权限
-        test_collection = db.test_connection
-        result = await test_collection.insert_one({"test": "connection", "timestamp": "test"})
-        print(f"✓ 写入测试成功，文档ID: {result.inserted_id}")
-        
-        # 测试读取权限
-        doc = await test_collection.find_one({"_id": result.inserted_id})
-        print(f"✓ 读取测试成功: {doc}")
-        
-        # 清理测试数据
-        await test_collection.delete_one({"_id": result.inserted_id})
-        print("✓ 清理测试数据成功")
+        # 检查读写权限（读取当前用户的权限信息，不写入数据）
+        status = await client.admin.command("connectionStatus", showPrivileges=True)
+        auth_info = status.get("authInfo", {})
+        if not auth_info.get("authenticatedUsers"):
+            print("✓ 服务器未启用认证或未使用账号登录，跳过权限检查")
+        else:
+            missing = _REQUIRED_ACTIONS - _granted_actions(
+                auth_info.get("authenticatedUserPrivileges", []),
+                settings.MONGODB_DB_NAME
+            )
+            if missing:
+                raise PermissionError(f"当前用户缺少权限: {', '.join(sorted(missing))}")
+            print("✓ 读写权限检查通过")
         
-        # 关闭连接
-        client.close()
         print("\n✅ 所有数据库连接测试通过！")
         return True
         
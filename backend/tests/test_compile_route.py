@@ -0,0 +1,119 @@
+"""
+编译路由测试
+"""
+import pytest
+from fastapi import BackgroundTasks
+
+from api.routes import compile as compile_route
+from models.api_models import CompileRequest
+from models.prompt_models import IntentResult, OptimizationLevel, TaskType
+from modules.evaluation import MetricsCalculator
+from services.response_cache import response_cache
+
+
+class _TemplateManager:
+    async def get_template(self, template_id):
+        return None
+
+    async def find_best_template(self, intent):
+        return None
+
+
+class _VersionManager:
+    def __init__(self):
+        self.saved = []
+
+    async def save_version(self, compiled_prompt):
+        self.saved.append(compiled_prompt)
+
+
+@pytest.fixture
+def intents(monkeypatch):
+    """按用户输入返回预设意图"""
+    table = {}
+
+    async def extract(user_input):
+        return table[user_input]
+
+    monkeypatch.setattr(compile_route.batched_intent_extractor, "extract", extract)
+    response_cache.clear()
+    yield table
+    response_cache.clear()
+
+
+def _intent(keywords, confidence=0.9):
+    return IntentResult(
+        task_type=TaskType.ANALYSIS,
+        domain="金融",
+        objective="分析财报数据",
+        constraints=["输出使用表格"],
+        keywords=keywords,
+        confidence=confidence
+    )
+
+
+async def _compile(request, version_manager):
+    return await compile_route.compile_prompt(
+        request,
+        BackgroundTasks(),
+        template_manager=_TemplateManager(),
+        version_manager=version_manager
+    )
+
+
+@pytest.mark.asyncio
+class TestCompileRoute:
+    """编译路由测试"""
+
+    async def test_keyword_hit_builds_response_for_current_request(self, intents):
+        intents["分析利润"] = _intent(["财报", "分析", "利润"])
+        intents["分析营收"] = _intent(["财报", "分析", "营收"])
+        version_manager = _VersionManager()
+
+        first = await _compile(
+            CompileRequest(user_input="分析利润", optimization_level=OptimizationLevel.LOW, auto_evaluate=False),
+            version_manager
+        )
+        second = await _compile(
+            CompileRequest(user_input="分析营收", optimization_level=OptimizationLevel.LOW, auto_evaluate=False),
+            version_manager
+        )
+
+        assert second.compiled_prompt.original_input == "分析营收"
+        assert second.compiled_prompt.version_id != first.compiled_prompt.version_id
+        assert second.compiled_prompt.full_prompt == first.compiled_prompt.full_prompt
+        assert [p.original_input for p in version_manager.saved] == ["分析利润", "分析营收"]
+
+    async def test_one_line_input_reaches_optimizer(self, intents, monkeypatch):
+        intents["写"] = _intent(["写"], confidence=0.95)
+        calls = []
+
+        async def optimize(prompt_text, intent=None, optimization_level=None):
+            calls.append(prompt_text)
+            return {}
+
+        monkeypatch.setattr(compile_route._optimizer, "optimize", optimize)
+        await _compile(
+            CompileRequest(user_input="写", optimization_level=OptimizationLevel.MEDIUM, auto_evaluate=False),
+            _VersionManager()
+        )
+
+        assert len(calls) == 1
+
+    async def test_structured_input_skips_optimization_and_evaluation(self, intents, monkeypatch):
+        user_input = "角色: 财务分析师\n目标: 分析本季度财报\n约束: 只使用公开数据\n输出格式: Markdown 表格, 按业务线列出营收与利润"
+        intents[user_input] = _intent(["财报"], confidence=0.95)
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("不应调用 LLM")
+
+        monkeypatch.setattr(compile_route._optimizer, "optimize_and_evaluate", fail)
+        monkeypatch.setattr(compile_route.batched_evaluator, "submit", fail)
+        response = await _compile(
+            CompileRequest(user_input=user_input, optimization_level=OptimizationLevel.MEDIUM, auto_evaluate=True),
+            _VersionManager()
+        )
+
+        expected = MetricsCalculator().calculate_metrics(response.compiled_prompt.full_prompt)
+        assert response.metrics == expected
+        assert response.compiled_prompt.optimized is False
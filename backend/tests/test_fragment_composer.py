@@ -0,0 +1,45 @@
+"""
+片段组合器测试
+"""
+from modules.template_engine import FragmentComposer
+from models.prompt_models import IntentResult, TaskType
+
+
+def _intent(**overrides) -> IntentResult:
+    data = {
+        "task_type": TaskType.ANALYSIS,
+        "domain": "金融",
+        "objective": "分析季度财报",
+        "constraints": ["数据准确", "结论简洁"],
+        "context": {"公司": "示例公司", "季度": "Q3"},
+        "confidence": 0.9,
+    }
+    data.update(overrides)
+    return IntentResult(**data)
+
+
+class TestFragmentComposer:
+    """片段组合器测试"""
+
+    def test_compose_from_intent_formats_lists_and_context(self):
+        prompt = FragmentComposer().compose_from_intent(_intent(), "分析财报")
+        assert "你是一位专业的金融数据分析专家" in prompt
+        assert "1. 数据准确\n2. 结论简洁" in prompt
+        assert "- 公司: 示例公司\n- 季度: Q3" in prompt
+
+    def test_compose_from_intent_defaults(self):
+        prompt = FragmentComposer().compose_from_intent(
+            _intent(constraints=[], context={}), "分析财报"
+        )
+        assert "无特殊约束" in prompt
+        assert "无额外上下文" in prompt
+
+    def test_add_examples(self):
+        composer = FragmentComposer()
+        assert composer.add_examples("原始", []) == "原始"
+        result = composer.add_examples("原始", [{"input": "a", "output": "b"}, {"input": "c"}])
+        assert result == (
+            "原始\n\n# 参考示例\n\n"
+            "## 示例 1\n输入: a\n输出: b\n\n"
+            "## 示例 2\n输入: c\n输出: \n\n"
+        )
@@ -0,0 +1,45 @@
+"""
+历史记录路由测试
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from api.routes import history as history_route
+from modules.output.version_manager import VersionManager
+
+
+class _VersionManager:
+    def __init__(self):
+        self.calls = []
+
+    async def list_versions(self, limit, skip, after):
+        self.calls.append((skip, after))
+        return []
+
+    async def count_versions(self):
+        return 0
+
+
+CURSOR = VersionManager.encode_page_cursor(datetime(2024, 1, 1), "v1")
+
+
+@pytest.mark.asyncio
+class TestHistoryRoute:
+    """历史记录路由测试"""
+
+    async def test_cursor_with_skip_is_rejected(self):
+        manager = _VersionManager()
+        with pytest.raises(HTTPException) as exc_info:
+            await history_route.list_history(limit=20, skip=20, cursor=CURSOR, manager=manager)
+        assert exc_info.value.status_code == 400
+        assert manager.calls == []
+
+    async def test_page_only_for_offset_requests(self):
+        manager = _VersionManager()
+        offset_page = await history_route.list_history(limit=20, skip=40, cursor=None, manager=manager)
+        cursor_page = await history_route.list_history(limit=20, skip=0, cursor=CURSOR, manager=manager)
+        assert offset_page.page == 3
+        assert cursor_page.page is None
+        assert manager.calls == [(40, None), (0, (datetime(2024, 1, 1), "v1"))]
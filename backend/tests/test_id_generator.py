@@ -0,0 +1,39 @@
+"""
+ID 生成器测试
+"""
+import os
+import uuid
+
+import pytest
+
+from models.id_generator import _UUIDPool, generate_id
+
+
+class TestIdGenerator:
+    """ID 生成器测试"""
+
+    def test_generates_valid_uuid4(self):
+        value = uuid.UUID(generate_id())
+        assert value.version == 4
+        assert value.variant == uuid.RFC_4122
+
+    def test_unique_across_batches(self):
+        pool = _UUIDPool(batch=4)
+        ids = [pool.get() for _ in range(20)]
+        assert len(set(ids)) == 20
+
+    def test_child_process_does_not_reuse_parent_buffer(self):
+        if not hasattr(os, "fork"):
+            pytest.skip("需要 os.fork")
+        generate_id()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.write(write_fd, generate_id().encode())
+            os._exit(0)
+        os.close(write_fd)
+        child_id = os.read(read_fd, 64).decode()
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        assert child_id != generate_id()
@@ -5,17 +5,31 @@ import pytest
 from modules.input_layer import IntentExtractor, KeywordExtractor, InputNormalizer
 
 
+# 两者均无状态，整个测试会话共用一个实例
+@pytest.fixture(scope="session")
+def normalizer():
+    return InputNormalizer()
+
+
+@pytest.fixture(scope="session")
+def extractor():
+    return KeywordExtractor()
+
+
 class TestInputNormalizer:
     """输入标准化器测试"""
     
-    def test_normalize_basic(self):
-        normalizer = InputNormalizer()
+    def test_normalize_basic(self, normalizer):
         text = "  这是  一个   测试   "
         result = normalizer.normalize(text)
         assert result == "这是 一个 测试"
     
-    def test_remove_sensitive_info(self):
-        normalizer = InputNormalizer()
+    def test_normalize_keeps_line_breaks(self, normalizer):
+        text = "角色：  助手 \r\n\n\n\n  目标：\t写作  "
+        result = normalizer.normalize(text)
+        assert result == "角色: 助手\n\n目标: 写作"
+    
+    def test_remove_sensitive_info(self, normalizer):
         text = "我的手机号是13812345678"
         result = normalizer.remove_sensitive_info(text)
         assert "[手机号]" in result
@@ -25,18 +39,24 @@ class TestInputNormalizer:
 class TestKeywordExtractor:
     """关键词提取器测试"""
     
-    def test_extract_keywords(self):
-        extractor = KeywordExtractor()
+    def test_extract_keywords(self, extractor):
         text = "帮我写一个分析财报的AI助手"
         keywords = extractor.extract_keywords(text, top_k=5)
         assert len(keywords) > 0
         assert isinstance(keywords, list)
     
-    def test_extract_key_phrases(self):
-        extractor = KeywordExtractor()
+    def test_extract_domain_keywords(self, extractor):
+        domains = extractor.extract_domain_keywords("分析季度财报的AI助手，统计订单")
+        assert domains == ["金融", "技术", "电商"]
+    
+    def test_extract_key_phrases(self, extractor):
         text = "需要一个财报分析助手来处理数据"
         phrases = extractor.extract_key_phrases(text)
         assert isinstance(phrases, list)
+    
+    def test_extract_key_phrases_overlapping(self, extractor):
+        phrases = extractor.extract_key_phrases("做一个「季度总结」的财报分析助手")
+        assert set(phrases) == {"季度总结", "的财报分析助手", "的财报分析"}
 
 
 # IntentExtractor 需要 API 密钥，在实际测试时可以使用 mock
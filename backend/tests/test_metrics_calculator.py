@@ -0,0 +1,99 @@
+"""
+指标计算器测试
+"""
+import pytest
+
+from modules.evaluation.metrics_calculator import MetricsCalculator
+
+SAMPLE_PROMPT = "# 角色\n你是数据分析师\n## 目标\n分析销售数据，必须详细但简洁\n## 输出\n- 表格\n- 总结"
+
+
+class TestMetricsCalculator:
+    """指标计算器测试"""
+
+    def test_scores(self):
+        calculator = MetricsCalculator()
+        assert calculator.calculate_structure_score(SAMPLE_PROMPT) == pytest.approx(1.0)
+        # "详细" 与 "简洁" 同时出现，扣除一致性得分
+        assert calculator.calculate_consistency_score(SAMPLE_PROMPT) == pytest.approx(0.55)
+        assert calculator.calculate_completeness_score(SAMPLE_PROMPT) == pytest.approx(0.55)
+        assert calculator.calculate_clarity_score(SAMPLE_PROMPT) == pytest.approx(1.0)
+
+    def test_tiny_prompt_gets_zero_metrics(self):
+        metrics = MetricsCalculator().calculate_metrics("  你是助手  \n")
+        assert metrics.overall_score == 0.0
+        assert metrics.structure_score == 0.0
+
+    def test_long_prompt_scored_on_head_and_tail(self):
+        calculator = MetricsCalculator()
+        body = "分析数据。" * 3000
+        text = "# 角色\n你是分析师\n" + body + "\n## 输出\n- 表格"
+        head_tail = text[:4000] + "\n" + text[-4000:]
+        assert calculator.calculate_metrics(text) == calculator.calculate_metrics(head_tail)
+
+    def test_statistics(self):
+        stats = MetricsCalculator().get_statistics(SAMPLE_PROMPT)
+        assert stats["has_sections"] == 3
+        assert stats["has_lists"] == 2
+        assert stats["total_lines"] == 7
+        assert stats["readability_score"] == pytest.approx(0.9)
+
+    def test_statistics_counts_match_reference_patterns(self):
+        import random
+        import re
+
+        section = re.compile(r'^#+', re.MULTILINE)
+        list_line = re.compile(r'^\s*[\d\-\*]', re.MULTILINE)
+        alphabet = ["#", "-", "*", "1", "²", " ", "\n", "\t", "\r", "文"]
+        calculator = MetricsCalculator()
+
+        rng = random.Random(0)
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            stats = calculator.get_statistics(text)
+            assert stats["has_sections"] == len(section.findall(text)), repr(text)
+            assert stats["has_lists"] == len(list_line.findall(text)), repr(text)
+
+    def test_scores_match_reference_patterns(self):
+        import random
+        import re
+
+        structure_patterns = [
+            (re.compile(r'^#+\s+', re.MULTILINE), 0.3),
+            (re.compile(r'(角色|role|你是)', re.IGNORECASE), 0.2),
+            (re.compile(r'(目标|objective|任务|task)', re.IGNORECASE), 0.2),
+            (re.compile(r'(输出|output|格式|format)', re.IGNORECASE), 0.2),
+            (re.compile(r'^\s*[\d\-\*•]+', re.MULTILINE), 0.1),
+        ]
+        elements = [
+            re.compile(r'(角色|role)', re.IGNORECASE),
+            re.compile(r'(目标|objective|任务)', re.IGNORECASE),
+            re.compile(r'(输出|output)', re.IGNORECASE),
+            re.compile(r'(上下文|context|背景)', re.IGNORECASE),
+        ]
+        alphabet = ["#", " ", "\n", "-", "1", "•", "角色", "你是", "目标", "任务", "输出", "格式",
+                    "背景", "上下文", "Role", "objective", "ta", "sk", "outpu", "t", "format", "context", "x"]
+
+        calculator = MetricsCalculator()
+        rng = random.Random(0)
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            expected_structure = min(sum(w for p, w in structure_patterns if p.search(text)), 1.0)
+            assert calculator.calculate_structure_score(text) == pytest.approx(expected_structure), text
+            base = 0.3 if len(text) >= 100 else 0.2 if len(text) >= 50 else 0.1
+            expected_completeness = min(base + 0.15 * sum(1 for p in elements if p.search(text)), 1.0)
+            assert calculator.calculate_completeness_score(text) == pytest.approx(expected_completeness), text
+
+    def test_clarity_counts_vague_words(self):
+        calculator = MetricsCalculator()
+        # 无动作动词：1.0 - 0.2；两个模糊词再扣 0.2
+        assert calculator.calculate_clarity_score("可能大概不行") == pytest.approx(0.6)
+        # 四个模糊词最多扣 0.3，有动作动词再加 0.1
+        assert calculator.calculate_clarity_score("请分析：可能大概也许应该") == pytest.approx(0.8)
+
+    def test_clarity_penalizes_long_sentences(self):
+        calculator = MetricsCalculator()
+        short_sentences = "请分析数据。" * 40
+        long_sentence = "请分析数据" + "并且" * 120 + "。"
+        assert calculator.calculate_clarity_score(short_sentences) == pytest.approx(1.0)
+        assert calculator.calculate_clarity_score(long_sentence) == pytest.approx(0.9)
@@ -0,0 +1,70 @@
+"""
+微批处理器测试
+"""
+import asyncio
+import pytest
+
+from services.micro_batcher import MicroBatcher
+
+
+def _make_batcher(calls, **kwargs):
+    async def handler(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+    return MicroBatcher(handler, **kwargs)
+
+
+@pytest.mark.asyncio
+class TestMicroBatcher:
+    """微批处理器测试"""
+
+    async def test_coalesces_concurrent_requests(self):
+        calls = []
+        batcher = _make_batcher(calls, max_batch=16, flush_ms=20)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+        finally:
+            await batcher.stop()
+        assert results == [0, 2, 4, 6, 8]
+        assert calls == [[0, 1, 2, 3, 4]]
+
+    async def test_respects_max_batch(self):
+        calls = []
+        batcher = _make_batcher(calls, max_batch=2, flush_ms=20)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+        finally:
+            await batcher.stop()
+        assert results == [0, 2, 4, 6, 8]
+        assert [len(batch) for batch in calls] == [2, 2, 1]
+
+    async def test_direct_call_when_not_started(self):
+        calls = []
+        batcher = _make_batcher(calls)
+        assert await batcher.submit(3) == 6
+        assert calls == [[3]]
+
+    async def test_handler_error_propagates(self):
+        async def handler(items):
+            raise RuntimeError("boom")
+        batcher = MicroBatcher(handler, flush_ms=5)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await batcher.submit(1)
+        finally:
+            await batcher.stop()
+
+    async def test_stop_flushes_batch_being_collected(self):
+        calls = []
+        batcher = _make_batcher(calls, max_batch=16, flush_ms=10000)
+        batcher.start()
+        tasks = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        # 让收集任务取走请求并进入收集窗口
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        assert results == [0, 2, 4]
+        assert calls == [[0, 1, 2]]
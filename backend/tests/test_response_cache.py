@@ -0,0 +1,73 @@
+"""
+编译响应缓存测试
+"""
+from models.prompt_models import IntentResult, TaskType
+from services.response_cache import PromptResponseCache
+
+
+def _intent(keywords, objective="分析财报数据"):
+    return IntentResult(
+        task_type=TaskType.ANALYSIS,
+        domain="金融",
+        objective=objective,
+        constraints=["输出使用表格"],
+        keywords=keywords,
+        confidence=0.9
+    )
+
+
+class TestPromptResponseCache:
+    """编译响应缓存测试"""
+
+    def test_exact_key_normalizes_input(self):
+        key_a = PromptResponseCache.make_key("  Hello ", None, "low", True)
+        key_b = PromptResponseCache.make_key("hello", None, "low", True)
+        key_c = PromptResponseCache.make_key("hello", None, "high", True)
+        assert key_a == key_b
+        assert key_a != key_c
+
+    def test_keyword_hit_requires_overlap(self):
+        cache = PromptResponseCache(maxsize=10, ttl=60, min_keyword_overlap=3)
+        intent = _intent(["财报", "分析", "利润"])
+        scope = cache.make_scope(intent, None, "medium", True)
+        cache.set("k1", scope, cache.extract_keywords(intent), "response")
+
+        similar = _intent(["财报", "分析", "营收"])
+        assert cache.get_by_keywords(scope, cache.extract_keywords(similar)) == "response"
+
+        different = _intent(["小说"], objective="写一篇小说")
+        assert cache.get_by_keywords(scope, cache.extract_keywords(different)) is None
+        assert cache.get_by_keywords("other", cache.extract_keywords(intent)) is None
+
+    def test_clear(self):
+        cache = PromptResponseCache(maxsize=10, ttl=60)
+        intent = _intent(["财报"])
+        scope = cache.make_scope(intent, None, "low", False)
+        cache.set("k1", scope, cache.extract_keywords(intent), "response")
+        assert cache.get("k1") == "response"
+        cache.clear()
+        assert cache.get("k1") is None
+        assert len(cache) == 0
+
+    def test_eviction_removes_keys_from_index(self):
+        cache = PromptResponseCache(maxsize=1, ttl=60)
+        intent = _intent(["财报", "分析", "利润"])
+        scope = cache.make_scope(intent, None, "low", False)
+        keywords = cache.extract_keywords(intent)
+        cache.set("k1", scope, keywords, "first")
+        cache.set("k2", scope, keywords, "second")
+        assert all(keys == {"k2"} for keys in cache._keyword_index[scope].values())
+
+        other = _intent(["小说"], objective="写一篇小说")
+        other_scope = cache.make_scope(other, None, "low", False)
+        cache.set("k3", other_scope, cache.extract_keywords(other), "third")
+        assert list(cache._keyword_index) == [other_scope]
+
+    def test_overwrite_reindexes_keywords(self):
+        cache = PromptResponseCache(maxsize=10, ttl=60)
+        old = _intent(["财报", "分析", "利润"])
+        new = _intent(["小说"], objective="写一篇小说")
+        scope = cache.make_scope(old, None, "low", False)
+        cache.set("k1", scope, cache.extract_keywords(old), "old")
+        cache.set("k1", scope, cache.extract_keywords(new), "new")
+        assert set(cache._keyword_index[scope]) == cache.extract_keywords(new)
@@ -0,0 +1,75 @@
+"""
+规则引擎测试
+"""
+import pytest
+from modules.compiler import RuleEngine
+
+
+class TestRuleEngine:
+    """规则引擎测试"""
+
+    def test_forbidden_words_in_config_order(self):
+        engine = RuleEngine()
+        result = engine.validate("角色：助手\n目标：讨论赌博与违法行为的危害\n输出：文章")
+        assert not result.passed
+        assert result.errors == ["包含禁用词汇: 违法, 赌博"]
+
+    def test_vague_word_count(self):
+        engine = RuleEngine()
+        text = "角色：助手\n目标：可能大概也许应该分析\n输出：表格"
+        result = engine.validate(text)
+        assert any("4 个" in w for w in result.warnings)
+
+    def test_action_verb_suggestion(self):
+        engine = RuleEngine()
+        without_action = engine.validate("角色：助手\n目标：回答问题\n输出：文本")
+        with_action = engine.validate("角色：助手\n目标：总结问题\n输出：文本")
+        hint = "建议使用明确的动作动词来描述任务"
+        assert hint in without_action.suggestions
+        assert hint not in with_action.suggestions
+
+    def test_complexity_counts_constraints(self):
+        engine = RuleEngine()
+        base = engine.calculate_complexity_score("短文本")
+        constrained = engine.calculate_complexity_score("必须简洁，不能编造，需要引用")
+        assert constrained - base == pytest.approx(0.15)
+
+    def test_vague_count_matches_alternation_scan(self):
+        import re
+        text = "请分析并总结：可能涉及赌博，也许应该尽量避免暴力内容，大概可能试试，然后生成报告"
+        ordered = sorted(RuleEngine.VAGUE_WORDS, key=len, reverse=True)
+        expected = len(re.findall("|".join(map(re.escape, ordered)), text))
+        result = RuleEngine().validate(text)
+        assert any(f"{expected} 个" in w for w in result.warnings)
+
+    def test_complexity_score_matches_reference_patterns(self):
+        import random
+        import re
+
+        section = re.compile(r'^#+', re.MULTILINE)
+        list_line = re.compile(r'^\s*[\d\-\*]', re.MULTILINE)
+        constraint = re.compile(r'必须|不能|应该|需要|禁止')
+        alphabet = ["#", "-", "*", "1", " ", "\n", "\t", "必须", "不能", "应该", "需要", "禁止", "文", "须"]
+
+        rng = random.Random(0)
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            expected = 0.1 + min(len(section.findall(text)) * 0.1, 0.3)
+            expected += min(len(list_line.findall(text)) * 0.05, 0.2)
+            expected += min(len(constraint.findall(text)) * 0.05, 0.2)
+            assert RuleEngine.calculate_complexity_score(text) == pytest.approx(min(expected, 1.0)), text
+
+    def test_structure_score(self):
+        from modules.template_engine import FragmentComposer
+        from models.prompt_models import IntentResult, TaskType
+
+        intent = IntentResult(
+            task_type=TaskType.ANALYSIS,
+            domain="新闻",
+            objective="总结新闻文章的核心要点",
+            constraints=["不超过 200 字"],
+            confidence=0.95
+        )
+        composed = FragmentComposer().compose_from_intent(intent, "帮我总结新闻")
+        assert RuleEngine.calculate_structure_score(composed) > 0.85
+        assert RuleEngine.calculate_structure_score("帮我总结一下这篇新闻") < 0.5
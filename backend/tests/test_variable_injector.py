@@ -0,0 +1,32 @@
+"""
+变量注入器测试
+"""
+from modules.template_engine import VariableInjector
+
+
+class TestVariableInjector:
+    """变量注入器测试"""
+
+    def test_inject_reuses_compiled_template(self):
+        injector = VariableInjector()
+        template_text = "你是{{ role }}，负责{{ task }}"
+        assert injector.inject(template_text, {"role": "分析师", "task": "分析"}) == "你是分析师，负责分析"
+        assert injector.inject(template_text, {"role": "编辑", "task": "校对"}) == "你是编辑，负责校对"
+        assert injector._compile.cache_info().hits == 1
+
+    def test_plain_placeholders_skip_jinja(self):
+        injector = VariableInjector()
+        text = '角色：{role}\n输出 JSON：{"score": 1}，未知：{missing}'
+        assert injector.inject(text, {"role": "分析师"}) == '角色：分析师\n输出 JSON：{"score": 1}，未知：{missing}'
+        assert injector._compile.cache_info().misses == 0
+
+    def test_inject_falls_back_to_simple_replace(self):
+        injector = VariableInjector()
+        assert injector.inject("{% if %}{name}", {"name": "张三"}) == "{% if %}张三"
+
+    def test_extract_variables(self):
+        injector = VariableInjector()
+        assert sorted(injector.extract_variables("{{ a }} 与 {{ b }}")) == ["a", "b"]
+        assert injector.extract_variables("{% if %}{name}") == ["name"]
+        assert injector.validate_variables("{{ a }}", {"a": 1})
+        assert not injector.validate_variables("{{ a }}", {})
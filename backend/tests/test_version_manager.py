@@ -0,0 +1,30 @@
+"""
+版本管理器测试
+"""
+from models.prompt_models import CompiledPrompt, IntentResult, OptimizationLevel, TaskType
+from modules.output.version_manager import VersionManager
+
+
+class TestVersionManager:
+    """版本管理器测试"""
+
+    def test_from_document_matches_validated_model(self):
+        prompt = CompiledPrompt(
+            original_input="分析财报",
+            intent=IntentResult(task_type=TaskType.ANALYSIS, domain="finance", objective="分析财报", confidence=0.9),
+            role="财务分析师",
+            objective="分析财报",
+            output_format="markdown",
+            full_prompt="# 角色\n财务分析师",
+            optimization_level=OptimizationLevel.HIGH
+        )
+        # 模拟数据库中的存储形式：枚举为字符串，带有额外的派生字段
+        document = prompt.model_dump(mode="json")
+        document["created_at"] = prompt.created_at
+        document["original_input_lc"] = "分析财报"
+
+        restored = VersionManager._from_document(document)
+        assert isinstance(restored.intent, IntentResult)
+        assert restored.intent.task_type is TaskType.ANALYSIS
+        assert restored.optimization_level is OptimizationLevel.HIGH
+        assert restored == prompt
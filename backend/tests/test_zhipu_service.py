@@ -0,0 +1,178 @@
+"""
+智谱 AI 服务测试
+"""
+import json
+
+import httpx
+import pytest
+from tenacity import wait_none
+
+from models.prompt_models import TaskType
+from services.zhipu_service import _DEFAULT_INTENT, ZhipuAIService, _IntentPayload, _strip_code_fence
+
+EVALUATION = {
+    "structure_score": 0.8,
+    "consistency_score": 0.8,
+    "completeness_score": 0.8,
+    "clarity_score": 0.8,
+    "analysis": "ok"
+}
+
+
+INTENT = {
+    "task_type": "analysis",
+    "domain": "金融",
+    "objective": "分析财报",
+    "confidence": 0.9
+}
+
+
+def _make_service(requests, intent=INTENT):
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        user_message = body["messages"][-1]["content"]
+        item = intent if "意图" in body["messages"][0]["content"] else EVALUATION
+        count = user_message.count("### ")
+        content = [item] * count if count else item
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(content, ensure_ascii=False)}}]})
+
+    service = ZhipuAIService()
+    service.client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_strip_code_fence():
+    assert _strip_code_fence(' {"a": 1} \n') == '{"a": 1}'
+    assert _strip_code_fence('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert _strip_code_fence('```\n[1]\n```\n') == '[1]'
+
+
+def test_default_evaluation_is_not_shared():
+    evaluation = ZhipuAIService._default_evaluation()
+    evaluation["metrics"].overall_score = 0.0
+    assert ZhipuAIService._default_evaluation()["metrics"].overall_score == 0.5
+
+
+@pytest.mark.asyncio
+class TestZhipuAIService:
+    """智谱 AI 服务测试"""
+
+    async def test_repeated_evaluation_served_from_cache(self):
+        requests = []
+        service = _make_service(requests)
+        first = await service.quality_evaluation("你是分析师，分析财报")
+        second = await service.quality_evaluation("你是分析师，分析财报")
+        assert len(requests) == 1
+        assert second["metrics"] == first["metrics"]
+
+        await service.quality_evaluation("你是分析师，分析财报", use_cache=False)
+        assert len(requests) == 2
+
+    async def test_cached_results_are_not_shared_between_callers(self):
+        requests = []
+        service = _make_service(requests)
+        first = await service.quality_evaluation("prompt a")
+        first["metrics"].clarity_score = 0.0
+        first["analysis"] = "changed"
+        second = await service.quality_evaluation("prompt a")
+        assert second["metrics"].clarity_score == 0.8
+        assert second["analysis"] == "ok"
+
+        intent = await service.intent_extraction("分析财报 x")
+        intent.keywords.append("x")
+        assert (await service.intent_extraction("分析财报 x")).keywords == []
+        assert len(requests) == 2
+
+    async def test_stored_evaluation_skips_request(self):
+        requests = []
+        service = _make_service(requests)
+        evaluation = await service.quality_evaluation("prompt a", use_cache=False)
+        service.store_evaluation("prompt b", None, evaluation)
+        assert (await service.quality_evaluation("prompt b"))["metrics"] == evaluation["metrics"]
+        assert len(requests) == 1
+
+    async def test_batch_evaluation_only_sends_uncached_items(self):
+        requests = []
+        service = _make_service(requests)
+        await service.quality_evaluation("prompt a")
+        results = await service.batch_quality_evaluation([("prompt a", None), ("prompt b", None), ("prompt c", None)])
+        assert len(results) == 3
+        assert len(requests) == 2
+        assert requests[-1]["messages"][-1]["content"].count("### Prompt") == 2
+
+    async def test_batch_intent_extraction(self):
+        requests = []
+        service = _make_service(requests)
+        await service.intent_extraction("分析财报 a")
+        results = await service.batch_intent_extraction(["分析财报 a", "分析财报 b", "分析财报 c"])
+        assert [result.domain for result in results] == ["金融"] * 3
+        assert len(requests) == 2
+        assert requests[-1]["messages"][-1]["content"].count("### 输入") == 2
+        # JSON 模式只能返回对象，批量调用返回数组时不启用
+        assert requests[0]["response_format"] == {"type": "json_object"}
+        assert "response_format" not in requests[-1]
+        assert requests[-1]["max_tokens"] == 2 * requests[0]["max_tokens"]
+
+        await service.batch_intent_extraction(["分析财报 b", "分析财报 c"])
+        assert len(requests) == 2
+
+    async def test_unknown_task_type_maps_to_other(self):
+        intent = ZhipuAIService._build_intent(_IntentPayload.model_validate_json('{"task_type": "Analysis"}'), "分析财报")
+        assert intent.task_type is TaskType.ANALYSIS
+        assert intent.objective == "分析财报"
+        assert intent.confidence == 0.8
+        for value in ('"translation"', "null"):
+            payload = _IntentPayload.model_validate_json(f'{{"task_type": {value}, "confidence": 0.9}}')
+            assert payload.task_type is TaskType.OTHER
+
+    async def test_out_of_range_confidence_falls_back_to_default_intent(self):
+        service = _make_service([], intent={**INTENT, "confidence": 1.5})
+        intent = await service.intent_extraction("分析财报 x")
+        assert intent.task_type is TaskType.OTHER
+        assert intent.confidence == 0.5
+        assert intent.objective == "分析财报 x"
+        intent.keywords.append("x")
+        assert _DEFAULT_INTENT.objective == ""
+        assert _DEFAULT_INTENT.keywords == []
+
+    async def test_retries_transient_http_errors_only(self, monkeypatch):
+        monkeypatch.setattr(ZhipuAIService._post_chat.retry, "wait", wait_none())
+        statuses = [503, 429, 200]
+
+        def handler(request):
+            status = statuses.pop(0)
+            if status != 200:
+                return httpx.Response(status)
+            return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(EVALUATION)}}]})
+
+        service = ZhipuAIService()
+        service.client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+        result = await service.quality_evaluation("prompt", use_cache=False)
+        assert not result.get("is_fallback")
+        assert statuses == []
+
+        requests = []
+
+        def unauthorized(request):
+            requests.append(request)
+            return httpx.Response(401)
+
+        service.client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(unauthorized))
+        result = await service.quality_evaluation("prompt", use_cache=False)
+        assert result["is_fallback"]
+        assert len(requests) == 1
+
+    async def test_read_timeout_is_not_retried(self, monkeypatch):
+        monkeypatch.setattr(ZhipuAIService._post_chat.retry, "wait", wait_none())
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        service = ZhipuAIService()
+        service.client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+        result = await service.quality_evaluation("prompt", use_cache=False)
+        assert result["is_fallback"]
+        assert len(requests) == 1
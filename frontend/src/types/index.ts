@@ -96,6 +96,7 @@ export interface CompileRequest {
   template_id?: string
   optimization_level: OptimizationLevel
   auto_evaluate: boolean
+  include_formatted?: boolean
 }
 
 export interface CompileResponse {
@@ -103,7 +104,7 @@ export interface CompileResponse {
   compiled_prompt: CompiledPrompt
   metrics?: QualityMetrics
   suggestions: string[]
-  formatted_output: any
+  formatted_output?: any
 }
 
 export interface OptimizeRequest {